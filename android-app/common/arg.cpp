@@ -1577,6 +1577,13 @@ common_params_context common_params_parser_init(common_params & params, llama_ex
             params.n_print = value;
         }
     ).set_examples({LLAMA_EXAMPLE_MAIN}));
+    add_opt(common_arg(
+        {"--metrics-file"}, "FNAME",
+        "write load/prefill/decode timings, per-token timestamps, memory breakdown and the response as JSONL to FNAME (default: none)",
+        [](common_params & params, const std::string & value) {
+            params.sampling.metrics_file = value;
+        }
+    ).set_examples({LLAMA_EXAMPLE_MAIN}));
     add_opt(common_arg(
         {"--prompt-cache"}, "FNAME",
         "file to cache prompt state for faster startup (default: none)",
@@ -21,6 +21,7 @@
 #include <fstream>
 #include <iostream>
 #include <iterator>
+#include <mutex>
 #include <regex>
 #include <sstream>
 #include <string>
@@ -347,8 +348,47 @@ bool parse_cpu_mask(const std::string & mask, bool (&boolmask)[GGML_MAX_N_THREAD
     return true;
 }
 
+static std::mutex                                 g_buffer_sizes_mutex;
+static std::map<std::string, common_buffer_size>  g_buffer_sizes;
+
+// llama logs every allocated buffer as "<func>: <buffer> <kind> buffer size = <n> MiB"
+static void common_record_buffer_size(const char * text) {
+    const char * size = strstr(text, " buffer size = ");
+    const char * func = strstr(text, ": ");
+    if (size == nullptr || func == nullptr || func > size) {
+        return;
+    }
+
+    char   name[128];
+    char   kind[32];
+    double mib = 0.0;
+    if (sscanf(func + 2, "%127s %31s", name, kind) != 2 || sscanf(size, " buffer size = %lf", &mib) != 1) {
+        return;
+    }
+
+    const size_t bytes = (size_t) (mib * 1024.0 * 1024.0);
+
+    std::lock_guard<std::mutex> lock(g_buffer_sizes_mutex);
+    auto & entry = g_buffer_sizes[name];
+    if (strcmp(kind, "model") == 0 || strcmp(kind, "LoRA") == 0) {
+        entry.model += bytes;
+    } else if (strcmp(kind, "KV") == 0) {
+        entry.context += bytes;
+    } else {
+        entry.compute += bytes;
+    }
+}
+
+std::map<std::string, common_buffer_size> common_buffer_sizes() {
+    std::lock_guard<std::mutex> lock(g_buffer_sizes_mutex);
+    return g_buffer_sizes;
+}
+
 void common_init() {
     llama_log_set([](ggml_log_level level, const char * text, void * /*user_data*/) {
+        if (level == GGML_LOG_LEVEL_INFO) {
+            common_record_buffer_size(text);
+        }
         if (LOG_DEFAULT_LLAMA <= common_log_verbosity_thold) {
             common_log_add(common_log_main(), level, "%s", text);
         }
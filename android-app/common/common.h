@@ -157,6 +157,8 @@ struct common_params_sampling {
     bool    no_perf            = false; // disable performance metrics
     bool    timing_per_token   = false;
 
+    std::string metrics_file = ""; // JSONL run metrics written by common_perf_print (--metrics-file)    // NOLINT
+
     std::vector<std::string> dry_sequence_breakers = {"\n", ":", "\"", "*"};     // default sequence breakers for DRY
 
 
@@ -448,6 +450,17 @@ struct common_params {
 // initializes the logging system and prints info about the build
 void common_init();
 
+// memory per backend buffer, in bytes
+struct common_buffer_size {
+    size_t model   = 0; // weights
+    size_t context = 0; // KV cache / recurrent state
+    size_t compute = 0; // compute graph and output buffers
+};
+
+// buffer sizes taken from the "<buffer> <kind> buffer size = <n> MiB" lines llama has logged so far
+// only populated after common_init(), keyed by buffer name (e.g. CPU_Mapped, CPU)
+std::map<std::string, common_buffer_size> common_buffer_sizes();
+
 std::string common_params_get_system_info(const common_params & params);
 
 bool parse_cpu_range(const std::string & range, bool(&boolmask)[GGML_MAX_N_THREADS]);
@@ -4,9 +4,14 @@
 #include "log.h"
 
 #include <cmath>
+#include <fstream>
 #include <unordered_map>
 #include <algorithm>
 
+#include <nlohmann/json.hpp>
+
+using json = nlohmann::ordered_json;
+
 // the ring buffer works similarly to std::deque, but with a fixed capacity
 // TODO: deduplicate with llama-impl.h
 template<typename T>
@@ -112,6 +117,10 @@ struct common_sampler {
 
     llama_token_data_array cur_p;
 
+    // generated tokens and when they were accepted, for --metrics-file
+    std::vector<llama_token> out_tokens;
+    std::vector<int64_t>     out_t_us;
+
     void set_logits(struct llama_context * ctx, int idx) {
         const auto * logits = llama_get_logits_ith(ctx, idx);
 
@@ -220,6 +229,8 @@ struct common_sampler * common_sampler_init(const struct llama_model * model, co
         /* .prev   = */ ring_buffer<llama_token>(std::max(32, params.n_prev)),
         /* .cur    = */ {},
         /* .cur_p  = */ {},
+        /* .out_tokens = */ {},
+        /* .out_t_us   = */ {},
     };
 
     llama_sampler_chain_add(result->chain,
@@ -305,6 +316,12 @@ void common_sampler_accept(struct common_sampler * gsmpl, llama_token token, boo
     llama_sampler_accept(gsmpl->chain, token);
 
     gsmpl->prev.push_back(token);
+
+    // prompt tokens are accepted with accept_grammar == false, generated ones with true
+    if (accept_grammar && !gsmpl->params.metrics_file.empty()) {
+        gsmpl->out_tokens.push_back(token);
+        gsmpl->out_t_us.push_back(ggml_time_us());
+    }
 }
 
 void common_sampler_reset(struct common_sampler * gsmpl) {
@@ -321,6 +338,8 @@ struct common_sampler * common_sampler_clone(common_sampler * gsmpl) {
         /* .prev   = */ gsmpl->prev,
         /* .cur    = */ gsmpl->cur,
         /* .cur_p  = */ gsmpl->cur_p,
+        /* .out_tokens = */ gsmpl->out_tokens,
+        /* .out_t_us   = */ gsmpl->out_t_us,
     };
 }
 
@@ -333,6 +352,67 @@ void common_perf_print(const struct llama_context * ctx, const struct common_sam
     if (ctx) {
         llama_perf_context_print(ctx);
     }
+    if (ctx && gsmpl && !gsmpl->params.metrics_file.empty()) {
+        common_perf_write(gsmpl->params.metrics_file, ctx, gsmpl);
+    }
+}
+
+// one JSON object per line, distinguished by "type": perf, memory, token, response
+bool common_perf_write(const std::string & path, const struct llama_context * ctx, const struct common_sampler * gsmpl) {
+    std::ofstream file(path);
+    if (!file) {
+        LOG_ERR("%s: failed to open metrics file '%s'\n", __func__, path.c_str());
+        return false;
+    }
+
+    const auto data_ctx  = llama_perf_context(ctx);
+    const auto data_smpl = llama_perf_sampler(gsmpl->chain);
+
+    const double t_end_ms = 1e-3 * ggml_time_us();
+
+    file << json {
+        {"type",             "perf"},
+        {"t_load_ms",        data_ctx.t_load_ms},
+        {"t_prompt_eval_ms", data_ctx.t_p_eval_ms},
+        {"n_prompt_eval",    data_ctx.n_p_eval},
+        {"t_eval_ms",        data_ctx.t_eval_ms},
+        {"n_eval",           data_ctx.n_eval},
+        {"t_total_ms",       t_end_ms - data_ctx.t_start_ms},
+        {"t_sample_ms",      data_smpl.t_sample_ms},
+        {"n_sample",         data_smpl.n_sample},
+    }.dump() << "\n";
+
+    for (const auto & [name, size] : common_buffer_sizes()) {
+        file << json {
+            {"type",          "memory"},
+            {"buffer",        name},
+            {"model_bytes",   size.model},
+            {"context_bytes", size.context},
+            {"compute_bytes", size.compute},
+        }.dump() << "\n";
+    }
+
+    // timestamps are relative to the context start, the first one is the time to first token
+    std::string response;
+    for (size_t i = 0; i < gsmpl->out_tokens.size(); ++i) {
+        const std::string piece = common_token_to_piece(ctx, gsmpl->out_tokens[i], false);
+        response += piece;
+
+        file << json {
+            {"type",  "token"},
+            {"i",     i},
+            {"id",    gsmpl->out_tokens[i]},
+            {"t_ms",  1e-3 * gsmpl->out_t_us[i] - data_ctx.t_start_ms},
+            {"piece", piece},
+        }.dump(-1, ' ', false, json::error_handler_t::replace) << "\n";
+    }
+
+    file << json {
+        {"type", "response"},
+        {"text", response},
+    }.dump(-1, ' ', false, json::error_handler_t::replace) << "\n";
+
+    return true;
 }
 
 llama_token common_sampler_sample(struct common_sampler * gsmpl, struct llama_context * ctx, int idx, bool grammar_first) {
@@ -46,8 +46,12 @@ void                    common_sampler_reset (struct common_sampler * gsmpl);
 struct common_sampler * common_sampler_clone (struct common_sampler * gsmpl);
 
 // arguments can be nullptr to skip printing
+// also writes the metrics file when params.metrics_file is set
 void common_perf_print(const struct llama_context * ctx, const struct common_sampler * gsmpl);
 
+// write timings, memory breakdown, per-token timestamps and the response as JSONL
+bool common_perf_write(const std::string & path, const struct llama_context * ctx, const struct common_sampler * gsmpl);
+
 // extended sampling implementation:
 //
 // - set logits
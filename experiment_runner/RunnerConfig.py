@@ -7,41 +7,234 @@ from ConfigValidator.Config.Models.OperationType import OperationType
 from ProgressManager.Output.OutputProcedure import OutputProcedure as output
 from os.path import dirname, realpath
 from pathlib import Path
-import subprocess
-import time
 import re
-import statistics
 import os
 import glob
 import json
+import csv
+import hashlib
+import statistics
+import sys
+
+sys.path.insert(0, dirname(realpath(__file__)))
+from parser.thermal_parser import parse_thermal_log, parse_thermal_baseline
+from parser.metrics_parser import parse_metrics_file
+from parser.perplexity_parser import parse_perplexity_log
+from parser.batched_bench_parser import parse_batched_bench_log
+from parser.speculative_parser import parse_speculative_log
+from parser.placement_parser import parse_placement_log, parse_cpu_list
+from parser.prompt_cache_parser import parse_prompt_cache_log
+from quality_metrics.lexical_metrics import lexical_metrics, LEXICAL_COLUMNS
+from tracer import Tracer
+from device_backend import make_backend, EVICT_HELPER
+from model_downloader import load_manifest
+from run_cache import RunCache
 
 class RunnerConfig:
     ROOT_DIR = Path(dirname(realpath(__file__)))
     
+    # --- Run Mode ---
+    # "summarize"  -> llama-cli summarizes SOURCE_TEXT (default)
+    # "perplexity" -> llama-perplexity over the bundled wikitext2 test split
+    # "throughput" -> llama-batched-bench decoding n_parallel sequences at once
+    # "scaling"    -> llama-cli summarizing wikitext2 prompts of prompt_length tokens
+    RUN_MODE = os.environ.get("RUNNER_MODE", "summarize")
+
     # --- Experiment Config ---
-    name = "s25_llama_thesis_experiment"
+    name = {
+        "perplexity": "s25_llama_perplexity_experiment",
+        "throughput": "s25_llama_throughput_experiment",
+        "scaling": "s25_llama_scaling_experiment",
+    }.get(RUN_MODE, "s25_llama_thesis_experiment")
     results_output_path = ROOT_DIR / 'results'
     operation_type = OperationType.AUTO
-    time_between_runs_in_ms = 200000  # 200 second cool-down between runs
+
+    # Divides every runner-side wait; use with plugins/fake_adb to replay without a phone
+    SPEEDUP = float(os.environ.get("RUNNER_SPEEDUP", "1"))
+    time_between_runs_in_ms = int(200000 / SPEEDUP)  # 200 second cool-down between runs
+
+    # --- Device Backend ---
+    # "adb"   -> Android phone, energy from the BatteryManager service
+    # "local" -> llama.cpp as a host subprocess, energy from RAPL or a CPU-time power model
+    BACKEND = os.environ.get("RUNNER_BACKEND", "adb")
 
     # --- Device & ADB Settings ---
-    ADB_PATH = "adb" 
+    ADB_PATH = os.environ.get("ADB_PATH", "adb")
     DEVICE_ID = "192.168.43.162:5555" 
     REMOTE_DIR = "/data/local/tmp"
     BINARY_NAME = "llama-cli"
+    # JSONL written by `llama-cli --metrics-file` (needs a build with android-app/common).
+    # Opt-in: RUNNER_METRICS_FILE=llama_metrics.jsonl. Stock binaries reject the flag, so
+    # before_experiment checks `llama-cli --help` and falls back to scraping the log.
+    METRICS_FILE = os.environ.get("RUNNER_METRICS_FILE", "")
+
+    # --- Local Backend Settings ---
+    LOCAL_WORKDIR = "/tmp/llm_on_device"     # plays the role of REMOTE_DIR
+    LOCAL_WATTS_PER_CORE = 6.0               # power model used when RAPL is not readable
     
     # --- Local Paths ---
-    LOCAL_LLAMA_BUILD = os.path.expanduser("~/llm_on_device/llama.cpp/build-android/bin")
-    LOCAL_MODEL_PATH = "/mnt/d/GoogleDriveMirror/UNI/Thesis/Files/script/models/q2"
+    LOCAL_LLAMA_BUILD = os.environ.get("LOCAL_LLAMA_BUILD", os.path.expanduser("~/llm_on_device/llama.cpp/build-android/bin"))
+    LOCAL_MODEL_PATH = os.environ.get("LOCAL_MODEL_PATH", "/mnt/d/GoogleDriveMirror/UNI/Thesis/Files/script/models/q2")
+
+    # --- Prompt ---
+    # Source text every model summarizes (also the source for the lexical metrics)
+    SOURCE_TEXT = (
+        "The World Wide Web (WWW) was invented by British scientist Tim Berners-Lee "
+        "in 1989. He was working at CERN, the European Organization for Nuclear "
+        "Research, near Geneva, Switzerland. Berners-Lee created the Web to meet "
+        "the demand for automatic information-sharing between scientists in "
+        "universities and institutes around the world."
+        )
+
+    # --- Perplexity Mode ---
+    PERPLEXITY_BINARY = "llama-perplexity"
+    PPL_DATASET = ROOT_DIR.parent / "scrapers" / "benchmark dataset downloader" / "Dataset" / "wikitext2 dataset" / "wikitext2_test.csv"
+    PPL_TEXT_FILE = "wikitext2_ppl.txt"
+    PPL_CHUNKS = int(os.environ.get("RUNNER_PPL_CHUNKS", "20"))
+    PPL_CTX = 512
+    # Upper bound on characters per token; the pushed text is cut to what PPL_CHUNKS needs
+    PPL_CHARS_PER_TOKEN = 8
+
+    # --- Throughput Mode ---
+    # n_parallel factor (RUNNER_PARALLEL, comma separated): sequences llama-batched-bench
+    # prefills and then decodes in the same batches. -c is sized to hold all of them
+    # (n_parallel * (PP + TG) cells), so the ctx_size factor does not apply in this mode.
+    BATCHED_BENCH_BINARY = "llama-batched-bench"
+    THROUGHPUT_PP = 128                  # prompt tokens per sequence
+    THROUGHPUT_TG = 100                  # generated tokens per sequence (-n of summarize runs)
+    PARALLEL = os.environ.get("RUNNER_PARALLEL", "1,2,4,8").split(",")
+
+    # --- Prompt-Length Scaling Mode ---
+    # prompt_length factor (RUNNER_PROMPT_LENGTHS, comma separated): target prompt tokens.
+    # The prompt is the summarize instruction over the first PROMPT_CHARS_PER_TOKEN * n
+    # characters of the wikitext2 test split, passed with -f (8k tokens do not fit a shell
+    # argument). -c holds the prompt and the 100 generated tokens with headroom for the
+    # tokenizer, so the ctx_size factor does not apply. scaling_fit.py fits the cost curves.
+    PROMPT_LENGTHS = os.environ.get("RUNNER_PROMPT_LENGTHS", "64,128,256,512,1024,2048,4096,8192").split(",")
+    PROMPT_CHARS_PER_TOKEN = 4
+    PROMPT_DIR = "scaling_prompts"
+
+    # --- Speculative Decoding (summarize mode) ---
+    # speculation factor (RUNNER_SPECULATION, comma separated):
+    # "none"  -> llama-cli
+    # "draft" -> llama-speculative, the target drafted by its DRAFT_MODELS entry
+    # "ngram" -> llama-lookup, drafts from n-grams of the prompt and generated text
+    # draft_max factor (RUNNER_DRAFT_MAX): tokens drafted per step (--draft-max)
+    SPECULATION = os.environ.get("RUNNER_SPECULATION", "none").split(",")
+    DRAFT_MAX = os.environ.get("RUNNER_DRAFT_MAX", "16").split(",")
+    SPECULATIVE_BINARIES = {"draft": "llama-speculative", "ngram": "llama-lookup"}
+    # target -> draft with the same vocabulary (llama-speculative refuses mismatched ones)
+    DRAFT_MODELS = {
+        "qwen2.5-1.5b-instruct-q4_k_m.gguf": "qwen2-0_5b-instruct-q4_k_m.gguf",
+        "qwen2.5-3b-instruct-q4_k_m.gguf": "qwen2-0_5b-instruct-q4_k_m.gguf",
+        "qwen2.5-7b-instruct-q4_k_m.gguf": "qwen2-0_5b-instruct-q4_k_m.gguf",
+        "Qwen2.5-1.5B-Instruct-IQ4_XS.gguf": "Qwen2-0.5b-instruct-iq4_xs.gguf",
+        "Qwen2.5-3B-Instruct-IQ4_XS.gguf": "Qwen2-0.5b-instruct-iq4_xs.gguf",
+        "Qwen2.5-7B-Instruct-IQ4_XS.gguf": "Qwen2-0.5b-instruct-iq4_xs.gguf",
+    }
+
+    # --- Prompt / KV State Cache (summarize mode) ---
+    # prompt_cache factor (RUNNER_PROMPT_CACHE, comma separated), llama-cli --prompt-cache:
+    # "off"     -> no session file (default)
+    # "cold"    -> the session file is deleted before the run, which evaluates and saves the prompt
+    # "warm"    -> restores a session primed with the same prompt (exact prefix)
+    # "partial" -> restores a session primed with the same instruction over PARTIAL_CACHE_TEXT,
+    #              so only the chat header and instruction are shared
+    # warm/partial sessions are primed outside the measurement window and loaded read-only.
+    PROMPT_CACHE = os.environ.get("RUNNER_PROMPT_CACHE", "off").split(",")
+    PARTIAL_CACHE_TEXT = (
+        "The transistor was invented at Bell Labs in 1947 by John Bardeen, Walter "
+        "Brattain and William Shockley. It replaced the vacuum tube in radios and "
+        "computers and made the integrated circuit possible, and the three shared "
+        "the 1956 Nobel Prize in Physics for the discovery."
+        )
+
+    # --- Warm-up / Page Cache ---
+    # "per_model" -> one warm-up inference per model_file level before the first run, and the
+    #                GGUF is read into the page cache before every warm run
+    # "prefetch"  -> page-cache prefetch before warm runs only
+    # The prefetch is skipped while load_strategy has several levels: it would hand every
+    # strategy the same hot page cache
+    # "fixed"     -> a single warm-up with WARMUP_MODEL
+    # "none"      -> no warm-up
+    WARMUP_POLICY = os.environ.get("RUNNER_WARMUP", "per_model")
+    WARMUP_MODEL = "gemma-2-9b-it-IQ4_XS.gguf"
+    # cache_state factor: "warm" and/or "cold" (page cache dropped before the run). Cold runs
+    # need EVICT_HELPER in LOCAL_LLAMA_BUILD or a rooted phone; the runner refuses them otherwise
+    CACHE_STATES = os.environ.get("RUNNER_CACHE_STATES", "warm").split(",")
+
+    # --- Model Load Strategy ---
+    # load_strategy factor levels (RUNNER_LOAD_STRATEGIES, comma separated):
+    # "mmap"          -> llama.cpp default, weights paged in on first touch
+    # "no_mmap"       -> --no-mmap, weights read into anonymous memory
+    # "mlock"         -> --mlock, weights mapped and locked in RAM
+    # "mmap_prefetch" -> mmap after reading the GGUF into the page cache, inside the measured window
+    LOAD_STRATEGIES = os.environ.get("RUNNER_LOAD_STRATEGIES", "mmap").split(",")
+    LOAD_FLAGS = {"mmap": "", "no_mmap": "--no-mmap ", "mlock": "--mlock ", "mmap_prefetch": ""}
+
+    # --- KV Cache / Attention ---
+    # kv_cache_type, flash_attn and ctx_size factors (comma separated levels). llama.cpp only
+    # quantizes the V cache with flash attention, so with flash_attn=off only K takes the type.
+    # ctx_size sets -c of summarize runs and is a factor in that mode only; perplexity runs
+    # keep PPL_CTX as their chunk size.
+    KV_TYPES = os.environ.get("RUNNER_KV_TYPES", "f16").split(",")
+    FLASH_ATTN = os.environ.get("RUNNER_FLASH_ATTN", "off").split(",")
+    CTX_SIZES = os.environ.get("RUNNER_CTX_SIZES", "512").split(",")
+
+    # --- CPU Affinity ---
+    # affinity factor (RUNNER_AFFINITY, comma separated preset names): preset -> (CPU list, -t).
+    # Snapdragon 8 Elite: cpu0-5 performance cluster (policy0), cpu6-7 prime cluster (policy6)
+    AFFINITY_PRESETS = {
+        "default": ("", 8),             # no mask, the scheduler places the threads
+        "prime": ("6-7", 2),
+        "performance": ("0-5", 6),
+        "all": ("0-7", 8),
+    }
+    AFFINITY = os.environ.get("RUNNER_AFFINITY", "default").split(",")
+    PLACEMENT_SAMPLER = ROOT_DIR.parent / "plugins" / "affinity" / "placement_sampler.sh"
+    PLACEMENT_SAMPLE_INTERVAL = 0.2     # seconds
+
+    # --- Run Cache ---
+    # Measured runs are stored in .run_cache/ under a hash of the binary and libs, the GGUF,
+    # the full command line, the prompt, the device serial and RUNNER_VERSION. Repetitions
+    # whose key already holds a row are replayed, so only new configurations are measured.
+    # RUNNER_RUN_CACHE=0 measures every run and leaves the cache untouched.
+    RUN_CACHE = os.environ.get("RUNNER_RUN_CACHE", "1") != "0"
+    RUNNER_VERSION = "2"                 # bump when a parser or column changes meaning
+
+    # --- Thermal / DVFS Sampler ---
+    THERMAL_SAMPLER = ROOT_DIR.parent / "plugins" / "thermal" / "thermal_sampler.sh"
+    THERMAL_SAMPLE_INTERVAL = 0.1        # seconds (10 Hz, same rate as the power sampler)
+    THERMAL_ZONE_FILTER = "cpu|gpu|soc|skin|ddr"
+    # Per-policy frequency caps sampled on the idle device before the warm-up; a run is
+    # throttled when a cap falls below them
+    THERMAL_BASELINE_SECONDS = 2
 
     def __init__(self):
+        # Every hook and device command is recorded as a span (see tracer.py);
+        # after_experiment traces itself so it can write the trace file last.
+        self.tracer = Tracer()
+        self.device = make_backend(
+            self.BACKEND, self.tracer,
+            remote_dir=self.REMOTE_DIR, adb_path=self.ADB_PATH, device_id=self.DEVICE_ID,
+            local_workdir=self.LOCAL_WORKDIR, watts_per_core=self.LOCAL_WATTS_PER_CORE
+        )
+        # Written by model_downloader.py; models copied in by hand are simply not listed
+        self.model_manifest = load_manifest(self.LOCAL_MODEL_PATH)
+        self.REMOTE_DIR = self.device.workdir
+        self.run_cache = RunCache() if self.RUN_CACHE else None
+        self.cached_row = None
+        # Prefill Joules per token of off/cold prompt_cache runs, per configuration
+        self.prefill_baseline = {}
+        # Idle frequency caps per policy (before_experiment), the reference of throttle detection
+        self.thermal_baseline = {}
         EventSubscriptionController.subscribe_to_multiple_events([
-            (RunnerEvents.BEFORE_EXPERIMENT, self.before_experiment),
-            (RunnerEvents.START_RUN, self.start_run),
-            (RunnerEvents.START_MEASUREMENT, self.start_measurement),
-            (RunnerEvents.INTERACT, self.interact),
-            (RunnerEvents.STOP_MEASUREMENT, self.stop_measurement),
-            (RunnerEvents.POPULATE_RUN_DATA, self.populate_run_data),
+            (RunnerEvents.BEFORE_EXPERIMENT, self.tracer.hook("before_experiment", self.before_experiment)),
+            (RunnerEvents.START_RUN, self.tracer.hook("start_run", self.start_run)),
+            (RunnerEvents.START_MEASUREMENT, self.tracer.hook("start_measurement", self.start_measurement)),
+            (RunnerEvents.INTERACT, self.tracer.hook("interact", self.interact)),
+            (RunnerEvents.STOP_MEASUREMENT, self.tracer.hook("stop_measurement", self.stop_measurement)),
+            (RunnerEvents.POPULATE_RUN_DATA, self.tracer.hook("populate_run_data", self.populate_run_data)),
             (RunnerEvents.AFTER_EXPERIMENT, self.after_experiment)
         ])
         self.run_table_model = None
@@ -52,81 +245,227 @@ class RunnerConfig:
 
     def create_run_table_model(self) -> RunTableModel:
         # Define Factors
-        factor_model = FactorModel("model_file", 
-                                   [
-                                       #"qwen2-0_5b-instruct-q4_k_m.gguf",
-                                       #"qwen2.5-1.5b-instruct-q4_k_m.gguf",
-                                       #"phi-2.Q4_K_M.gguf",
-                                       #"qwen2.5-3b-instruct-q4_k_m.gguf",
-                                       #"OLMoE-1B-7B-0125-Instruct-Q4_K_M.gguf",
-                                       #"qwen2.5-7b-instruct-q4_k_m.gguf",
-                                       #"Meta-Llama-3.1-8B-Instruct-Q4_K_M.gguf",
-                                       #"gemma-2-9b-it-Q4_K_M.gguf",
-
-                                       #"Qwen2-0.5b-instruct-iq4_xs.gguf",
-                                       #"Qwen2.5-1.5B-Instruct-IQ4_XS.gguf",
-                                       #"Phi-2-iq4_xs.gguf",
-                                       #"Qwen2.5-3B-Instruct-IQ4_XS.gguf",
-                                       #"OLMoE-1B-7B-0125-Instruct-i1-IQ4_XS.gguf",
-                                       #"Qwen2.5-7B-Instruct-IQ4_XS.gguf",
-                                       #"Meta-Llama-3.1-8B-Instruct-IQ4_XS.gguf",
-                                       "gemma-2-9b-it-IQ4_XS.gguf"
-                                   ]
-                                   )
+        models = [
+            #"qwen2-0_5b-instruct-q4_k_m.gguf",
+            #"qwen2.5-1.5b-instruct-q4_k_m.gguf",
+            #"phi-2.Q4_K_M.gguf",
+            #"qwen2.5-3b-instruct-q4_k_m.gguf",
+            #"OLMoE-1B-7B-0125-Instruct-Q4_K_M.gguf",
+            #"qwen2.5-7b-instruct-q4_k_m.gguf",
+            #"Meta-Llama-3.1-8B-Instruct-Q4_K_M.gguf",
+            #"gemma-2-9b-it-Q4_K_M.gguf",
+
+            #"Qwen2-0.5b-instruct-iq4_xs.gguf",
+            #"Qwen2.5-1.5B-Instruct-IQ4_XS.gguf",
+            #"Phi-2-iq4_xs.gguf",
+            #"Qwen2.5-3B-Instruct-IQ4_XS.gguf",
+            #"OLMoE-1B-7B-0125-Instruct-i1-IQ4_XS.gguf",
+            #"Qwen2.5-7B-Instruct-IQ4_XS.gguf",
+            #"Meta-Llama-3.1-8B-Instruct-IQ4_XS.gguf",
+            "gemma-2-9b-it-IQ4_XS.gguf"
+        ]
+        # Variants built by quantization/quant_factory.py are registered in the manifest
+        models += [name for name, entry in sorted(self.model_manifest.items())
+                   if entry.get("source") == "quant_factory" and name not in models]
+        factor_model = FactorModel("model_file", models)
+        cache_factor = FactorModel("cache_state", self.CACHE_STATES)
+        load_factor = FactorModel("load_strategy", self.LOAD_STRATEGIES)
+        kv_factor = FactorModel("kv_cache_type", self.KV_TYPES)
+        fa_factor = FactorModel("flash_attn", self.FLASH_ATTN)
+        affinity_factor = FactorModel("affinity", self.AFFINITY)
+        factors = [factor_model, cache_factor, load_factor, kv_factor, fa_factor]
+        # The other modes size the context themselves (PPL_CTX, _scaling_ctx, n_parallel)
+        if self.RUN_MODE == "summarize":
+            factors.append(FactorModel("ctx_size", self.CTX_SIZES))
+        factors.append(affinity_factor)
+        exclude = []
+        if self.RUN_MODE == "throughput":
+            factors.append(FactorModel("n_parallel", self.PARALLEL))
+        elif self.RUN_MODE == "scaling":
+            factors.append(FactorModel("prompt_length", self.PROMPT_LENGTHS))
+        elif self.RUN_MODE == "summarize":
+            spec_factor = FactorModel("speculation", self.SPECULATION)
+            draft_factor = FactorModel("draft_max", self.DRAFT_MAX)
+            prompt_cache_factor = FactorModel("prompt_cache", self.PROMPT_CACHE)
+            factors += [spec_factor, draft_factor, prompt_cache_factor]
+            # Without speculation the draft length means nothing: one level is enough
+            if len(self.DRAFT_MAX) > 1:
+                exclude.append({spec_factor: ["none"], draft_factor: self.DRAFT_MAX[1:]})
+            no_draft = [m for m in models if m not in self.DRAFT_MODELS]
+            if no_draft:
+                exclude.append({factor_model: no_draft, spec_factor: ["draft"]})
+            # --prompt-cache is a llama-cli option
+            cached = [level for level in self.PROMPT_CACHE if level != "off"]
+            drafted = [level for level in self.SPECULATION if level != "none"]
+            if cached and drafted:
+                exclude.append({spec_factor: drafted, prompt_cache_factor: cached})
+        self.model_levels = models
         
-        self.run_table_model = RunTableModel(
-            factors=[factor_model],
-            repetitions=30,
-            data_columns=[
+        device_columns = [
+            # --- Energy Metrics ---
+            'avg_current',              # Amps
+            'avg_voltage',              # Volts
+            'avg_power',                # Watts
+            'total_energy_consumption', # Joules
+            'energy_per_token',         # Joules/Token (evaluated tokens in perplexity mode, generated tokens in throughput mode)
+            'energy_source',            # battery_manager / rapl / cpu_time_model
+
+            # --- Device Stats ---
+            'battery_capacity',         # Percentage
+            'min_battery_capacity',     # Percentage
+            'max_battery_capacity',     # Percentage
+            'min_temperature',          # Celsius
+            'max_temperature',          # Celsius
+            'average_temperature',      # Celsius
+
+            # --- Model Provenance ---
+            'model_sha256',             # from models_manifest.json, "" if not downloaded by model_downloader.py
+
+            # --- Memory Stats ---
+            'peak_memory',              # MiB
+            'model_weight',             # MiB
+            'KV_cache',                 # MiB
+            'context_RAM',              # MiB
+            'compute_RAM',              # MiB
+            'kv_bytes_per_token',       # KV cache bytes per context cell
+            'kv_types',                 # effective K/V cache types, e.g. "q8_0/f16"
+
+            # --- Thermal / DVFS Stats ---
+            'throttled',                # 0/1, max-frequency cap dropped during the run
+            'time_under_throttle',      # seconds
+            'min_freq_cap_ratio',       # scaling_max_freq / cpuinfo_max_freq
+            'throttled_policies',       # e.g. "policy6;policy7"
+            'avg_cpu_freq_ratio',       # scaling_cur_freq / cpuinfo_max_freq
+            'max_soc_temperature',      # Celsius
+
+            # --- Thread Placement (see AFFINITY_PRESETS) ---
+            'cpus_allowed',             # affinity the process got, e.g. "6-7"
+            'cpus_observed',            # cpu:samples of its threads, e.g. "6:118;7:120"
+            'placement_match',          # share of thread samples on the preset's CPUs
+            'max_threads',              # threads seen in one sample
+
+            # --- Model Load (see LOAD_STRATEGIES) ---
+            'time_to_ready',            # seconds from launch (incl. prefetch) to model loaded
+            'load_energy',              # Joules over the same span
+
+            # --- Page Cache (see WARMUP_POLICY / CACHE_STATES) ---
+            'cache_evicted',            # 0/1, cold run whose page cache was dropped
+            'prefetch_time',            # seconds spent reading the GGUF into the page cache
+
+            # --- Run Cache (see RUN_CACHE) ---
+            'run_key',                  # sha256 of everything that decides the result
+            'cache_hit',                # 0/1, row replayed from .run_cache instead of measured
+        ]
+
+        if self.RUN_MODE == "perplexity":
+            data_columns = [
+                # --- Perplexity (wikitext2 test, see parser/perplexity_parser.py) ---
+                'perplexity',               # final estimate
+                'perplexity_stderr',        # +/- of the final estimate
+                'ppl_chunks',               # chunks evaluated
+                'ppl_n_ctx',                # tokens per chunk
+                'ppl_chunk_values',         # per-chunk PPL, ";"-joined
+                'ppl_tokens',               # tokens evaluated
+                'ppl_eval_time',            # seconds
+                'ppl_eval_speed',           # t/s
+                'load_time',                # seconds, model load
+                *device_columns
+            ]
+        elif self.RUN_MODE == "throughput":
+            data_columns = [
+                # --- Parallel Decoding (see parser/batched_bench_parser.py) ---
+                'prompt_tokens',            # over all sequences
+                'generated_tokens',         # over all sequences
+                'n_kv',                     # KV cells in use at the end
+                'prefill_time',             # seconds
+                'prefill_speed',            # t/s, all sequences
+                'decode_time',              # seconds
+                'aggregate_decode_speed',   # t/s, all sequences
+                'total_time',               # seconds
+                'aggregate_speed',          # (prompt + generated) t/s
+                'seq_latency',              # seconds until one sequence is complete
+                'seq_time_to_first_token',  # seconds
+                'seq_decode_speed',         # t/s seen by one sequence
+                'energy_per_sequence',      # Joules
+                'load_time',                # seconds, model load
+                *device_columns
+            ]
+        elif self.RUN_MODE == "scaling":
+            data_columns = [
+                # --- Prompt-Length Scaling (see scaling_fit.py) ---
+                'input_token_count',        # measured prompt tokens
+                'output_token_count',       # int
+                'n_ctx',                    # -c of the run
+                'prompt_prefill_speed',     # t/s
+                'generation_decoder_speed', # t/s
+                'prefill_latency',          # seconds
+                'generation_latency',       # seconds
+                'inference_latency',        # seconds
+                'time_to_first_token',      # seconds
+                'load_time',                # seconds, model load
+                'metrics_source',           # metrics_file / log
+                'prefill_energy',           # Joules between model loaded and first decode step
+                'decode_energy',            # Joules of the generation phase
+                'prefill_ms_per_token',     # ms / prompt token
+                'prefill_energy_per_token', # Joules / prompt token
+                'decode_ms_per_token',      # ms / generated token
+                'decode_energy_per_token',  # Joules / generated token
+                'kv_fill',                  # mean KV cells in use while decoding
+                *device_columns
+            ]
+        else:
+            data_columns = [
                 'model_response',
-                
+
                 # --- Timing & Speed Metrics ---
                 'input_token_count',        # int
                 'output_token_count',       # int
                 'total_token_count',        # int
-                
+
                 'prompt_prefill_speed',     # t/s
                 'generation_decoder_speed', # t/s
-                
+
                 'prefill_latency',          # seconds
                 'generation_latency',       # seconds
                 'inference_latency',        # seconds
                 'time_to_first_token',      # seconds
-                
-                # --- Energy Metrics ---
-                'avg_current',              # Amps
-                'avg_voltage',              # Volts
-                'avg_power',                # Watts
-                'total_energy_consumption', # Joules
-                'energy_per_token',         # Joules/Token
-                
-                # --- Device Stats ---
-                'battery_capacity',         # Percentage
-                'min_battery_capacity',     # Percentage
-                'max_battery_capacity',     # Percentage
-                'min_temperature',          # Celsius
-                'max_temperature',          # Celsius
-                'average_temperature',      # Celsius
-
-                # --- Memory Stats ---
-                'peak_memory',              # MiB
-                'model_weight',             # MiB
-                'KV_cache',                 # MiB
-                'context_RAM',              # MiB
-                'compute_RAM'               # MiB
+                'load_time',                # seconds, model load
+                'metrics_source',           # metrics_file / log / speculative_log
+
+                # --- Speculative Decoding (see parser/speculative_parser.py) ---
+                'n_drafted',                # tokens proposed by the draft model / n-gram lookup
+                'n_accept',                 # proposed tokens the target accepted
+                'acceptance_rate',          # n_accept / n_drafted
+                'draft_memory',             # MiB, draft weights + draft KV cache
+                'energy_per_accepted_token',# Joules / n_accept
+
+                # --- Prompt Cache (see PROMPT_CACHE, parser/prompt_cache_parser.py) ---
+                'reused_tokens',            # prompt tokens restored from the session file
+                'prefill_energy',           # Joules between model loaded and first decode step
+                'prefill_energy_saved',     # Joules, reused_tokens x off/cold prefill energy per token
+                'cache_file_size',          # MiB, session file after the run
+                'cache_load_time',          # seconds to load the session file
+
+                *device_columns,
+
+                # --- Lexical Quality (vs SOURCE_TEXT, see quality_metrics/lexical_metrics.py) ---
+                *LEXICAL_COLUMNS
             ]
+
+        self.run_table_model = RunTableModel(
+            factors=factors,
+            exclude_combinations=exclude or None,
+            repetitions=30,
+            data_columns=data_columns
         )
         return self.run_table_model
 
     def before_experiment(self) -> None:
-        output.console_log("--> [SETUP] Initializing Device...")
+        output.console_log(f"--> [SETUP] Initializing Device ({self.device.name} backend)...")
         
-        # 1. Clear Logcat
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell logcat -c", shell=True)
-        
-        # 1.1 Prevent screen from turning off
+        # 1. Clear logs, keep the screen on and grant permissions (no-op for the local backend)
         output.console_log("    [SCREEN] Setting timeout to max...")
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell settings put system screen_off_timeout 2147483647", shell=True)
+        self.device.prepare()
 
         # --- SMART FILE SYNC ---
         files_to_sync = []
@@ -136,6 +475,10 @@ class RunnerConfig:
             lib_files = glob.glob(os.path.join(self.LOCAL_LLAMA_BUILD, "lib*.so"))
             files_to_sync.extend(lib_files)
             files_to_sync.append(os.path.join(self.LOCAL_LLAMA_BUILD, self.BINARY_NAME))
+            for binary in self._run_binaries():
+                files_to_sync.append(os.path.join(self.LOCAL_LLAMA_BUILD, binary))
+            if "cold" in self.CACHE_STATES and os.path.exists(os.path.join(self.LOCAL_LLAMA_BUILD, EVICT_HELPER)):
+                files_to_sync.append(os.path.join(self.LOCAL_LLAMA_BUILD, EVICT_HELPER))
         else:
              output.console_log(f"--> WARNING: Local build path not found: {self.LOCAL_LLAMA_BUILD}")
 
@@ -156,88 +499,156 @@ class RunnerConfig:
             remote_path = f"{self.REMOTE_DIR}/{filename}"
             
             # Check if file exists on device
-            check_cmd = f"{self.ADB_PATH} -s {self.DEVICE_ID} shell [ -f \"{remote_path}\" ]"
-            result = subprocess.run(check_cmd, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-            if result.returncode == 0:
+            if self.device.exists(remote_path):
                 output.console_log(f"    [SKIP] Found {filename} on device.")
             else:
                 output.console_log(f"    [PUSH] Pushing {filename}...")
-                subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} push \"{local_path}\" {self.REMOTE_DIR}/", shell=True)
+                self.device.push(f"push {filename}", local_path)
+
+        # 3. Push the thermal and placement samplers (small, always refreshed)
+        self.device.push("push thermal sampler", str(self.THERMAL_SAMPLER))
+        self.device.push("push placement sampler", str(self.PLACEMENT_SAMPLER))
+        # 3.1 Frequency caps of the cool, idle device (before any warm-up inference)
+        self.thermal_baseline = self._record_thermal_baseline()
 
         # 4. Make binary executable
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell chmod +x {self.REMOTE_DIR}/{self.BINARY_NAME}", shell=True)
+        self.device.shell("chmod binary", f"chmod +x {self.REMOTE_DIR}/{self.BINARY_NAME}")
+        for binary in self._run_binaries():
+            self.device.shell(f"chmod {binary}", f"chmod +x {self.REMOTE_DIR}/{binary}")
+        if self.METRICS_FILE and not self._supports_metrics_file():
+            output.console_log(f"--> WARNING: {self.BINARY_NAME} has no --metrics-file, scraping the log instead.")
+            self.METRICS_FILE = ""
+        if len(self.LOAD_STRATEGIES) > 1 and "cold" not in self.CACHE_STATES:
+            output.console_log("--> WARNING: load_strategy without cache_state=cold: warm runs still find "
+                               "the GGUF cached by earlier runs, so load times compare a hot page cache.")
+        # Cold runs only make sense if the page cache can really be dropped
+        if "cold" in self.CACHE_STATES:
+            self.device.shell(f"chmod {EVICT_HELPER}", f"chmod +x {self.REMOTE_DIR}/{EVICT_HELPER}")
+            if not self.device.evict(f"{self.REMOTE_DIR}/{self.model_levels[0]}"):
+                raise RuntimeError(
+                    f"cache_state=cold needs page-cache eviction: build plugins/page_cache/fadvise_dontneed.c "
+                    f"into {self.LOCAL_LLAMA_BUILD} (or use a rooted device), or drop 'cold' from RUNNER_CACHE_STATES")
 
-        # 6. Grant Permissions
-        output.console_log("    Granting permissions...")
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell pm grant com.example.batterymanager_utility android.permission.POST_NOTIFICATIONS", shell=True)
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell dumpsys deviceidle whitelist +com.example.batterymanager_utility", shell=True)
+        # 5. Perplexity mode: the evaluation text (small, always refreshed)
+        if self.RUN_MODE == "perplexity":
+            self.device.push("push wikitext2 text", self._prepare_ppl_text())
+        # Scaling mode: one prompt file per prompt_length and chat format
+        if self.RUN_MODE == "scaling":
+            self.scaling_prompts = self._prepare_scaling_prompts()
+            for path in sorted({path for path, _ in self.scaling_prompts.values()}):
+                self.device.push(f"push {os.path.basename(path)}", path)
 
-        # 7. Warm-Up phase
-        WARMUP_MODEL = "gemma-2-9b-it-IQ4_XS.gguf"
-        
-        article_text = (
-            "The World Wide Web (WWW) was invented by British scientist Tim Berners-Lee "
-            "in 1989. He was working at CERN, the European Organization for Nuclear "
-            "Research, near Geneva, Switzerland. Berners-Lee created the Web to meet "
-            "the demand for automatic information-sharing between scientists in "
-            "universities and institutes around the world."
-            )
+        # 6. Run cache inputs that stay fixed for the whole experiment
+        if self.run_cache is not None:
+            self.cache_inputs = {
+                "device": self.device.serial(),
+                "runner_version": self.RUNNER_VERSION,
+                "backend": self.device.name,
+                "warmup_policy": self.WARMUP_POLICY,
+            }
+            if self.RUN_MODE == "perplexity":
+                self.cache_inputs["ppl_text"] = self.run_cache.file_digest(self.results_output_path / self.PPL_TEXT_FILE)
 
-        cmd = (
-            f"cd {self.REMOTE_DIR} && "
-            f"LD_LIBRARY_PATH=. ./llama-cli "
-            f"-m {WARMUP_MODEL} "
-            f"-p 'Instruct: Summarize the following text.\nText: {article_text}\nOutput:' "
-            f"-st "
-            f"-v "
-            f"-n 100 --ignore-eos "
-            f"-c 512 -t 8 --temp 0 "
-            f"> /dev/null 2>&1"
-        )
-        
-        # Execute
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell \"{cmd}\"", shell=True)
-        output.console_log("--> [WARMUP] Done.")
+        # 7. Warm-Up phase (see WARMUP_POLICY)
+        if self.WARMUP_POLICY == "per_model":
+            warmup_models = self.model_levels
+        elif self.WARMUP_POLICY == "fixed":
+            warmup_models = [self.WARMUP_MODEL]
+        else:
+            warmup_models = []
+        for model in warmup_models:
+            self._warmup(model)
+        if warmup_models:
+            output.console_log("--> [WARMUP] Done.")
         output.console_log("--> [SETUP] Done.")
         output.console_log("--> Waiting for 400 seconds...")
-        time.sleep(200)
+        self.tracer.sleep("post-warmup cool-down", 200 / self.SPEEDUP)
 
     def start_run(self, context: RunnerContext) -> None:
+        # A repetition already in the run cache is replayed: no device work until the next run
+        self.cached_row = None
+        if self.run_cache is not None:
+            self._cache_lookup(context)
+            if self.cached_row is not None:
+                output.console_log(f"--> [CACHE] Replaying stored run {self.run_key[:12]}...")
+                return
+
+        # Session file of a prompt_cache run: deleted (cold) or primed (warm/partial)
+        self._prepare_prompt_cache(context)
+
         # Clear logcat to ensure clean slate for this specific run
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell logcat -c", shell=True)
+        self.device.reset_logs()
+
+        # Page cache state is set here, before the measurement window opens
+        remote_model = f"{self.REMOTE_DIR}/{context.execute_run['model_file']}"
+        self.cache_info = {'cache_evicted': 0, 'prefetch_time': 0.0}
+        if context.execute_run.get("cache_state") == "cold":
+            self.cache_info['cache_evicted'] = int(self.device.evict(remote_model))
+            if not self.cache_info['cache_evicted']:
+                # A warm run must not be recorded under the cold label
+                raise RuntimeError(f"Could not drop {context.execute_run['model_file']} from the page cache for a cold run")
+        elif self.WARMUP_POLICY in ("per_model", "prefetch") and len(self.LOAD_STRATEGIES) == 1:
+            output.console_log("--> [CACHE] Prefetching model...")
+            self.cache_info['prefetch_time'] = round(self.device.prefetch(remote_model), 3)
 
     def start_measurement(self, context: RunnerContext) -> None:
-        output.console_log("--> Starting BatteryManager Service...")
-        # Start service to log 100ms intervals
+        if self.cached_row is not None:
+            return
+        output.console_log("--> Starting Thermal Sampler...")
+        self._start_thermal_sampler("thermal_log.txt")
+
+        # Waits for the llama.cpp process of this run, then samples where its threads run
+        remote_placement_log = f"{self.REMOTE_DIR}/placement_log.txt"
         cmd = (
-            f"{self.ADB_PATH} -s {self.DEVICE_ID} shell am start-foreground-service "
-            f"-n \"com.example.batterymanager_utility/com.example.batterymanager_utility.DataCollectionService\" "
-            f"--ei sampleRate 100 "
-            f"--es \"dataFields\" \"BATTERY_PROPERTY_CURRENT_NOW,EXTRA_VOLTAGE,BATTERY_PROPERTY_CAPACITY,EXTRA_TEMPERATURE\" "
-            f"--ez toCSV False"
+            f"rm -f {remote_placement_log} && "
+            f"nohup sh {self.REMOTE_DIR}/placement_sampler.sh {remote_placement_log} "
+            f"{self.PLACEMENT_SAMPLE_INTERVAL} {self._binary(context)} > /dev/null 2>&1 & "
+            f"echo $! > {self.REMOTE_DIR}/placement_sampler.pid"
         )
-        subprocess.run(cmd, shell=True)
+        self.device.shell("start placement sampler", cmd)
+
+        output.console_log("--> Starting Energy Measurement...")
+        self.device.start_energy()
         # Allow service to spin up
-        time.sleep(2)
+        self.tracer.sleep("service spin-up", 2 / self.SPEEDUP)
 
     def interact(self, context: RunnerContext) -> None:
+        if self.cached_row is not None:
+            return
+
         # REVERTED: Using context.execute_run as originally provided
         model = context.execute_run["model_file"] 
+
+        if self.RUN_MODE == "perplexity":
+            self._interact_perplexity(context, model)
+            return
+        if self.RUN_MODE == "throughput":
+            self._interact_throughput(context, model)
+            return
         
         # Define paths
-        remote_log_file = "/data/local/tmp/llama_output.txt"
+        remote_log_file = f"{self.REMOTE_DIR}/llama_output.txt"
+        remote_metrics_file = f"{self.REMOTE_DIR}/{self.METRICS_FILE}"
         
         # 1. Clean previous logs on device
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell rm -f {remote_log_file}", shell=True)
-
-        context_text = (
-            "The World Wide Web (WWW) was invented by British scientist Tim Berners-Lee "
-            "in 1989. He was working at CERN, the European Organization for Nuclear "
-            "Research, near Geneva, Switzerland. Berners-Lee created the Web to meet "
-            "the demand for automatic information-sharing between scientists in "
-            "universities and institutes around the world."
-            )
+        self.device.shell("rm -f llama_output", f"rm -f {remote_log_file} {self.REMOTE_DIR}/launch_stamps.txt")
+        if self.METRICS_FILE:
+            self.device.shell("rm -f llama_metrics", f"rm -f {remote_metrics_file}")
+
+        cmd = self._llama_command(context, model)
+        
+        output.console_log(f"--> Running Inference on {model}...")
+        
+        # Execute blocking call
+        self.device.shell("llama-cli inference", cmd)
+
+        # 6. Pull the results
+        local_log_file = context.run_dir / "llama_output.txt"
+        self.device.pull("pull llama_output", remote_log_file, local_log_file)
+
+    def _prompt(self, model, text=None):
+        """The summarization prompt (of SOURCE_TEXT by default) in the model's chat format and its end-of-turn token ids."""
+        context_text = self.SOURCE_TEXT if text is None else text
         
         # 2. DYNAMIC PROMPT FORMATTING
         if "gemma" in model.lower():
@@ -276,46 +687,107 @@ class RunnerConfig:
                 f"<|im_start|>assistant\n"
             )
             stop_tokens = [151643, 151645]
+        return final_prompt, stop_tokens
+
+    def _llama_command(self, context, model):
+        remote_log_file = f"{self.REMOTE_DIR}/llama_output.txt"
+        remote_metrics_file = f"{self.REMOTE_DIR}/{self.METRICS_FILE}"
+        final_prompt, stop_tokens = self._prompt(model)
 
         bias_args = " ".join([f"--logit-bias {id}-inf" for id in stop_tokens])
+        if self.RUN_MODE == "scaling":
+            prompt_path, _ = self.scaling_prompts[(model, context.execute_run["prompt_length"])]
+            prompt_args = f"-f {os.path.basename(prompt_path)} "
+            n_ctx = self._scaling_ctx(context)
+        else:
+            prompt_args = f"-p '{final_prompt}' "
+            n_ctx = context.execute_run.get('ctx_size', 512)
+        if self._speculation(context) == "none":
+            # Single turn and the metrics file are llama-cli options
+            single_turn = "-st "
+            metrics_args = f"--metrics-file {remote_metrics_file} " if self.METRICS_FILE else ""
+            draft_args = ""
+            verbose = "-v "
+        else:
+            # Their -v debug lines go to stderr, which is merged into the log with the response
+            single_turn = metrics_args = verbose = ""
+            draft_args = self._draft_flags(context, model)
+        cache_args = self._prompt_cache_flags(context, model)
         # 5. Cmd
         # Ensure we capture stdout/stderr to the file for the parser to work
-        cmd = (
+        return (
             f"cd {self.REMOTE_DIR} && "
-            f"LD_LIBRARY_PATH=. ./llama-cli "
+            f"{self._launch_prefix(context, model)}"
+            f"LD_LIBRARY_PATH=. {self._taskset(context)}./{self._binary(context)} "
             f"-m {model} "
-            f"-p '{final_prompt}' "
-            f"-st "
-            f"-v "
+            f"{self._load_flags(context)}"
+            f"{self._kv_flags(context)}"
+            f"{prompt_args}"
+            f"{single_turn}"
+            f"{verbose}"
             f"-n 100 "
             f"--ignore-eos "
             f"{bias_args} "
-            f"-c 512 -t 8 --temp 0 "
+            f"{metrics_args}"
+            f"{draft_args}"
+            f"{cache_args}"
+            f"-c {n_ctx} -t {self._threads(context)} --temp 0 "
             f"> {remote_log_file} 2>&1"
         )
-        
-        output.console_log(f"--> Running Inference on {model}...")
-        
-        # Execute blocking call
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell \"{cmd}\"", shell=True)
-
-        # 6. Pull the results
-        local_log_file = context.run_dir / "llama_output.txt"
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} pull {remote_log_file} \"{local_log_file}\"", shell=True)
 
     def stop_measurement(self, context: RunnerContext) -> None:
-        output.console_log("--> Stopping BatteryManager Service...")
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell am stopservice com.example.batterymanager_utility/com.example.batterymanager_utility.DataCollectionService", shell=True)
-        
-        # Dump logcat (Battery logs) to file
-        run_log_path = context.run_dir / "run_logcat.txt"
-        with open(run_log_path, "w") as f:
-            subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell logcat -d", stdout=f, shell=True)
+        if self.cached_row is not None:
+            return
+        output.console_log("--> Stopping Energy Measurement...")
+        # Writes run_logcat.txt (adb) or energy_log.json (local) into the run directory
+        self.device.stop_energy(context.run_dir)
+
+        # Stop the thermal sampler and pull its log
+        self.device.shell("stop thermal sampler", f"kill $(cat {self.REMOTE_DIR}/thermal_sampler.pid)")
+        local_thermal_log = context.run_dir / "thermal_log.txt"
+        self.device.pull("pull thermal_log", f"{self.REMOTE_DIR}/thermal_log.txt", local_thermal_log)
+
+        self.device.shell("stop placement sampler", f"kill $(cat {self.REMOTE_DIR}/placement_sampler.pid)")
+        self.device.pull("pull placement_log", f"{self.REMOTE_DIR}/placement_log.txt", context.run_dir / "placement_log.txt")
+
+        # Run outputs other than the log are pulled here, after the energy window
+        self.device.pull("pull launch_stamps", f"{self.REMOTE_DIR}/launch_stamps.txt", context.run_dir / "launch_stamps.txt")
+        if self.METRICS_FILE and self.RUN_MODE in ("summarize", "scaling") and self._speculation(context) == "none":
+            self.device.pull("pull llama_metrics", f"{self.REMOTE_DIR}/{self.METRICS_FILE}", context.run_dir / "llama_metrics.jsonl")
+
+        # Session file size: a device round trip, kept out of the energy window
+        self.prompt_cache_size = self._prompt_cache_size(context)
 
     def populate_run_data(self, context: RunnerContext):
+        # experiment-runner reads the cool-down after every run: a replayed run left the device idle
+        if self.cached_row is not None:
+            self.time_between_runs_in_ms = 0
+            self._record_prefill_baseline(context, self.cached_row)
+            return {**self.cached_row, 'run_key': self.run_key, 'cache_hit': 1}
+        self.time_between_runs_in_ms = type(self).time_between_runs_in_ms
+
+        if self.RUN_MODE == "perplexity":
+            row = self._populate_perplexity_data(context)
+        elif self.RUN_MODE == "throughput":
+            row = self._populate_throughput_data(context)
+        elif self.RUN_MODE == "scaling":
+            row = self._populate_scaling_data(context)
+        else:
+            row = self._populate_summarize_data(context)
+            self._record_prefill_baseline(context, row)
+
+        if self.run_cache is not None:
+            # Failed runs (nothing parsed) are measured again next time
+            if row.get('output_token_count') or row.get('perplexity') or row.get('generated_tokens'):
+                self.run_cache.store(self.run_key, self.run_components, row)
+            row = {**row, 'run_key': self.run_key, 'cache_hit': 0}
+        return row
+
+    def _populate_summarize_data(self, context):
         # --- 1. Load Paths ---
-        battery_log_path = context.run_dir / "run_logcat.txt"
         llama_log_path = context.run_dir / "llama_output.txt"
+        llama_metrics_path = context.run_dir / "llama_metrics.jsonl"
+        thermal_log_path = context.run_dir / "thermal_log.txt"
 
         # --- 2. Process Llama Output (Using updated Parser) ---
         llama_metrics = {
@@ -323,8 +795,9 @@ class RunnerConfig:
             'input_token_count': 0, 'output_token_count': 0, 'total_token_count': 0,
             'prompt_prefill_speed': 0.0, 'generation_decoder_speed': 0.0,
             'prefill_latency': 0.0, 'generation_latency': 0.0, 'inference_latency': 0.0,
-            'time_to_first_token': 0.0
+            'time_to_first_token': 0.0, 'load_time': 0.0
         }
+        metrics_source = ""
         
         # Initialize Memory Metrics default
         memory_metrics = {
@@ -335,86 +808,61 @@ class RunnerConfig:
             "compute_ram_mb": 0.0
         }
         
-        if os.path.exists(llama_log_path):
-            try:
-                # Use the new Robust Parsing Logic
-                llama_metrics = self._parse_llama_log_file(str(llama_log_path))
-                # Parse Memory Metrics
+        # Prefer the structured metrics file; scrape the text log when it is missing
+        structured = None
+        speculative = {}
+        if self._speculation(context) == "none":
+            with self.tracer.span("parse metrics file", cat="parse"):
+                structured = parse_metrics_file(str(llama_metrics_path))
+
+        if self._speculation(context) != "none":
+            # llama-speculative / llama-lookup print their own timing summary
+            metrics_source = "speculative_log"
+            with self.tracer.span("parse speculative log", cat="parse"):
+                speculative = parse_speculative_log(str(llama_log_path)) or {}
+            if speculative:
+                llama_metrics = {key: speculative[key] for key in llama_metrics if key in speculative}
+                llama_metrics['model_response'] = self._speculative_response(
+                    speculative['output_text'], context.execute_run['model_file'])
                 memory_metrics = self._parse_llama_memory(str(llama_log_path))
+        elif structured is not None:
+            llama_metrics = structured
+            memory_metrics = structured
+            if os.path.exists(llama_log_path):
+                # KV cache cells and types are only in the log
+                memory_metrics = {**self._parse_llama_memory(str(llama_log_path)), **structured}
+            metrics_source = "metrics_file"
+        elif os.path.exists(llama_log_path):
+            metrics_source = "log"
+            try:
+                with self.tracer.span("parse llama log", cat="parse"):
+                    # Use the new Robust Parsing Logic
+                    llama_metrics = self._parse_llama_log_file(str(llama_log_path))
+                    # Parse Memory Metrics
+                    memory_metrics = self._parse_llama_memory(str(llama_log_path))
             except Exception as e:
                 output.console_log(f"Error parsing llama logs: {e}")
 
-        # --- 3. Process Battery Logs (Trapezoidal Rule) ---
-        power_readings = []
-        currents_A = []
-        voltages_V = []
-        capacities_pct = []
-        temps_c = []
-        
-        total_energy_joules = 0.0
-        prev_time = None
-        prev_power = None
-        
-        if os.path.exists(battery_log_path):
-            with open(battery_log_path, "r", encoding="utf-8", errors="ignore") as f:
-                for line in f:
-                    if "BatteryMgr:DataCollectionService: stats =>" in line:
-                        try:
-                            csv_part = line.split("stats => ")[1].strip()
-                            parts = csv_part.split(",")
-                            
-                            ts = int(parts[0])
-                            curr_raw = int(parts[1]) # Unit: µA
-                            volt_mV = int(parts[2])  # Unit: mV
-                            cap_pct = int(parts[3])  # Unit: %
-                            temp_raw = int(parts[4]) # Unit: Tenths of °C
-
-                            # --- UNIT CONVERSION ---
-                            time_sec = ts / 1000.0
-                            
-                            # Current: µA -> Amps. Subtract Baseline (0.10A approx).
-                            current_A = max(0, (abs(curr_raw) / 1000000.0) - 0.10)
-                            
-                            # Voltage: mV -> Volts
-                            voltage_V = volt_mV / 1000.0
-
-                            # Temp: Tenths -> Degrees
-                            temp_C_val = temp_raw / 10.0  
-                            
-                            power_W = current_A * voltage_V
-
-                            currents_A.append(current_A)
-                            voltages_V.append(voltage_V)
-                            power_readings.append(power_W)
-                            capacities_pct.append(cap_pct)
-                            temps_c.append(temp_C_val)
-
-                            # Trapezoidal Integration
-                            if prev_time is not None:
-                                dt = time_sec - prev_time
-                                if dt > 0:
-                                    avg_p = (power_W + prev_power) / 2
-                                    total_energy_joules += avg_p * dt
-                            
-                            prev_time = time_sec
-                            prev_power = power_W
-                        except (ValueError, IndexError):
-                            continue
-
-        # --- 4. Aggregate Results ---
-        avg_current = statistics.mean(currents_A) if currents_A else 0
-        avg_voltage = statistics.mean(voltages_V) if voltages_V else 0
-        avg_power = statistics.mean(power_readings) if power_readings else 0
-        avg_capacity = statistics.mean(capacities_pct) if capacities_pct else 0
-        min_battery = min(capacities_pct) if capacities_pct else 0
-        max_battery = max(capacities_pct) if capacities_pct else 0
-        avg_temp = statistics.mean(temps_c) if temps_c else 0
-        min_temp = min(temps_c) if temps_c else 0
-        max_temp = max(temps_c) if temps_c else 0
-
-        # Energy Per Token
+        # --- 2.1 Process Thermal / DVFS Log ---
+        with self.tracer.span("parse thermal log", cat="parse"):
+            thermal_metrics = parse_thermal_log(str(thermal_log_path), self.thermal_baseline)
+
+        # --- 2.2 Lexical metrics of the response against the source prompt ---
+        with self.tracer.span("lexical metrics", cat="parse"):
+            lexical = lexical_metrics(llama_metrics['model_response'], self.SOURCE_TEXT)
+
+        # --- 2.3 Session file of a prompt_cache run ---
+        with self.tracer.span("parse prompt cache", cat="parse"):
+            cache = parse_prompt_cache_log(str(llama_log_path)) or {}
+
+        # --- 3. Process Energy Log (backend specific: BatteryManager logcat, RAPL or CPU-time model) ---
         gen_tokens = llama_metrics.get('output_token_count', 0)
-        energy_per_token = total_energy_joules / gen_tokens if gen_tokens > 0 else 0
+        with self.tracer.span("parse energy log", cat="parse"):
+            energy_metrics = self.device.parse_energy(context.run_dir, gen_tokens)
+            # The session file is loaded between model load and prompt eval: it counts as prefill
+            prefill_energy, _ = self._phase_energy(
+                context, llama_metrics.get('load_time', 0.0),
+                cache.get('cache_load_time', 0.0) + llama_metrics['prefill_latency'], llama_metrics['generation_latency'])
 
         # Return Combined Data
         return {
@@ -434,35 +882,548 @@ class RunnerConfig:
             'generation_latency': llama_metrics['generation_latency'],
             'inference_latency': llama_metrics['inference_latency'],
             'time_to_first_token': llama_metrics['time_to_first_token'],
-            
+            'load_time': llama_metrics.get('load_time', 0.0),
+            'metrics_source': metrics_source,
+
+            # Speculative Decoding
+            'n_drafted': speculative.get('n_drafted', 0),
+            'n_accept': speculative.get('n_accept', 0),
+            'acceptance_rate': speculative.get('acceptance_rate', 0.0),
+            'draft_memory': speculative.get('draft_memory', 0.0),
+            'energy_per_accepted_token': round(energy_metrics['total_energy_consumption'] / speculative['n_accept'], 4)
+                                         if speculative.get('n_accept') else 0.0,
+
+            # Prompt Cache
+            'reused_tokens': cache.get('reused_tokens', 0),
+            'prefill_energy': prefill_energy,
+            'prefill_energy_saved': self._prefill_energy_saved(context, cache.get('reused_tokens', 0)),
+            'cache_file_size': self.prompt_cache_size,
+            'cache_load_time': cache.get('cache_load_time', 0.0),
+
+            **self._device_stats(context, energy_metrics, memory_metrics, thermal_metrics),
+            **self._load_phase(context, llama_metrics.get('load_time', 0.0)),
+
+            # Lexical Quality
+            **{col: lexical[col] for col in LEXICAL_COLUMNS}
+        }
+
+    def _device_stats(self, context, energy_metrics, memory_metrics, thermal_metrics):
+        """Energy, device, provenance, memory, thermal and placement columns shared by both run modes."""
+        kv_cells = memory_metrics.get("kv_cells", 0)
+        with self.tracer.span("parse placement log", cat="parse"):
+            expected_cpus = self.AFFINITY_PRESETS[context.execute_run.get("affinity", "default")][0]
+            placement = parse_placement_log(str(context.run_dir / "placement_log.txt"), expected_cpus)
+        return {
             # Energy & Device Stats
-            'avg_current': round(avg_current, 6),
-            'avg_voltage': round(avg_voltage, 4),
-            'avg_power': round(avg_power, 4),
-            'total_energy_consumption': round(total_energy_joules, 4),
-            'energy_per_token': round(energy_per_token, 4),
-            'battery_capacity': round(avg_capacity, 2),
-            'min_battery_capacity': round(min_battery, 2),
-            'max_battery_capacity': round(max_battery, 2),
-            'average_temperature': round(avg_temp, 2),
-            'min_temperature': round(min_temp, 2),
-            'max_temperature': round(max_temp, 2),
+            'avg_current': energy_metrics['avg_current'],
+            'avg_voltage': energy_metrics['avg_voltage'],
+            'avg_power': energy_metrics['avg_power'],
+            'total_energy_consumption': energy_metrics['total_energy_consumption'],
+            'energy_per_token': energy_metrics['energy_per_token'],
+            'energy_source': energy_metrics['energy_source'],
+            'battery_capacity': energy_metrics['battery_capacity'],
+            'min_battery_capacity': energy_metrics['min_battery_capacity'],
+            'max_battery_capacity': energy_metrics['max_battery_capacity'],
+            'average_temperature': energy_metrics['average_temperature'],
+            'min_temperature': energy_metrics['min_temperature'],
+            'max_temperature': energy_metrics['max_temperature'],
+
+            # Model Provenance
+            'model_sha256': self.model_manifest.get(context.execute_run["model_file"], {}).get("sha256") or "",
 
             # Memory Stats
             'peak_memory': memory_metrics.get("peak_memory_mb", 0.0),
             'model_weight': memory_metrics.get("model_weight_mb", 0.0),
             'KV_cache': memory_metrics.get("kv_cache_size_mb", 0.0),
             'context_RAM': memory_metrics.get("context_ram_mb", 0.0),
-            'compute_RAM': memory_metrics.get("compute_ram_mb", 0.0)
+            'compute_RAM': memory_metrics.get("compute_ram_mb", 0.0),
+            'kv_bytes_per_token': round(memory_metrics.get("kv_cache_size_mb", 0.0) * 1024 * 1024 / kv_cells, 1) if kv_cells else 0.0,
+            'kv_types': memory_metrics.get("kv_types", ""),
+
+            # Thermal / DVFS Stats
+            'throttled': thermal_metrics['throttled'],
+            'time_under_throttle': thermal_metrics['time_under_throttle'],
+            'min_freq_cap_ratio': thermal_metrics['min_freq_cap_ratio'],
+            'throttled_policies': thermal_metrics['throttled_policies'],
+            'avg_cpu_freq_ratio': thermal_metrics['avg_cpu_freq_ratio'],
+            'max_soc_temperature': thermal_metrics['max_soc_temperature'],
+
+            # Thread Placement
+            'cpus_allowed': placement['cpus_allowed'],
+            'cpus_observed': placement['cpus_observed'],
+            'placement_match': placement['placement_match'],
+            'max_threads': placement['max_threads'],
+
+            # Page Cache
+            'cache_evicted': self.cache_info['cache_evicted'],
+            'prefetch_time': self.cache_info['prefetch_time'],
+        }
+
+    def _cache_lookup(self, context):
+        """Sets run_key/run_components of this run and cached_row if its repetition is stored."""
+        model = context.execute_run["model_file"]
+        if self.RUN_MODE == "perplexity":
+            command = self._perplexity_command(context, model)
+        elif self.RUN_MODE == "throughput":
+            command = self._throughput_command(context, model)
+        else:
+            command = self._llama_command(context, model)
+        self.run_components = {
+            **self.cache_inputs,
+            "build": self.run_cache.build_digest(self.LOCAL_LLAMA_BUILD, self._binary(context)),
+            "model": self._model_digest(model),
+            "command": command,
+            "prompt": self._prompt(model)[0] if self.RUN_MODE == "summarize" else "",
+            "factors": {f.factor_name: context.execute_run[f.factor_name] for f in self.run_table_model.factors},
+        }
+        if self.RUN_MODE == "scaling":
+            # The command only names the prompt file: key on its content
+            self.run_components["prompt"] = self.scaling_prompts[(model, context.execute_run["prompt_length"])][1]
+        if self._speculation(context) == "draft":
+            self.run_components["draft_model"] = self._model_digest(self.DRAFT_MODELS[model])
+        self.run_key = RunCache.run_key(self.run_components)
+        repetition = re.search(r"repetition_(\d+)", context.execute_run.get("__run_id", ""))
+        self.cached_row = self.run_cache.get(self.run_key, int(repetition.group(1)) if repetition else 0)
+
+    def _model_digest(self, model):
+        """Manifest sha256 of a GGUF, or the hash of the local file when it was copied in by hand."""
+        manifest_sha = self.model_manifest.get(model, {}).get("sha256")
+        local_model = os.path.join(self.LOCAL_MODEL_PATH, model) if os.path.isdir(self.LOCAL_MODEL_PATH) else self.LOCAL_MODEL_PATH
+        return manifest_sha or self.run_cache.file_digest(local_model)
+
+    def _binary(self, context=None):
+        """llama.cpp binary of the run mode / speculation level (llama-cli is always synced for the warm-up)."""
+        if context is not None and self._speculation(context) != "none":
+            return self.SPECULATIVE_BINARIES[self._speculation(context)]
+        return {"perplexity": self.PERPLEXITY_BINARY, "throughput": self.BATCHED_BENCH_BINARY}.get(self.RUN_MODE, self.BINARY_NAME)
+
+    def _run_binaries(self):
+        """Binaries besides llama-cli this experiment launches."""
+        binaries = {self._binary()}
+        if self.RUN_MODE == "summarize":
+            binaries |= {self.SPECULATIVE_BINARIES[s] for s in self.SPECULATION if s != "none"}
+        return sorted(binaries - {self.BINARY_NAME})
+
+    def _speculation(self, context):
+        return context.execute_run.get("speculation", "none")
+
+    def _draft_flags(self, context, model):
+        draft_max = context.execute_run.get("draft_max", 16)
+        if self._speculation(context) == "draft":
+            return f"-md {self.DRAFT_MODELS[model]} --draft-max {draft_max} "
+        return f"--draft-max {draft_max} "
+
+    def _prompt_cache_file(self, context, model):
+        """
+        Session file of a prompt_cache run. Cold runs share one scratch file; a primed session
+        is named after its model, KV setup, -c and prompt, so it is only reused where it fits.
+        """
+        level = context.execute_run.get("prompt_cache", "off")
+        if level == "cold":
+            return "prompt_cache_cold.bin"
+        prompt = self._prompt(model, self.PARTIAL_CACHE_TEXT if level == "partial" else None)[0]
+        setup = f"{model}\n{self._kv_flags(context)}\n{context.execute_run.get('ctx_size', 512)}\n{prompt}"
+        return f"prompt_cache_{hashlib.sha256(setup.encode('utf-8')).hexdigest()[:12]}.bin"
+
+    def _prompt_cache_flags(self, context, model):
+        """--prompt-cache for the run; timestamps on the log lines give the session load time."""
+        level = context.execute_run.get("prompt_cache", "off")
+        if level == "off":
+            return ""
+        # Primed sessions stay as primed, so every repetition restores the same state
+        read_only = "--prompt-cache-ro " if level != "cold" else ""
+        return f"--prompt-cache {self._prompt_cache_file(context, model)} {read_only}--log-prefix --log-timestamps "
+
+    def _prepare_prompt_cache(self, context):
+        level = context.execute_run.get("prompt_cache", "off")
+        if level == "off":
+            return
+        model = context.execute_run["model_file"]
+        remote_cache = f"{self.REMOTE_DIR}/{self._prompt_cache_file(context, model)}"
+        if level == "cold":
+            self.device.shell("rm -f prompt cache", f"rm -f {remote_cache}")
+            return
+        if self.device.exists(remote_cache):
+            return
+
+        prompt = self._prompt(model, self.PARTIAL_CACHE_TEXT if level == "partial" else None)[0]
+        cmd = (
+            f"cd {self.REMOTE_DIR} && "
+            f"LD_LIBRARY_PATH=. {self._taskset(context)}./{self.BINARY_NAME} "
+            f"-m {model} "
+            f"{self._load_flags(context)}"
+            f"{self._kv_flags(context)}"
+            f"-p '{prompt}' "
+            f"-st "
+            f"-n 1 "
+            f"--prompt-cache {os.path.basename(remote_cache)} "
+            f"-c {context.execute_run.get('ctx_size', 512)} -t {self._threads(context)} --temp 0 "
+            f"> /dev/null 2>&1"
+        )
+        output.console_log(f"--> [PROMPT CACHE] Priming {level} session for {model}...")
+        self.device.shell("prime prompt cache", cmd)
+
+    def _prompt_cache_size(self, context):
+        """MiB of the run's session file on the device (0.0 without --prompt-cache)."""
+        if context.execute_run.get("prompt_cache", "off") == "off":
+            return 0.0
+        remote_cache = f"{self.REMOTE_DIR}/{self._prompt_cache_file(context, context.execute_run['model_file'])}"
+        result = self.device.shell("stat prompt cache", f"stat -c %s {remote_cache}", capture_output=True, text=True)
+        try:
+            return round(int(result.stdout.strip()) / (1024 * 1024), 2)
+        except ValueError:
+            return 0.0
+
+    def _prefill_baseline_key(self, context):
+        """The run's configuration without its prompt_cache level."""
+        return tuple((f.factor_name, context.execute_run[f.factor_name])
+                     for f in self.run_table_model.factors if f.factor_name != "prompt_cache")
+
+    def _record_prefill_baseline(self, context, row):
+        """off/cold runs evaluate the whole prompt: their prefill Joules per token price the reused tokens."""
+        if self.RUN_MODE != "summarize" or context.execute_run.get("prompt_cache", "off") not in ("off", "cold"):
+            return
+        if row.get('prefill_energy') and row.get('input_token_count'):
+            self.prefill_baseline.setdefault(self._prefill_baseline_key(context), []).append(
+                row['prefill_energy'] / row['input_token_count'])
+
+    def _prefill_energy_saved(self, context, reused_tokens):
+        """Prefill energy the reused tokens would have cost; 0.0 until an off/cold run of the configuration was measured."""
+        baseline = self.prefill_baseline.get(self._prefill_baseline_key(context))
+        if not reused_tokens or not baseline:
+            return 0.0
+        return round(reused_tokens * statistics.median(baseline), 4)
+
+    def _load_flags(self, context):
+        return self.LOAD_FLAGS[context.execute_run.get("load_strategy", "mmap")]
+
+    def _taskset(self, context):
+        """`taskset <hex mask> ` for the run's affinity preset ("" without a mask)."""
+        cpus = self.AFFINITY_PRESETS[context.execute_run.get("affinity", "default")][0]
+        if not cpus:
+            return ""
+        mask = sum(1 << cpu for cpu in parse_cpu_list(cpus))
+        return f"taskset {mask:x} "
+
+    def _threads(self, context):
+        return self.AFFINITY_PRESETS[context.execute_run.get("affinity", "default")][1]
+
+    def _kv_flags(self, context):
+        kv_type = context.execute_run.get("kv_cache_type", "f16")
+        if context.execute_run.get("flash_attn") == "on":
+            return f"-ctk {kv_type} -ctv {kv_type} -fa "
+        # A quantized V cache needs flash attention; llama.cpp refuses the context otherwise
+        return f"-ctk {kv_type} "
+
+    def _launch_prefix(self, context, model):
+        """
+        Writes two device timestamps (ns) to launch_stamps.txt: before the load-strategy
+        step and right before llama.cpp starts. With llama.cpp's load time they bound
+        the load phase in the energy samples (see _load_phase).
+        """
+        stamps = f"{self.REMOTE_DIR}/launch_stamps.txt"
+        prefetch = ""
+        if context.execute_run.get("load_strategy") == "mmap_prefetch":
+            prefetch = f"cat {model} > /dev/null && "
+        return f"date +%s%N > {stamps} && {prefetch}date +%s%N >> {stamps} && "
+
+    def _launch_stamps(self, context):
+        """(start_ns, launch_ns) from launch_stamps.txt, None when the run did not write them."""
+        try:
+            with open(context.run_dir / "launch_stamps.txt", "r") as f:
+                start_ns, launch_ns = [int(line) for line in f.read().split()[:2]]
+        except (FileNotFoundError, ValueError):
+            return None
+        return start_ns, launch_ns
+
+    def _phase_energy(self, context, load_time, prefill_time, decode_time):
+        """Joules of the prefill and decode phases, which follow the load phase back to back (see _launch_prefix)."""
+        stamps = self._launch_stamps(context)
+        if stamps is None:
+            return 0.0, 0.0
+        ready_ms = stamps[1] / 1e6 + load_time * 1000.0
+        prefill_end_ms = ready_ms + prefill_time * 1000.0
+        decode_end_ms = prefill_end_ms + decode_time * 1000.0
+        return (self.device.window_energy(context.run_dir, ready_ms, prefill_end_ms),
+                self.device.window_energy(context.run_dir, prefill_end_ms, decode_end_ms))
+
+    def _load_phase(self, context, load_time):
+        stamps = self._launch_stamps(context)
+        if stamps is None:
+            return {'time_to_ready': 0.0, 'load_energy': 0.0}
+
+        start_ns, launch_ns = stamps
+        start_ms = start_ns / 1e6
+        ready_ms = launch_ns / 1e6 + load_time * 1000.0
+        return {
+            'time_to_ready': round((ready_ms - start_ms) / 1000.0, 3),
+            'load_energy': self.device.window_energy(context.run_dir, start_ms, ready_ms),
+        }
+
+    def _warmup(self, model):
+        cmd = (
+            f"cd {self.REMOTE_DIR} && "
+            f"LD_LIBRARY_PATH=. ./llama-cli "
+            f"-m {model} "
+            f"-p 'Instruct: Summarize the following text.\nText: {self.SOURCE_TEXT}\nOutput:' "
+            f"-st "
+            f"-v "
+            f"-n 100 --ignore-eos "
+            f"-c 512 -t 8 --temp 0 "
+            f"> /dev/null 2>&1"
+        )
+        output.console_log(f"--> [WARMUP] {model}...")
+        self.device.shell("warmup inference", cmd)
+
+    def _start_thermal_sampler(self, log_name):
+        # The PID file lets stop_measurement kill the sampler
+        remote_log = f"{self.REMOTE_DIR}/{log_name}"
+        cmd = (
+            f"rm -f {remote_log} && "
+            f"nohup sh {self.REMOTE_DIR}/thermal_sampler.sh {remote_log} "
+            f"{self.THERMAL_SAMPLE_INTERVAL} \"{self.THERMAL_ZONE_FILTER}\" > /dev/null 2>&1 & "
+            f"echo $! > {self.REMOTE_DIR}/thermal_sampler.pid"
+        )
+        self.device.shell("start thermal sampler", cmd)
+
+    def _record_thermal_baseline(self):
+        """Samples the idle device's frequency caps once per experiment (thermal_baseline.txt)."""
+        output.console_log("--> [THERMAL] Recording the frequency-cap baseline...")
+        self._start_thermal_sampler("thermal_baseline.txt")
+        self.tracer.sleep("thermal baseline", self.THERMAL_BASELINE_SECONDS / self.SPEEDUP)
+        self.device.shell("stop thermal sampler", f"kill $(cat {self.REMOTE_DIR}/thermal_sampler.pid)")
+        experiment_path = self.results_output_path / self.name
+        os.makedirs(experiment_path, exist_ok=True)
+        local_path = experiment_path / "thermal_baseline.txt"
+        self.device.pull("pull thermal_baseline", f"{self.REMOTE_DIR}/thermal_baseline.txt", local_path)
+        caps = parse_thermal_baseline(str(local_path))
+        if not caps:
+            output.console_log("--> WARNING: No thermal baseline, caps are compared with cpuinfo_max_freq.")
+        return caps
+
+    def _supports_metrics_file(self):
+        """Whether the pushed llama-cli lists --metrics-file in its --help."""
+        result = self.device.shell(
+            "probe --metrics-file",
+            f"cd {self.REMOTE_DIR} && LD_LIBRARY_PATH=. ./{self.BINARY_NAME} --help 2>&1 | grep -c -- --metrics-file",
+            capture_output=True, text=True)
+        return result.stdout.strip() not in ("", "0")
+
+    def _wikitext(self, max_chars):
+        """The wikitext2 test split as raw text, read until it holds at least max_chars characters."""
+        parts = []
+        n_chars = 0
+        with open(self.PPL_DATASET, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                # Rows keep their trailing newline, empty rows are the blank lines between paragraphs
+                text = row['text'] or "\n"
+                parts.append(text)
+                n_chars += len(text)
+                if n_chars >= max_chars:
+                    break
+        return "".join(parts)
+
+    def _prepare_ppl_text(self):
+        """
+        Joins the wikitext2 test rows into the raw text llama-perplexity reads and cuts it
+        to what PPL_CHUNKS chunks need, so tokenizing the rest of the split stays out of
+        the measurement window. Returns the local path to push.
+        """
+        text = self._wikitext(self.PPL_CHUNKS * self.PPL_CTX * self.PPL_CHARS_PER_TOKEN)
+
+        local_path = self.results_output_path / self.PPL_TEXT_FILE
+        with open(local_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        output.console_log(f"--> [PPL] {len(text)} characters of wikitext2 for {self.PPL_CHUNKS} chunks of {self.PPL_CTX} tokens")
+        return str(local_path)
+
+    def _prepare_scaling_prompts(self):
+        """
+        Writes the prompt of every model / prompt_length: the summarize prompt over a
+        wikitext2 prefix cut at a word boundary. Models with the same chat format share
+        a file (named after its hash). Returns (model, length) -> (local path, sha256).
+        """
+        lengths = sorted({int(n) for n in self.PROMPT_LENGTHS})
+        source = self._wikitext(lengths[-1] * self.PROMPT_CHARS_PER_TOKEN)
+        prompt_dir = self.results_output_path / self.PROMPT_DIR
+        os.makedirs(prompt_dir, exist_ok=True)
+
+        prompts = {}
+        for length in self.PROMPT_LENGTHS:
+            text = source[:int(length) * self.PROMPT_CHARS_PER_TOKEN].rsplit(" ", 1)[0].strip()
+            for model in self.model_levels:
+                prompt = self._prompt(model, text)[0]
+                sha = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+                local_path = prompt_dir / f"prompt_{length}_{sha[:8]}.txt"
+                if not local_path.exists():
+                    with open(local_path, 'w', encoding='utf-8') as f:
+                        f.write(prompt)
+                prompts[(model, length)] = (str(local_path), sha)
+        output.console_log(f"--> [SCALING] {len(set(prompts.values()))} prompt files for lengths {', '.join(self.PROMPT_LENGTHS)}")
+        return prompts
+
+    def _scaling_ctx(self, context):
+        """-c of a scaling run: prompt_length with 25% + 64 cells of headroom, plus the 100 generated tokens."""
+        length = int(context.execute_run["prompt_length"])
+        return (length + length // 4 + 64 + 100 + 255) // 256 * 256
+
+    def _interact_perplexity(self, context, model):
+        remote_log_file = f"{self.REMOTE_DIR}/perplexity_output.txt"
+        self.device.shell("rm -f perplexity_output", f"rm -f {remote_log_file} {self.REMOTE_DIR}/launch_stamps.txt")
+
+        cmd = self._perplexity_command(context, model)
+
+        output.console_log(f"--> Running Perplexity on {model} ({self.PPL_CHUNKS} chunks)...")
+        self.device.shell("llama-perplexity", cmd)
+        self.device.pull("pull perplexity_output", remote_log_file, context.run_dir / "perplexity_output.txt")
+
+    def _perplexity_command(self, context, model):
+        remote_log_file = f"{self.REMOTE_DIR}/perplexity_output.txt"
+        # Same batch and thread settings as the summarize runs; --chunks bounds the run length
+        return (
+            f"cd {self.REMOTE_DIR} && "
+            f"{self._launch_prefix(context, model)}"
+            f"LD_LIBRARY_PATH=. {self._taskset(context)}./{self.PERPLEXITY_BINARY} "
+            f"-m {model} "
+            f"{self._load_flags(context)}"
+            f"{self._kv_flags(context)}"
+            f"-f {self.PPL_TEXT_FILE} "
+            f"-c {self.PPL_CTX} "
+            f"--chunks {self.PPL_CHUNKS} "
+            f"-t {self._threads(context)} "
+            f"> {remote_log_file} 2>&1"
+        )
+
+    def _populate_perplexity_data(self, context):
+        ppl_log_path = context.run_dir / "perplexity_output.txt"
+
+        with self.tracer.span("parse perplexity log", cat="parse"):
+            ppl = parse_perplexity_log(str(ppl_log_path))
+        if ppl is None:
+            output.console_log(f"Error: File '{ppl_log_path}' not found.")
+            ppl = {}
+            memory_metrics = {}
+        else:
+            memory_metrics = self._parse_llama_memory(str(ppl_log_path))
+
+        with self.tracer.span("parse thermal log", cat="parse"):
+            thermal_metrics = parse_thermal_log(str(context.run_dir / "thermal_log.txt"), self.thermal_baseline)
+
+        # Joules per evaluated token: perplexity runs only prefill, nothing is generated
+        with self.tracer.span("parse energy log", cat="parse"):
+            energy_metrics = self.device.parse_energy(context.run_dir, ppl.get('ppl_tokens', 0))
+
+        return {
+            'perplexity': ppl.get('perplexity', 0.0),
+            'perplexity_stderr': ppl.get('perplexity_stderr', 0.0),
+            'ppl_chunks': ppl.get('ppl_chunks', 0),
+            'ppl_n_ctx': ppl.get('ppl_n_ctx', 0),
+            'ppl_chunk_values': ";".join(str(v) for v in ppl.get('ppl_chunk_values', [])),
+            'ppl_tokens': ppl.get('ppl_tokens', 0),
+            'ppl_eval_time': ppl.get('ppl_eval_time', 0.0),
+            'ppl_eval_speed': ppl.get('ppl_eval_speed', 0.0),
+            'load_time': ppl.get('load_time', 0.0),
+
+            **self._device_stats(context, energy_metrics, memory_metrics, thermal_metrics),
+            **self._load_phase(context, ppl.get('load_time', 0.0))
+        }
+
+    def _throughput_command(self, context, model):
+        remote_log_file = f"{self.REMOTE_DIR}/batched_bench_output.txt"
+        n_parallel = int(context.execute_run["n_parallel"])
+        # Synthetic prompts of THROUGHPUT_PP tokens; every sequence gets its own KV cells
+        return (
+            f"cd {self.REMOTE_DIR} && "
+            f"{self._launch_prefix(context, model)}"
+            f"LD_LIBRARY_PATH=. {self._taskset(context)}./{self.BATCHED_BENCH_BINARY} "
+            f"-m {model} "
+            f"{self._load_flags(context)}"
+            f"{self._kv_flags(context)}"
+            f"-c {n_parallel * (self.THROUGHPUT_PP + self.THROUGHPUT_TG)} "
+            f"-npp {self.THROUGHPUT_PP} -ntg {self.THROUGHPUT_TG} -npl {n_parallel} "
+            f"--output-format jsonl "
+            f"-t {self._threads(context)} "
+            f"> {remote_log_file} 2>&1"
+        )
+
+    def _interact_throughput(self, context, model):
+        remote_log_file = f"{self.REMOTE_DIR}/batched_bench_output.txt"
+        self.device.shell("rm -f batched_bench_output", f"rm -f {remote_log_file} {self.REMOTE_DIR}/launch_stamps.txt")
+
+        cmd = self._throughput_command(context, model)
+
+        output.console_log(f"--> Running {context.execute_run['n_parallel']} parallel sequences on {model}...")
+        self.device.shell("llama-batched-bench", cmd)
+        self.device.pull("pull batched_bench_output", remote_log_file, context.run_dir / "batched_bench_output.txt")
+
+    def _populate_throughput_data(self, context):
+        log_path = context.run_dir / "batched_bench_output.txt"
+
+        with self.tracer.span("parse batched-bench log", cat="parse"):
+            bench = parse_batched_bench_log(str(log_path))
+        if bench is None:
+            output.console_log(f"Error: File '{log_path}' not found.")
+            bench = {}
+            memory_metrics = {}
+        else:
+            memory_metrics = self._parse_llama_memory(str(log_path))
+
+        with self.tracer.span("parse thermal log", cat="parse"):
+            thermal_metrics = parse_thermal_log(str(context.run_dir / "thermal_log.txt"), self.thermal_baseline)
+
+        # Joules per generated token over all sequences; the window also holds their prefill
+        with self.tracer.span("parse energy log", cat="parse"):
+            energy_metrics = self.device.parse_energy(context.run_dir, bench.get('generated_tokens', 0))
+
+        n_parallel = bench.get('n_parallel', 0)
+        return {
+            **{col: bench.get(col, 0) for col in (
+                'prompt_tokens', 'generated_tokens', 'n_kv', 'prefill_time', 'prefill_speed',
+                'decode_time', 'aggregate_decode_speed', 'total_time', 'aggregate_speed',
+                'seq_latency', 'seq_time_to_first_token', 'seq_decode_speed', 'load_time')},
+            'energy_per_sequence': round(energy_metrics['total_energy_consumption'] / n_parallel, 4) if n_parallel else 0.0,
+
+            **self._device_stats(context, energy_metrics, memory_metrics, thermal_metrics),
+            **self._load_phase(context, bench.get('load_time', 0.0))
         }
     
+    def _populate_scaling_data(self, context):
+        row = self._populate_summarize_data(context)
+
+        prefill_energy, decode_energy = self._phase_energy(
+            context, row['load_time'], row['prefill_latency'], row['generation_latency'])
+
+        n_prompt, n_generated = row['input_token_count'], row['output_token_count']
+        # The summarize row without the response, its quality and the speculative / prompt cache columns
+        dropped = {'model_response', 'total_token_count', 'n_drafted', 'n_accept', 'acceptance_rate',
+                   'draft_memory', 'energy_per_accepted_token', 'reused_tokens', 'prefill_energy_saved',
+                   'cache_file_size', 'cache_load_time', *LEXICAL_COLUMNS}
+        return {
+            **{col: value for col, value in row.items() if col not in dropped},
+            'n_ctx': self._scaling_ctx(context),
+            'prefill_energy': prefill_energy,
+            'decode_energy': decode_energy,
+            'prefill_ms_per_token': round(row['prefill_latency'] * 1000.0 / n_prompt, 4) if n_prompt else 0.0,
+            'prefill_energy_per_token': round(prefill_energy / n_prompt, 6) if n_prompt else 0.0,
+            'decode_ms_per_token': round(row['generation_latency'] * 1000.0 / n_generated, 4) if n_generated else 0.0,
+            'decode_energy_per_token': round(decode_energy / n_generated, 6) if n_generated else 0.0,
+            'kv_fill': n_prompt + n_generated / 2,
+        }
+
     def after_experiment(self):
-        output.console_log("All experiments complete.")
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell logcat -c", shell=True)
-        output.console_log("Closing BatteryManager App...")
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell am force-stop com.example.batterymanager_utility", shell=True)
-        output.console_log("    [SCREEN] Restoring screen timeout to 2 minutes...")
-        subprocess.run(f"{self.ADB_PATH} -s {self.DEVICE_ID} shell settings put system screen_off_timeout 120000", shell=True)
+        with self.tracer.span("after_experiment", cat="hook"):
+            output.console_log("All experiments complete.")
+            output.console_log("Closing BatteryManager App and restoring screen timeout...")
+            self.device.cleanup()
+            if any(level != "off" for level in self.PROMPT_CACHE) and self.RUN_MODE == "summarize":
+                self.device.shell("rm -f prompt caches", f"rm -f {self.REMOTE_DIR}/prompt_cache_*.bin")
+
+        # Orchestration overhead per phase (open trace.json in ui.perfetto.dev / chrome://tracing)
+        experiment_path = self.results_output_path / self.name
+        os.makedirs(experiment_path, exist_ok=True)
+        self.tracer.save_trace(experiment_path / "trace.json")
+        rows = self.tracer.save_summary(experiment_path / "trace_summary.csv")
+        output.console_log("--> [TRACE] Orchestration overhead per phase:\n" + self.tracer.format_summary(rows))
 
     def _parse_llama_log_file(self, file_path):
         """
@@ -479,7 +1440,8 @@ class RunnerConfig:
             'prefill_latency': 0.0,
             'generation_latency': 0.0,
             'inference_latency': 0.0,
-            'time_to_first_token': 0.0
+            'time_to_first_token': 0.0,
+            'load_time': 0.0
         }
 
         # Regex Patterns
@@ -496,6 +1458,9 @@ class RunnerConfig:
         # 4. Response JSON
         response_pattern = re.compile(r'Parsed message: (\{.*\})')
 
+        # 5. Model Load
+        load_pattern = re.compile(r"load time\s+=\s+(\d+\.\d+)\s+ms")
+
         try:
             with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
                 content = f.read()
@@ -527,6 +1492,10 @@ class RunnerConfig:
                     metrics['inference_latency'] = metrics['prefill_latency'] + metrics['generation_latency']
 
                 metrics['total_token_count'] = metrics['input_token_count'] + metrics['output_token_count']
+
+                load_match = load_pattern.search(content)
+                if load_match:
+                    metrics['load_time'] = float(load_match.group(1)) / 1000.0  # ms -> s
                 
                 # 4. Extract Model Response (JSON Method)
                 response_match = response_pattern.search(content)
@@ -546,6 +1515,19 @@ class RunnerConfig:
         
         return metrics
 
+    def _speculative_response(self, output_text, model):
+        """
+        Generated text of a llama-speculative / llama-lookup run: whatever follows the echoed
+        prompt. The echo renders special tokens, so the chat turn markers after the source
+        text (from _prompt) appear verbatim; the loader log comes before them.
+        """
+        final_prompt = self._prompt(model)[0]
+        for anchor in (final_prompt.split(self.SOURCE_TEXT)[-1].strip(), self.SOURCE_TEXT[-80:].strip()):
+            if anchor and anchor in output_text:
+                return output_text.rsplit(anchor, 1)[-1].strip()
+        # No echo found: better no response than the loader log
+        return ""
+
     def _fallback_clean_response(self, full_text):
         """
         Fallback method if the JSON 'Parsed message' line is missing.
@@ -573,7 +1555,9 @@ class RunnerConfig:
             "peak_memory_mb": 0.0,
             "model_weight_mb": 0.0,
             "context_ram_mb": 0.0,
-            "compute_ram_mb": 0.0
+            "compute_ram_mb": 0.0,
+            "kv_cells": 0,
+            "kv_types": ""
         }
 
         if not os.path.exists(file_path):
@@ -589,6 +1573,12 @@ class RunnerConfig:
         if kv_match:
             metrics["kv_cache_size_mb"] = float(kv_match.group(1))
 
+        # Target: "(   512 cells,  24 layers,  1/1 seqs), K (f16):    3.00 MiB, V (f16):    3.00 MiB"
+        cells_match = re.search(r"llama_kv_cache:\s+size\s+=.*?\(\s*(\d+)\s+cells.*?K \((\w+)\).*?V \((\w+)\)", log_content)
+        if cells_match:
+            metrics["kv_cells"] = int(cells_match.group(1))
+            metrics["kv_types"] = f"{cells_match.group(2)}/{cells_match.group(3)}"
+
         # 2. Extract Memory Breakdown
         # Target: "5612 =  4937 +     168 +     507"
         # Format: Total = Model + Context + Compute
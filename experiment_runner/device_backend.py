@@ -0,0 +1,368 @@
+import ctypes
+import ctypes.util
+import glob
+import json
+import mmap
+import os
+import platform
+import resource
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+from parser.battery_parser import battery_parser, battery_window_energy
+
+BATTERY_SERVICE = "com.example.batterymanager_utility/com.example.batterymanager_utility.DataCollectionService"
+BATTERY_PACKAGE = "com.example.batterymanager_utility"
+# plugins/page_cache/fadvise_dontneed.c, built next to llama-cli
+EVICT_HELPER = "fadvise_dontneed"
+
+# Columns every backend fills from its energy source (see populate_run_data)
+ENERGY_COLUMNS = [
+    'avg_current', 'avg_voltage', 'avg_power', 'total_energy_consumption', 'energy_per_token',
+    'battery_capacity', 'min_battery_capacity', 'max_battery_capacity',
+    'average_temperature', 'min_temperature', 'max_temperature',
+]
+
+
+class DeviceBackend:
+    """
+    Where llama.cpp runs and how its energy is measured. RunnerConfig only talks to
+    this interface; every command goes through the tracer so it shows up in trace.json.
+    """
+    name = "base"
+
+    def __init__(self, tracer, workdir):
+        self.tracer = tracer
+        self.workdir = workdir          # directory holding llama-cli, libs and models
+
+    # --- Commands ---
+    def shell(self, name, cmd, **kwargs):
+        raise NotImplementedError
+
+    def push(self, name, local_path):
+        raise NotImplementedError
+
+    def pull(self, name, remote_path, local_path):
+        raise NotImplementedError
+
+    def exists(self, remote_path):
+        result = self.shell("sync check", f"[ -f \"{remote_path}\" ]", stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return result.returncode == 0
+
+    # --- Lifecycle ---
+    def prepare(self):
+        """Device state control before the experiment."""
+
+    def cleanup(self):
+        """Restore device state after the experiment."""
+
+    def reset_logs(self):
+        """Called at the start of every run."""
+
+    def serial(self):
+        """Stable identifier of the device (part of the run cache key)."""
+        return ""
+
+    # --- Page cache ---
+    def prefetch(self, remote_path):
+        """Reads a file once so the next run finds it in the page cache; returns the seconds taken."""
+        start = time.time()
+        self.shell("prefetch model", f"cat \"{remote_path}\" > /dev/null")
+        return time.time() - start
+
+    def evict(self, remote_path):
+        """Drops a file from the page cache for a cold-start run; returns False if not possible."""
+        return False
+
+    # --- Energy ---
+    def start_energy(self):
+        raise NotImplementedError
+
+    def stop_energy(self, run_dir):
+        raise NotImplementedError
+
+    def parse_energy(self, run_dir, output_tokens):
+        raise NotImplementedError
+
+    def window_energy(self, run_dir, start_ms, end_ms):
+        """Joules between two device epoch timestamps inside the measurement window."""
+        raise NotImplementedError
+
+
+class AdbBackend(DeviceBackend):
+    """Android phone over (wireless) ADB, energy from the BatteryManager logging service."""
+    name = "adb"
+
+    def __init__(self, tracer, workdir, adb_path, device_id):
+        super().__init__(tracer, workdir)
+        self.adb_path = adb_path
+        self.device_id = device_id
+
+    def _adb(self, name, args, **kwargs):
+        """Runs `adb -s DEVICE_ID <args>` as a traced device command."""
+        return self.tracer.run(name, f"{self.adb_path} -s {self.device_id} {args}", shell=True, **kwargs)
+
+    def shell(self, name, cmd, **kwargs):
+        # Quoted once for the host shell, so the device shell sees `cmd` verbatim
+        return self._adb(name, f"shell {shlex.quote(cmd)}", **kwargs)
+
+    def push(self, name, local_path):
+        return self._adb(name, f"push \"{local_path}\" {self.workdir}/")
+
+    def pull(self, name, remote_path, local_path):
+        return self._adb(name, f"pull {remote_path} \"{local_path}\"")
+
+    def prepare(self):
+        # 1. Clear Logcat
+        self.shell("logcat -c", "logcat -c")
+        # 1.1 Prevent screen from turning off
+        self.shell("screen timeout", "settings put system screen_off_timeout 2147483647")
+        # 1.2 Grant Permissions
+        self.shell("grant notifications", f"pm grant {BATTERY_PACKAGE} android.permission.POST_NOTIFICATIONS")
+        self.shell("deviceidle whitelist", f"dumpsys deviceidle whitelist +{BATTERY_PACKAGE}")
+
+    def cleanup(self):
+        self.shell("logcat -c", "logcat -c")
+        self.shell("force-stop BatteryManager", f"am force-stop {BATTERY_PACKAGE}")
+        self.shell("screen timeout", "settings put system screen_off_timeout 120000")
+
+    def reset_logs(self):
+        # Clear logcat to ensure clean slate for this specific run
+        self.shell("logcat -c", "logcat -c")
+
+    def serial(self):
+        # DEVICE_ID is a wireless address that changes between sessions; the hardware serial does not
+        result = self.shell("serial", "getprop ro.serialno", capture_output=True, text=True)
+        return result.stdout.strip() or self.device_id
+
+    def evict(self, remote_path):
+        # posix_fadvise helper: no root needed, fails if the pages stay resident
+        result = self.shell("evict model", f"{self.workdir}/{EVICT_HELPER} \"{remote_path}\"",
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if result.returncode == 0:
+            return True
+        # Without the helper only a rooted device can drop the caches
+        result = self.shell("drop caches", "su -c 'sync; echo 3 > /proc/sys/vm/drop_caches'",
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return result.returncode == 0
+
+    def start_energy(self):
+        # Start service to log 100ms intervals
+        cmd = (
+            f"am start-foreground-service "
+            f"-n \"{BATTERY_SERVICE}\" "
+            f"--ei sampleRate 100 "
+            f"--es \"dataFields\" \"BATTERY_PROPERTY_CURRENT_NOW,EXTRA_VOLTAGE,BATTERY_PROPERTY_CAPACITY,EXTRA_TEMPERATURE\" "
+            f"--ez toCSV False"
+        )
+        self.shell("start BatteryManager service", cmd)
+        # Energy is sampled from here until stopservice
+        self.tracer.open_window()
+
+    def stop_energy(self, run_dir):
+        self.shell("stop BatteryManager service", f"am stopservice {BATTERY_SERVICE}")
+        self.tracer.close_window()
+
+        # Dump logcat (Battery logs) to file
+        with open(run_dir / "run_logcat.txt", "w") as f:
+            self.shell("logcat -d", "logcat -d", stdout=f)
+
+    def parse_energy(self, run_dir, output_tokens):
+        # Trapezoidal integration of baseline-corrected current x voltage
+        metrics = battery_parser(str(run_dir / "run_logcat.txt"), {'output_token_count': output_tokens})
+        energy = {col: metrics.get(col, 0) for col in ENERGY_COLUMNS}
+        energy['energy_source'] = "battery_manager"
+        return energy
+
+    def window_energy(self, run_dir, start_ms, end_ms):
+        return battery_window_energy(str(run_dir / "run_logcat.txt"), start_ms, end_ms)
+
+
+class LocalBackend(DeviceBackend):
+    """
+    llama.cpp as a local subprocess (Linux desktop / CI). Energy comes from the RAPL
+    powercap counters when readable, otherwise from child CPU time x a per-core power model.
+    """
+    name = "local"
+    RAPL_ROOT = "/sys/class/powercap"
+
+    def __init__(self, tracer, workdir, watts_per_core=6.0):
+        super().__init__(tracer, workdir)
+        self.watts_per_core = watts_per_core
+        self._start = None
+
+    def shell(self, name, cmd, **kwargs):
+        os.makedirs(self.workdir, exist_ok=True)
+        return self.tracer.run(name, cmd, shell=True, cwd=self.workdir, **kwargs)
+
+    def push(self, name, local_path):
+        # Symlink instead of copying multi-GB models into the work directory
+        with self.tracer.span(name, cat="cmd"):
+            os.makedirs(self.workdir, exist_ok=True)
+            target = os.path.join(self.workdir, os.path.basename(local_path))
+            if os.path.lexists(target):
+                os.remove(target)
+            os.symlink(os.path.abspath(local_path), target)
+
+    def pull(self, name, remote_path, local_path):
+        with self.tracer.span(name, cat="cmd"):
+            if os.path.exists(remote_path):
+                shutil.copyfile(remote_path, local_path)
+
+    def serial(self):
+        return f"{platform.node()}/{platform.machine()}"
+
+    def evict(self, remote_path):
+        # Clean pages of one file can be dropped without root (follows the workdir symlink);
+        # like plugins/page_cache/fadvise_dontneed.c, fails if more than 1% stays resident
+        if not hasattr(os, "posix_fadvise"):
+            return False
+        with self.tracer.span("evict model", cat="cmd"):
+            try:
+                fd = os.open(remote_path, os.O_RDONLY)
+            except OSError:
+                return False
+            try:
+                # Dirty pages are not dropped until written back
+                os.fdatasync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+                resident, pages = self._residency(fd)
+            except OSError:
+                return False
+            finally:
+                os.close(fd)
+        return resident * 100 <= pages
+
+    @staticmethod
+    def _residency(fd):
+        """(resident pages, total pages) of an open file, from mincore over a read-only mapping."""
+        size = os.fstat(fd).st_size
+        pages = (size + mmap.PAGESIZE - 1) // mmap.PAGESIZE
+        if not size:
+            return 0, 0
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.mmap.restype = ctypes.c_void_p
+        libc.mmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_long]
+        libc.munmap.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        libc.mincore.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_char_p]
+        addr = libc.mmap(None, size, mmap.PROT_READ, mmap.MAP_SHARED, fd, 0)
+        if addr in (None, ctypes.c_void_p(-1).value):
+            raise OSError(ctypes.get_errno(), "mmap failed")
+        try:
+            vec = ctypes.create_string_buffer(pages)
+            if libc.mincore(addr, size, vec) != 0:
+                raise OSError(ctypes.get_errno(), "mincore failed")
+            return sum(b & 1 for b in vec.raw), pages
+        finally:
+            libc.munmap(addr, size)
+
+    # --- Energy ---
+    def _rapl_domains(self):
+        """Top-level package domains only (intel-rapl:0, not intel-rapl:0:0) to avoid double counting."""
+        domains = []
+        for path in sorted(glob.glob(os.path.join(self.RAPL_ROOT, "intel-rapl:*"))):
+            if os.path.basename(path).count(":") == 1 and os.access(os.path.join(path, "energy_uj"), os.R_OK):
+                domains.append(path)
+        return domains
+
+    @staticmethod
+    def _read_int(path):
+        with open(path, "r") as f:
+            return int(f.read().strip())
+
+    def _rapl_snapshot(self):
+        snapshot = {}
+        for domain in self._rapl_domains():
+            try:
+                snapshot[domain] = self._read_int(os.path.join(domain, "energy_uj"))
+            except (OSError, ValueError):
+                continue
+        return snapshot
+
+    @staticmethod
+    def _child_cpu_seconds():
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        return usage.ru_utime + usage.ru_stime
+
+    def start_energy(self):
+        self._start = {
+            "time": time.time(),
+            "cpu": self._child_cpu_seconds(),
+            "rapl": self._rapl_snapshot(),
+        }
+        self.tracer.open_window()
+
+    def stop_energy(self, run_dir):
+        self.tracer.close_window()
+        end_time = time.time()
+        cpu_seconds = self._child_cpu_seconds() - self._start["cpu"]
+        rapl_end = self._rapl_snapshot()
+
+        energy_uj = 0
+        for domain, start_uj in self._start["rapl"].items():
+            if domain not in rapl_end:
+                continue
+            delta = rapl_end[domain] - start_uj
+            if delta < 0:
+                # Counter wrapped around
+                delta += self._read_int(os.path.join(domain, "max_energy_range_uj"))
+            energy_uj += delta
+
+        if self._start["rapl"] and rapl_end:
+            source, energy_j = "rapl", energy_uj / 1e6
+        else:
+            source, energy_j = "cpu_time_model", cpu_seconds * self.watts_per_core
+
+        with open(run_dir / "energy_log.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "source": source,
+                "energy_j": energy_j,
+                "start_time": self._start["time"],
+                "duration_s": end_time - self._start["time"],
+                "cpu_seconds": cpu_seconds,
+                "watts_per_core": self.watts_per_core,
+            }, f, indent=2)
+
+    def parse_energy(self, run_dir, output_tokens):
+        metrics = {col: 0 for col in ENERGY_COLUMNS}
+        metrics['energy_source'] = ""
+        try:
+            with open(run_dir / "energy_log.json", "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return metrics
+
+        energy_j = data.get("energy_j", 0.0)
+        duration_s = data.get("duration_s", 0.0)
+        metrics['energy_source'] = data.get("source", "")
+        metrics['total_energy_consumption'] = round(energy_j, 4)
+        metrics['avg_power'] = round(energy_j / duration_s, 4) if duration_s > 0 else 0
+        metrics['energy_per_token'] = round(energy_j / output_tokens, 4) if output_tokens > 0 else 0
+        return metrics
+
+    def window_energy(self, run_dir, start_ms, end_ms):
+        # RAPL and the CPU-time model only give totals: prorate by the window's share of the run
+        try:
+            with open(run_dir / "energy_log.json", "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return 0.0
+        run_start_ms = data.get("start_time", 0.0) * 1000.0
+        duration_ms = data.get("duration_s", 0.0) * 1000.0
+        overlap_ms = min(end_ms, run_start_ms + duration_ms) - max(start_ms, run_start_ms)
+        if duration_ms <= 0 or overlap_ms <= 0:
+            return 0.0
+        return round(data.get("energy_j", 0.0) * overlap_ms / duration_ms, 4)
+
+
+def make_backend(kind, tracer, **settings):
+    """Factory used by RunnerConfig: kind is "adb" or "local"."""
+    if kind == "adb":
+        return AdbBackend(tracer, settings["remote_dir"], settings["adb_path"], settings["device_id"])
+    if kind == "local":
+        return LocalBackend(tracer, settings["local_workdir"], settings.get("watts_per_core", 6.0))
+    raise ValueError(f"Unknown device backend: {kind}")
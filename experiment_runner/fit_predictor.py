@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import re
+import urllib.parse
+import urllib.request
+from pathlib import Path
+
+from parser.gguf_reader import LongArray, read_gguf_header
+
+MiB = 1024 * 1024
+ROOT_DIR = Path(__file__).parent
+CATALOG_CSV = ROOT_DIR.parent / "scrapers" / "hugging face GGUF Models extract" / "excel" / "gguf_models.csv"
+CATALOG_CACHE = ROOT_DIR.parent / "scrapers" / "hugging face GGUF Models extract" / ".hf_cache"
+HF_ENDPOINT = os.environ.get("HF_ENDPOINT", "https://huggingface.co").rstrip("/")
+
+# --- Device ---
+DEVICE_RAM_MIB = 12 * 1024           # test phone (README: 12 GB)
+USABLE_FRACTION = 0.55               # what Android leaves a foreground process before lmkd steps in
+TIGHT_FRACTION = 0.80                # above this share of the usable budget the fit is "tight"
+DECODE_BANDWIDTH_GBS = 40.0          # sustained CPU read bandwidth; calibrate with `validate`
+
+# --- llama.cpp defaults (RunnerConfig runs -c 512) ---
+N_CTX = 512
+N_UBATCH = 512
+KV_PAD = 256
+
+# Bytes per element of the KV cache types accepted by -ctk / -ctv
+KV_TYPE_BYTES = {
+    "f32": 4.0, "f16": 2.0, "bf16": 2.0,
+    "q8_0": 34 / 32, "q5_1": 24 / 32, "q5_0": 22 / 32, "q4_1": 20 / 32, "q4_0": 18 / 32, "iq4_nl": 18 / 32,
+}
+
+# Interleaved sliding-window attention: every n-th layer is global (llama-model.cpp set_swa_pattern)
+SWA_PATTERNS = {"gemma2": 2, "gemma3": 6, "gemma3n": 5, "cohere2": 4, "llama4": 4}
+
+SHARD_PATTERN = re.compile(r"-(\d{5})-of-(\d{5})\.gguf$")
+
+
+def _per_layer(value, n_layer):
+    return list(value) if isinstance(value, list) else [value] * n_layer
+
+
+def _pad(n, pad):
+    return (n + pad - 1) // pad * pad
+
+
+def hparams(header):
+    """Shapes the memory model needs, with llama.cpp's fallbacks for missing keys."""
+    n_layer = int(header.get("block_count", 0))
+    n_embd = int(header.get("embedding_length", 0))
+    n_head = _per_layer(header.get("attention.head_count", 0), n_layer)
+    n_head_kv = _per_layer(header.get("attention.head_count_kv", header.get("attention.head_count", 0)), n_layer)
+    n_head_max = max(n_head) if n_head else 0
+    head_k = header.get("attention.key_length", n_embd // n_head_max if n_head_max else 0)
+    head_v = header.get("attention.value_length", head_k)
+
+    tokens = header.metadata.get("tokenizer.ggml.tokens")
+    n_vocab = tokens.count if isinstance(tokens, LongArray) else len(tokens or [])
+
+    n_ff = header.get("feed_forward_length", 0)
+    return {
+        "arch": header.arch,
+        "n_layer": n_layer,
+        "n_embd": n_embd,
+        "n_head": n_head_max,
+        "n_head_kv": n_head_kv,
+        "head_k": int(head_k),
+        "head_v": int(head_v),
+        "n_vocab": n_vocab or int(header.get("vocab_size", 0)),
+        "n_ff": max(n_ff) if isinstance(n_ff, list) else int(n_ff),
+        "n_swa": int(header.get("attention.sliding_window", 0) or 0),
+        "n_ctx_train": int(header.get("context_length", 0)),
+    }
+
+
+def kv_cache_bytes(hp, n_ctx=N_CTX, cache_type_k="f16", cache_type_v="f16", n_ubatch=N_UBATCH):
+    cells_full = _pad(n_ctx, KV_PAD)
+    pattern = SWA_PATTERNS.get(hp["arch"])
+    cells_swa = min(cells_full, _pad(hp["n_swa"] + n_ubatch, KV_PAD)) if hp["n_swa"] and pattern else cells_full
+
+    total = 0.0
+    for il in range(hp["n_layer"]):
+        is_swa = pattern is not None and il % pattern < pattern - 1
+        cells = cells_swa if is_swa else cells_full
+        n_kv = hp["n_head_kv"][il]
+        total += cells * n_kv * (hp["head_k"] * KV_TYPE_BYTES[cache_type_k] + hp["head_v"] * KV_TYPE_BYTES[cache_type_v])
+    return total
+
+
+def compute_bytes(hp, n_ctx=N_CTX, n_ubatch=N_UBATCH, flash_attn=False):
+    """
+    CPU compute buffer (f32 activations) for a worst-case n_ubatch graph: the allocator
+    reuses memory between stages, so the peak is the largest stage plus the residual stream.
+    """
+    n_tokens = min(n_ubatch, n_ctx)
+    n_kv = _pad(n_ctx, KV_PAD)
+    logits = hp["n_vocab"] * n_tokens * 4
+    attention = hp["n_embd"] * n_tokens * 4 if flash_attn else hp["n_head"] * n_kv * n_tokens * 4 * 2  # KQ + softmax
+    ffn = hp["n_ff"] * n_tokens * 4 * 3                                                             # gate, up, act
+    residual = hp["n_embd"] * n_tokens * 4 * 3
+    return max(logits, attention, ffn) + residual
+
+
+def decode_bytes_per_token(headers, kv_bytes, kv_fill=0.5):
+    """
+    Memory read for one decoded token: every weight except the embedding table (one row
+    is gathered) unless the output projection is tied to it, plus the filled part of the KV cache.
+    """
+    tensors = [t for h in headers for t in h.tensors]
+    weights = sum(t.n_bytes for t in tensors)
+    if any(t.name == "output.weight" for t in tensors):
+        weights -= sum(t.n_bytes for t in tensors if t.name == "token_embd.weight")
+    return weights + kv_bytes * kv_fill
+
+
+def classify_fit(total_mib, ram_mib=DEVICE_RAM_MIB):
+    usable = ram_mib * USABLE_FRACTION
+    if total_mib <= usable * TIGHT_FRACTION:
+        return "fits", usable - total_mib
+    if total_mib <= usable:
+        return "tight", usable - total_mib
+    return "no", usable - total_mib
+
+
+def predict(headers, n_ctx=N_CTX, cache_type_k="f16", cache_type_v="f16", n_ubatch=N_UBATCH,
+            flash_attn=False, ram_mib=DEVICE_RAM_MIB, bandwidth_gbs=DECODE_BANDWIDTH_GBS):
+    """Prediction for one model; headers holds one GGUFHeader per shard (the first has the metadata)."""
+    if not isinstance(headers, (list, tuple)):
+        headers = [headers]
+    hp = hparams(headers[0])
+
+    weights = sum(h.tensor_bytes for h in headers)
+    kv = kv_cache_bytes(hp, n_ctx, cache_type_k, cache_type_v, n_ubatch)
+    compute = compute_bytes(hp, n_ctx, n_ubatch, flash_attn)
+    per_token = decode_bytes_per_token(headers, kv)
+
+    total_mib = (weights + kv + compute) / MiB
+    fit, headroom = classify_fit(total_mib, ram_mib)
+    return {
+        "arch": hp["arch"],
+        "n_layer": hp["n_layer"],
+        "n_embd": hp["n_embd"],
+        "n_vocab": hp["n_vocab"],
+        "n_ctx": n_ctx,
+        "weights_mib": round(weights / MiB, 2),
+        "kv_cache_mib": round(kv / MiB, 2),
+        "compute_mib": round(compute / MiB, 2),
+        "total_mib": round(total_mib, 2),
+        "fit": fit,
+        "headroom_mib": round(headroom, 1),
+        "decode_mib_per_token": round(per_token / MiB, 2),
+        "predicted_decode_tps": round(bandwidth_gbs * 1e9 / per_token, 2) if per_token else 0.0,
+    }
+
+
+def read_model(location):
+    """All shard headers of a model (model-00001-of-00003.gguf reads the other two as well)."""
+    match = SHARD_PATTERN.search(location)
+    if not match:
+        return [read_gguf_header(location)]
+    n_shards = int(match.group(2))
+    return [read_gguf_header(SHARD_PATTERN.sub(f"-{k:05d}-of-{n_shards:05d}.gguf", location))
+            for k in range(1, n_shards + 1)]
+
+
+# ---------------------------
+# CATALOG RANKING
+# ---------------------------
+def repo_files(repo_id):
+    """File names of a repo: the crawler's cache first, the Hub API otherwise."""
+    cache_path = CATALOG_CACHE / (repo_id.replace("/", "--") + ".json")
+    if cache_path.exists():
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)["details"]["siblings"]
+    url = f"{HF_ENDPOINT}/api/models/{urllib.parse.quote(repo_id, safe='/')}"
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return [s["rfilename"] for s in json.loads(response.read()).get("siblings", [])]
+
+
+def pick_file(files, quant):
+    """The .gguf file of the requested quantization (first shard if split), None if absent."""
+    pattern = re.compile(rf"(?<![A-Za-z0-9]){re.escape(quant)}(?!_?[A-Za-z0-9])", re.IGNORECASE)
+    candidates = sorted(f for f in files if f.lower().endswith(".gguf") and pattern.search(os.path.basename(f)))
+    candidates = [f for f in candidates if not SHARD_PATTERN.search(f) or "-00001-of-" in f]
+    return candidates[0] if candidates else None
+
+
+def rank_catalog(catalog, quant="Q4_K_M", limit=50, **predict_args):
+    """Predictions for the top `limit` catalog rows that ship `quant`, best fit / fastest first."""
+    import pandas as pd
+
+    # Older crawls kept only the model name without its author, which the Hub API cannot resolve
+    if "repo_id" not in catalog.columns:
+        raise ValueError("The catalog has no repo_id column; re-crawl with fetch_models.py first")
+
+    rows = []
+    for _, entry in catalog.head(limit).iterrows():
+        repo_id = entry["repo_id"]
+        row = {"repo_id": repo_id, "likes": entry.get("likes"), "quant": quant}
+        try:
+            filename = pick_file(repo_files(repo_id), quant)
+            if filename is None:
+                continue
+            row["file"] = filename
+            row.update(predict(read_model(f"{HF_ENDPOINT}/{repo_id}/resolve/main/{filename}"), **predict_args))
+        except Exception as e:
+            row["error"] = f"{type(e).__name__}: {e}"
+        rows.append(row)
+        print(f"    {repo_id}: {row.get('fit', row.get('error', ''))}")
+
+    ranked = pd.DataFrame(rows)
+    if "fit" in ranked:
+        ranked["_fit_order"] = ranked["fit"].map({"fits": 0, "tight": 1, "no": 2}).fillna(3)
+        ranked = ranked.sort_values(["_fit_order", "predicted_decode_tps"], ascending=[True, False]).drop(columns="_fit_order")
+    return ranked
+
+
+# ---------------------------
+# VALIDATION
+# ---------------------------
+MEASURED_COLUMNS = {"weights_mib": "model_weight", "kv_cache_mib": "KV_cache", "compute_mib": "compute_RAM"}
+
+
+def validate(run_tables, models_dir, **predict_args):
+    """Predicted vs measured memory per model_file, plus the decode bandwidth implied by the runs."""
+    import pandas as pd
+
+    runs = pd.concat([pd.read_csv(p) for p in run_tables], ignore_index=True)
+    measured = runs.groupby("model_file")[list(MEASURED_COLUMNS.values()) + ["generation_decoder_speed"]].median()
+
+    rows = []
+    for model_file, m in measured.iterrows():
+        path = os.path.join(models_dir, model_file)
+        if not os.path.exists(path):
+            print(f"--> [SKIP] {model_file} not found in {models_dir}")
+            continue
+        p = predict(read_model(path), **predict_args)
+        row = {"model_file": model_file}
+        for predicted_col, measured_col in MEASURED_COLUMNS.items():
+            row[f"{predicted_col}_predicted"] = p[predicted_col]
+            row[f"{predicted_col}_measured"] = m[measured_col]
+            row[f"{predicted_col}_error_pct"] = round(100 * (p[predicted_col] - m[measured_col]) / m[measured_col], 1) \
+                if m[measured_col] else float("nan")
+        # Bandwidth the measured decode speed implies under the same traffic model
+        row["implied_bandwidth_gbs"] = round(p["decode_mib_per_token"] * MiB * m["generation_decoder_speed"] / 1e9, 2)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Predict whether a GGUF model fits the device before downloading it.")
+    parser.add_argument("--ctx", type=int, default=N_CTX, help="-c")
+    parser.add_argument("--ubatch", type=int, default=N_UBATCH, help="-ub")
+    parser.add_argument("--cache-type-k", default="f16", choices=list(KV_TYPE_BYTES))
+    parser.add_argument("--cache-type-v", default="f16", choices=list(KV_TYPE_BYTES))
+    parser.add_argument("--flash-attn", action="store_true")
+    parser.add_argument("--ram-mib", type=float, default=DEVICE_RAM_MIB)
+    parser.add_argument("--bandwidth-gbs", type=float, default=DECODE_BANDWIDTH_GBS)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_predict = sub.add_parser("predict", help="local .gguf paths or http(s) URLs (header only is read)")
+    p_predict.add_argument("models", nargs="+")
+
+    p_rank = sub.add_parser("rank", help="rank catalog entries by predicted fit and decode speed")
+    p_rank.add_argument("--catalog", default=str(CATALOG_CSV))
+    p_rank.add_argument("--quant", default="Q4_K_M")
+    p_rank.add_argument("--limit", type=int, default=50, help="top N catalog rows (by likes) to read headers for")
+    p_rank.add_argument("--output", default="gguf_fit_ranking.csv")
+
+    p_validate = sub.add_parser("validate", help="compare predictions with measured model_weight / KV_cache / compute_RAM")
+    p_validate.add_argument("run_tables", nargs="+")
+    p_validate.add_argument("--models-dir", default=os.environ.get("LOCAL_MODEL_PATH", "."))
+    p_validate.add_argument("--output", default="gguf_fit_validation.csv")
+    args = parser.parse_args()
+
+    predict_args = {
+        "n_ctx": args.ctx, "n_ubatch": args.ubatch, "cache_type_k": args.cache_type_k,
+        "cache_type_v": args.cache_type_v, "flash_attn": args.flash_attn,
+        "ram_mib": args.ram_mib, "bandwidth_gbs": args.bandwidth_gbs,
+    }
+    pd.set_option("display.width", 200)
+
+    if args.command == "predict":
+        rows = []
+        for location in args.models:
+            rows.append({"model": os.path.basename(location), **predict(read_model(location), **predict_args)})
+        print(pd.DataFrame(rows).to_string(index=False))
+
+    elif args.command == "rank":
+        try:
+            ranked = rank_catalog(pd.read_csv(args.catalog), quant=args.quant, limit=args.limit, **predict_args)
+        except ValueError as e:
+            raise SystemExit(f"{args.catalog}: {e}")
+        print(ranked.to_string(index=False))
+        ranked.to_csv(args.output, index=False)
+        print(f"\nSaved: {args.output}")
+
+    elif args.command == "validate":
+        result = validate(args.run_tables, args.models_dir, **predict_args)
+        print(result.to_string(index=False))
+        result.to_csv(args.output, index=False)
+        print(f"\nSaved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+
+# What each KV cache type / flash attention setting saves in memory and costs in decode speed,
+# energy and (perplexity runs) quality, against f16 + no flash attention at the same model and -c.
+
+GROUP = ["model_file", "ctx_size", "kv_cache_type", "flash_attn"]
+BASELINE = {"kv_cache_type": "f16", "flash_attn": "off"}
+# Defaults of run tables recorded before the factors existed
+FACTOR_DEFAULTS = {"ctx_size": 512, "kv_cache_type": "f16", "flash_attn": "off"}
+
+METRICS = [
+    "peak_memory", "KV_cache", "kv_bytes_per_token",
+    "generation_decoder_speed", "prompt_prefill_speed", "ppl_eval_speed",
+    "energy_per_token", "total_energy_consumption", "perplexity",
+]
+# column -> (derived column, sign): savings are positive when the value drops, changes when it rises
+DERIVED = {
+    "peak_memory": ("peak_memory_saved_pct", -1),
+    "KV_cache": ("kv_cache_saved_pct", -1),
+    "generation_decoder_speed": ("decode_speed_change_pct", 1),
+    "prompt_prefill_speed": ("prefill_speed_change_pct", 1),
+    "ppl_eval_speed": ("ppl_eval_speed_change_pct", 1),
+    "energy_per_token": ("energy_per_token_change_pct", 1),
+    "total_energy_consumption": ("session_energy_change_pct", 1),
+    "perplexity": ("perplexity_change_pct", 1),
+}
+
+
+def tradeoffs(runs):
+    """Median per model/-c/KV setting, with changes in % against the baseline of the same model and -c."""
+    import pandas as pd
+
+    for col, default in FACTOR_DEFAULTS.items():
+        if col not in runs.columns:
+            runs[col] = default
+    metrics = [m for m in METRICS if m in runs.columns]
+    medians = runs.groupby(GROUP)[metrics].median().reset_index()
+
+    is_base = (medians["kv_cache_type"] == BASELINE["kv_cache_type"]) & (medians["flash_attn"] == BASELINE["flash_attn"])
+    base = medians[is_base].set_index(["model_file", "ctx_size"])[metrics]
+
+    rows = []
+    for _, row in medians.iterrows():
+        out = row.to_dict()
+        key = (row["model_file"], row["ctx_size"])
+        if key in base.index:
+            reference = base.loc[key]
+            out["peak_memory_saved_mib"] = round(reference["peak_memory"] - row["peak_memory"], 1) \
+                if "peak_memory" in metrics else float("nan")
+            for col, (name, sign) in DERIVED.items():
+                if col in metrics and reference[col]:
+                    # + 0.0 turns the baseline's -0.0 into 0.0
+                    out[name] = round(sign * 100 * (row[col] - reference[col]) / reference[col], 1) + 0.0
+        rows.append(out)
+    return pd.DataFrame(rows)
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Memory saving vs speed/energy cost of the KV cache type, flash attention and -c.")
+    parser.add_argument("run_tables", nargs="+")
+    parser.add_argument("--output", default="memory_tradeoffs.csv")
+    args = parser.parse_args()
+
+    runs = pd.concat([pd.read_csv(p) for p in args.run_tables], ignore_index=True)
+    table = tradeoffs(runs)
+    pd.set_option("display.width", 200)
+    print(table.to_string(index=False))
+    table.to_csv(args.output, index=False)
+    print(f"--> Saved {len(table)} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import random
+import shutil
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from fit_predictor import CATALOG_CSV, HF_ENDPOINT, SHARD_PATTERN, pick_file
+from parser.gguf_reader import SameHostAuthRedirect
+
+MiB = 1024 * 1024
+MANIFEST_NAME = "models_manifest.json"
+BLOB_DIR = ".blobs"             # content-addressed store: <model dir>/.blobs/<sha256>
+CHUNK_SIZE = 32 * MiB           # one range request; also the unit of resume
+READ_BLOCK = 1 * MiB
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+# ---------------------------
+# HTTP
+# ---------------------------
+_OPENER = urllib.request.build_opener(SameHostAuthRedirect)
+
+
+def _request(url, token=None, byte_range=None, timeout=60.0):
+    headers = {}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if byte_range:
+        headers["Range"] = "bytes=%d-%d" % byte_range
+    return _OPENER.open(urllib.request.Request(url, headers=headers), timeout=timeout)
+
+
+def _with_retries(fn, max_retries=8, backoff_max=30.0):
+    """fn() with exponential backoff on connection errors, 429 and 5xx; other errors propagate."""
+    for attempt in range(max_retries + 1):
+        try:
+            return fn()
+        except urllib.error.HTTPError as e:
+            if e.code not in RETRY_STATUS or attempt == max_retries:
+                raise
+            retry_after = e.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+        except (urllib.error.URLError, http.client.HTTPException, ConnectionError, TimeoutError, IncompleteChunk):
+            if attempt == max_retries:
+                raise
+            delay = None
+        if delay is None:
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, min(backoff_max, 0.5 * 2 ** attempt))
+        time.sleep(delay)
+
+
+class IncompleteChunk(Exception):
+    """The connection closed before the requested range was complete."""
+
+
+def list_repo_files(repo_id, token=None):
+    """[{'rfilename', 'size', 'sha256'}] from the Hub API (sha256 only for LFS files)."""
+    url = f"{HF_ENDPOINT}/api/models/{urllib.parse.quote(repo_id, safe='/')}?blobs=true"
+
+    def fetch():
+        with _request(url, token) as response:
+            return json.loads(response.read())
+
+    files = []
+    for sibling in _with_retries(fetch).get("siblings", []):
+        lfs = sibling.get("lfs") or {}
+        files.append({
+            "rfilename": sibling["rfilename"],
+            "size": lfs.get("size", sibling.get("size")),
+            "sha256": lfs.get("sha256"),
+        })
+    return files
+
+
+def select_files(files, quants):
+    """Every file (all shards) of each requested quantization; quants a repo lacks are skipped."""
+    by_name = {f["rfilename"]: f for f in files}
+    selected = []
+    for quant in quants:
+        first = pick_file(list(by_name), quant)
+        if first is None:
+            continue
+        match = SHARD_PATTERN.search(first)
+        if match:
+            n_shards = int(match.group(2))
+            names = [SHARD_PATTERN.sub(f"-{k:05d}-of-{n_shards:05d}.gguf", first) for k in range(1, n_shards + 1)]
+        else:
+            names = [first]
+        selected += [{**by_name[n], "quant": quant.upper()} for n in names if n in by_name]
+    return selected
+
+
+# ---------------------------
+# MANIFEST
+# ---------------------------
+def load_manifest(model_dir):
+    """{file name: entry} of the models downloaded into model_dir ({} if there is no manifest)."""
+    try:
+        with open(os.path.join(model_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)["models"]
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        return {}
+
+
+def _save_manifest(model_dir, models):
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"models": models}, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def update_manifest(model_dir, entries):
+    """Merges entries into the manifest on disk; other tools (quant_factory.py) write it too."""
+    models = load_manifest(model_dir)
+    models.update(entries)
+    _save_manifest(model_dir, models)
+    return models
+
+
+def sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(8 * MiB), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ---------------------------
+# DOWNLOADER
+# ---------------------------
+class Downloader:
+    """
+    Fetches files as CHUNK_SIZE range requests spread over a thread pool, so one large
+    file uses every connection. Each blob is written to <sha256>.part with a .part.json
+    listing finished chunks; an interrupted download resumes from there. Finished blobs
+    are verified against the LFS sha256 and hard-linked under their file names, so a
+    file shared by several repos is stored and downloaded once.
+    """
+
+    def __init__(self, model_dir, workers=8, chunk_size=CHUNK_SIZE, token=None):
+        self.model_dir = model_dir
+        self.blob_dir = os.path.join(model_dir, BLOB_DIR)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.token = token if token is not None else os.environ.get("HF_TOKEN")
+        self.manifest = load_manifest(model_dir)
+        self.stats = {"bytes": 0, "chunks": 0, "resumed_chunks": 0, "deduplicated": 0, "skipped": 0}
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+    # --- Chunk state ---
+    def _state_path(self, blob):
+        return os.path.join(self.blob_dir, f"{blob}.part.json")
+
+    def _load_state(self, blob, size):
+        try:
+            with open(self._state_path(blob), "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state["size"] == size and state["chunk_size"] == self.chunk_size:
+                return state
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+        return {"size": size, "chunk_size": self.chunk_size, "done": []}
+
+    def _save_state(self, blob, state):
+        path = self._state_path(blob)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    # --- Transfer ---
+    def _fetch_chunk(self, url, part_path, start, end):
+        """Writes bytes [start, end] of url at the same offset of part_path."""
+        def fetch():
+            written = 0
+            with _request(url, self.token, (start, end)) as response, open(part_path, "r+b") as f:
+                if response.status != 206 and start > 0:
+                    raise urllib.error.HTTPError(url, 416, "server ignored the Range header", response.headers, None)
+                f.seek(start)
+                for block in iter(lambda: response.read(READ_BLOCK), b""):
+                    f.write(block)
+                    written += len(block)
+            if written != end - start + 1:
+                raise IncompleteChunk(f"{written}/{end - start + 1} bytes")
+            return written
+
+        n_bytes = _with_retries(fetch)
+        with self._lock:
+            self.stats["bytes"] += n_bytes
+            self.stats["chunks"] += 1
+        return n_bytes
+
+    def _link(self, blob, filename):
+        """Hard link blob -> model_dir/filename (copy where links are not supported)."""
+        dest = os.path.join(self.model_dir, os.path.basename(filename))
+        blob_path = os.path.join(self.blob_dir, blob)
+        if os.path.exists(dest):
+            if os.path.samefile(dest, blob_path):
+                return dest
+            os.remove(dest)
+        try:
+            os.link(blob_path, dest)
+        except OSError:
+            shutil.copyfile(blob_path, dest)
+        return dest
+
+    def download(self, repo_id, files):
+        """Downloads files ({'rfilename', 'size', 'sha256', 'quant'}) of one repo; returns the manifest entries."""
+        return self.download_many([(repo_id, f) for f in files])
+
+    def download_many(self, jobs):
+        """jobs: [(repo_id, file)]. All chunks of all files share one pool."""
+        # One transfer per blob, whatever the number of repos / names it appears under
+        blobs = {}
+        for repo_id, f in jobs:
+            name = os.path.basename(f["rfilename"])
+            entry = self.manifest.get(name)
+            if entry and entry.get("sha256") == f.get("sha256") and os.path.exists(os.path.join(self.model_dir, name)):
+                self.stats["skipped"] += 1
+                continue
+            blob = f.get("sha256") or hashlib.sha256(f"{repo_id}/{f['rfilename']}".encode("utf-8")).hexdigest()
+            url = f"{HF_ENDPOINT}/{repo_id}/resolve/main/{urllib.parse.quote(f['rfilename'])}"
+            if blob in blobs:
+                self.stats["deduplicated"] += 1
+            blobs.setdefault(blob, {"url": url, "size": f["size"], "sha256": f.get("sha256"), "targets": []})
+            blobs[blob]["targets"].append((repo_id, f))
+
+        tasks = []
+        states = {}
+        for blob, info in blobs.items():
+            if os.path.exists(os.path.join(self.blob_dir, blob)):
+                # Already verified under another name
+                continue
+            part_path = os.path.join(self.blob_dir, f"{blob}.part")
+            state = self._load_state(blob, info["size"])
+            if not os.path.exists(part_path):
+                state["done"] = []
+                with open(part_path, "wb") as f:
+                    f.truncate(info["size"])
+            states[blob] = state
+            n_chunks = max(1, -(-info["size"] // self.chunk_size))
+            self.stats["resumed_chunks"] += len(state["done"])
+            for index in range(n_chunks):
+                if index in state["done"]:
+                    continue
+                start = index * self.chunk_size
+                end = min(info["size"], start + self.chunk_size) - 1
+                tasks.append((blob, index, start, end))
+
+        remaining = {blob: sum(1 for t in tasks if t[0] == blob) for blob in states}
+        total_bytes = sum(t[3] - t[2] + 1 for t in tasks)
+        print(f"--> {len(blobs)} blobs, {len(tasks)} chunks to fetch ({total_bytes / MiB:.1f} MiB), "
+              f"{self.stats['resumed_chunks']} chunks resumed, {self.stats['deduplicated']} duplicates, "
+              f"{self.stats['skipped']} already present")
+
+        failed = {}
+        start_time = time.time()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(self._fetch_chunk, blobs[blob]["url"], os.path.join(self.blob_dir, f"{blob}.part"), start, end): (blob, index)
+                for blob, index, start, end in tasks
+            }
+            for future in as_completed(futures):
+                blob, index = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed[blob] = e
+                    continue
+                with self._lock:
+                    states[blob]["done"].append(index)
+                    self._save_state(blob, states[blob])
+                remaining[blob] -= 1
+                if remaining[blob] == 0 and blob not in failed:
+                    # Hashing overlaps with the chunks of the other blobs still in flight
+                    self._finalize(blob, blobs[blob], failed)
+
+                elapsed = time.time() - start_time
+                if self.stats["chunks"] % 16 == 0 and elapsed > 0:
+                    print(f"    {self.stats['bytes'] / MiB:.0f}/{total_bytes / MiB:.0f} MiB, "
+                          f"{self.stats['bytes'] / MiB / elapsed:.1f} MiB/s")
+
+        # Blobs with nothing left to fetch (resumed at 100%)
+        for blob in states:
+            if remaining[blob] == 0 and blob not in failed and not os.path.exists(os.path.join(self.blob_dir, blob)):
+                self._finalize(blob, blobs[blob], failed)
+
+        elapsed = time.time() - start_time
+        print(f"--> {self.stats['bytes'] / MiB:.1f} MiB in {elapsed:.1f}s "
+              f"({self.stats['bytes'] / MiB / elapsed if elapsed > 0 else 0:.1f} MiB/s), {len(failed)} failed")
+        for blob, error in failed.items():
+            print(f"    [ERROR] {blobs[blob]['url']}: {type(error).__name__}: {error}")
+
+        entries = {}
+        for blob, info in blobs.items():
+            if blob in failed:
+                continue
+            for repo_id, f in info["targets"]:
+                path = self._link(blob, f["rfilename"])
+                entries[os.path.basename(path)] = {
+                    "repo_id": repo_id,
+                    "file": f["rfilename"],
+                    "quant": f.get("quant", ""),
+                    "size": info["size"],
+                    "sha256": info["sha256"],
+                    "url": info["url"],
+                    "downloaded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                }
+        self.manifest = update_manifest(self.model_dir, entries)
+        return entries
+
+    def _finalize(self, blob, info, failed):
+        part_path = os.path.join(self.blob_dir, f"{blob}.part")
+        if info["sha256"]:
+            digest = sha256_file(part_path)
+            if digest != info["sha256"]:
+                # Corrupt: start this blob from scratch next time
+                os.remove(part_path)
+                os.remove(self._state_path(blob))
+                failed[blob] = ValueError(f"sha256 mismatch ({digest} != {info['sha256']})")
+                return
+        os.replace(part_path, os.path.join(self.blob_dir, blob))
+        os.remove(self._state_path(blob))
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Download GGUF files of catalog entries into LOCAL_MODEL_PATH.")
+    parser.add_argument("repos", nargs="*", help="repo ids (default: the top --limit catalog rows)")
+    parser.add_argument("--quant", nargs="+", default=["Q4_K_M"], help="quantizations to fetch, e.g. Q4_K_M IQ4_XS")
+    parser.add_argument("--catalog", default=str(CATALOG_CSV))
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--model-dir", default=os.environ.get("LOCAL_MODEL_PATH", "models"))
+    parser.add_argument("--workers", type=int, default=8, help="concurrent range requests")
+    parser.add_argument("--chunk-mib", type=int, default=CHUNK_SIZE // MiB)
+    args = parser.parse_args()
+
+    repos = args.repos
+    if not repos:
+        catalog = pd.read_csv(args.catalog)
+        # Older crawls kept only the model name without its author, which the Hub API cannot resolve
+        if "repo_id" not in catalog.columns:
+            raise SystemExit(f"{args.catalog}: no repo_id column; re-crawl with fetch_models.py first")
+        repos = catalog["repo_id"].head(args.limit).tolist()
+
+    jobs = []
+    for repo_id in repos:
+        files = select_files(list_repo_files(repo_id), args.quant)
+        if not files:
+            print(f"    [SKIP] {repo_id}: none of {args.quant}")
+        jobs += [(repo_id, f) for f in files]
+
+    os.makedirs(args.model_dir, exist_ok=True)
+    downloader = Downloader(args.model_dir, workers=args.workers, chunk_size=args.chunk_mib * MiB)
+    entries = downloader.download_many(jobs)
+    print(f"--> {len(entries)} files downloaded, {downloader.stats['skipped']} already in {args.model_dir} "
+          f"(manifest: {MANIFEST_NAME})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import argparse
+import math
+import re
+from pathlib import Path
+
+# Multi-objective view of the stored runs: one row per configuration with the median and a
+# confidence interval of every metric, the Pareto frontier over the chosen objectives
+# (per device/workload) and "best X under these limits" queries.
+
+# Factor columns that identify a configuration; tables recorded before a factor existed lack it
+CONFIG = ["model_file", "cache_state", "load_strategy", "kv_cache_type", "flash_attn", "ctx_size", "affinity", "n_parallel",
+          "speculation", "draft_max", "prompt_cache", "prompt_length"]
+# Columns that split the frontier: one frontier per device and workload (experiment)
+PARTITION = ["device", "experiment"]
+
+# metric -> direction the frontier prefers
+DIRECTIONS = {
+    "energy_per_token": "min",
+    "total_energy_consumption": "min",
+    "peak_memory": "min",
+    "time_to_first_token": "min",
+    "inference_latency": "min",
+    "time_to_ready": "min",
+    "load_energy": "min",
+    "energy_per_accepted_token": "min",
+    "perplexity": "min",
+    "seq_latency": "min",
+    "generation_decoder_speed": "max",
+    "prompt_prefill_speed": "max",
+    "ppl_eval_speed": "max",
+    "aggregate_decode_speed": "max",
+    "acceptance_rate": "max",
+    "Overall_G-Eval": "max",
+    "bertscore_f1": "max",
+}
+DEFAULT_OBJECTIVES = ["perplexity", "energy_per_token", "peak_memory", "time_to_first_token"]
+
+CI_LEVEL = 0.95
+CONDITION = re.compile(r"^\s*([\w\-]+)\s*(<=|>=|<|>)\s*([-+\d\.eE]+)\s*$")
+
+
+def _numeric(series):
+    """Floats from run-table cells and from aggregated cells such as "12.3 (IQR 1.2)"."""
+    import pandas as pd
+
+    if series.dtype == object:
+        series = series.astype(str).str.split(" ").str[0]
+    return pd.to_numeric(series, errors="coerce")
+
+
+def load_runs(paths, drop_throttled=False):
+    """
+    Concatenates run tables (results/<experiment>/run_table.csv). The experiment directory
+    names the workload; throttled runs are dropped only with drop_throttled.
+    """
+    import pandas as pd
+
+    frames = []
+    for path in paths:
+        frame = pd.read_excel(path) if str(path).endswith(".xlsx") else pd.read_csv(path)
+        if "experiment" not in frame.columns:
+            frame["experiment"] = Path(path).parent.name
+        frames.append(frame)
+    runs = pd.concat(frames, ignore_index=True)
+
+    if "__done" in runs.columns:
+        runs = runs[runs["__done"].astype(str) == "DONE"]
+    if drop_throttled and "throttled" in runs.columns:
+        runs = runs[_numeric(runs["throttled"]).fillna(0) == 0]
+    return runs.reset_index(drop=True)
+
+
+def _median_ci_ranks(n, level):
+    """
+    0-based order statistics (lo, hi) bounding the median at `level`: the distribution-free
+    interval x_(k) <= median <= x_(n-k+1), with k the largest rank whose binomial(n, 1/2)
+    tail stays under (1 - level) / 2. With fewer than 9 runs at 95% it is min..max.
+    """
+    alpha = (1 - level) / 2
+    k, tail = 1, 0.0
+    for j in range(n):
+        tail += math.comb(n, j) / 2 ** n
+        if tail > alpha:
+            break
+        k = j + 1
+    k = min(k, (n + 1) // 2)
+    return k - 1, n - k
+
+
+def _median_ci(block, level):
+    """Median and its interval for every row of a (configurations, runs) block, NaNs ignored."""
+    import numpy as np
+
+    block = np.sort(block, axis=1)       # NaNs sort last
+    counts = (~np.isnan(block)).sum(axis=1)
+    median, lo, hi = (np.full(len(block), np.nan) for _ in range(3))
+    # Rows with the same number of valid runs share the ranks
+    for n in np.unique(counts[counts > 0]):
+        rows = np.flatnonzero(counts == n)
+        values = block[rows, :n]
+        lo_rank, hi_rank = _median_ci_ranks(int(n), level)
+        median[rows] = np.median(values, axis=1)
+        lo[rows], hi[rows] = values[:, lo_rank], values[:, hi_rank]
+    return median, lo, hi
+
+
+def summarize(runs, metrics=None, level=CI_LEVEL):
+    """
+    One row per partition and configuration: n_runs, and for every metric the median over
+    its runs with <metric>_lo/<metric>_hi, the confidence interval of the median at `level`.
+    """
+    import numpy as np
+    import pandas as pd
+
+    keys = [c for c in PARTITION + CONFIG if c in runs.columns]
+    metrics = [m for m in (metrics or DIRECTIONS) if m in runs.columns]
+    values = pd.DataFrame({m: _numeric(runs[m]) for m in metrics})
+    values[keys] = runs[keys].fillna("")
+
+    grouped = values.groupby(keys, sort=True)
+    table = grouped.size().rename("n_runs").reset_index()
+    order = np.argsort(grouped.ngroup().to_numpy(), kind="stable")
+    sizes = table["n_runs"].to_numpy()
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    for m in metrics:
+        column = values[m].to_numpy(float)[order]
+        median, lo, hi = (np.full(len(table), np.nan) for _ in range(3))
+        # Configurations with the same number of runs form one rectangular block
+        for n in np.unique(sizes):
+            rows = np.flatnonzero(sizes == n)
+            block = column[starts[rows][:, None] + np.arange(n)]
+            median[rows], lo[rows], hi[rows] = _median_ci(block, level)
+        table[m], table[f"{m}_lo"], table[f"{m}_hi"] = median, lo, hi
+    return table
+
+
+def attach_quality(table, quality):
+    """
+    Copies quality medians (perplexity runs, judge scores) onto the configurations of another
+    workload, matched on the configuration columns both summaries have.
+    """
+    keys = [c for c in CONFIG if c in table.columns and c in quality.columns]
+    added = [c for c in quality.columns if c not in table.columns and c not in PARTITION and c != "n_runs"]
+    # Several quality workloads for one configuration: average them
+    quality = quality.groupby(keys)[added].mean().reset_index()
+    return table.merge(quality, on=keys, how="left")
+
+
+def _non_dominated(points):
+    """
+    Mask of the rows no other row dominates (all objectives <=, one <), objectives minimized.
+    Sorting first means a point can only be dominated by a point before it, so each point is
+    compared against the current frontier only.
+    """
+    import numpy as np
+
+    order = np.lexsort(points.T[::-1])
+    front = []
+    mask = np.zeros(len(points), dtype=bool)
+    for i in order:
+        p = points[i]
+        if front:
+            f = points[front]
+            if np.any(np.all(f <= p, axis=1) & np.any(f < p, axis=1)):
+                continue
+        front.append(i)
+        mask[i] = True
+    return mask
+
+
+def pareto_front(table, objectives=None):
+    """
+    Adds `pareto` (on the frontier of its device/workload) and `pareto_rank` (1 = frontier,
+    2 = frontier once rank 1 is removed, ...). Rows missing an objective get rank 0.
+    """
+    import numpy as np
+
+    objectives = [o for o in (objectives or DEFAULT_OBJECTIVES) if o in table.columns]
+    table = table.copy()
+    table["pareto_rank"] = 0
+    if not objectives:
+        table["pareto"] = False
+        return table
+
+    signs = np.array([-1.0 if DIRECTIONS.get(o, "min") == "max" else 1.0 for o in objectives])
+    keys = [c for c in PARTITION if c in table.columns]
+    groups = [group.index for _, group in table.groupby(keys)] if keys else [table.index]
+    for index in groups:
+        sub = table.loc[index, objectives]
+        sub = sub[sub.notna().all(axis=1)]
+        points = sub.to_numpy(float) * signs
+        remaining = np.arange(len(points))
+        rank = 1
+        while len(remaining):
+            mask = _non_dominated(points[remaining])
+            table.loc[sub.index[remaining[mask]], "pareto_rank"] = rank
+            remaining = remaining[~mask]
+            rank += 1
+    table["pareto"] = table["pareto_rank"] == 1
+    return table
+
+
+def parse_condition(text):
+    """"peak_memory<=4000" -> ("peak_memory", "<=", 4000.0)."""
+    match = CONDITION.match(text)
+    if not match:
+        raise ValueError(f"Cannot parse condition {text!r}, expected e.g. peak_memory<=4000")
+    return match.group(1), match.group(2), float(match.group(3))
+
+
+def query(table, where=(), objective="perplexity", strict=False, limit=10):
+    """
+    Configurations that satisfy every condition, best `objective` first. strict checks the
+    conservative end of the interval (the upper bound of a "<=" limit) instead of the median.
+    """
+    mask = table.index == table.index
+    for text in where:
+        column, op, limit_value = parse_condition(text)
+        if column not in table.columns:
+            raise KeyError(f"Unknown column {column!r}")
+        bound = column
+        if strict and f"{column}_hi" in table.columns:
+            bound = f"{column}_hi" if op in ("<=", "<") else f"{column}_lo"
+        values = table[bound]
+        mask &= {"<=": values <= limit_value, "<": values < limit_value,
+                 ">=": values >= limit_value, ">": values > limit_value}[op]
+
+    result = table[mask & table[objective].notna()]
+    ascending = DIRECTIONS.get(objective, "min") == "min"
+    return result.sort_values(objective, ascending=ascending).head(limit)
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Pareto frontiers and constrained queries over the stored runs.")
+    parser.add_argument("run_tables", nargs="+")
+    parser.add_argument("--quality", nargs="*", default=[],
+                        help="run tables whose quality columns (perplexity, G-Eval) join the configurations")
+    parser.add_argument("--objectives", default=",".join(DEFAULT_OBJECTIVES))
+    parser.add_argument("--where", action="append", default=[], help='limit such as "peak_memory<=4000"; repeatable')
+    parser.add_argument("--best", help="objective of the query; prints the best configurations under --where")
+    parser.add_argument("--strict", action="store_true", help="apply --where to the interval bound instead of the median")
+    parser.add_argument("--drop-throttled", action="store_true", help="leave out runs whose frequency cap dropped")
+    parser.add_argument("--level", type=float, default=CI_LEVEL, help="confidence level of the intervals")
+    parser.add_argument("--output", default="pareto.csv")
+    args = parser.parse_args()
+
+    table = summarize(load_runs(args.run_tables, args.drop_throttled), level=args.level)
+    if args.quality:
+        quality = summarize(load_runs(args.quality, args.drop_throttled), level=args.level)
+        table = attach_quality(table, quality)
+    table = pareto_front(table, [o.strip() for o in args.objectives.split(",") if o.strip()])
+
+    pd.set_option("display.width", 200)
+    if args.best:
+        print(query(table, args.where, args.best, args.strict).to_string(index=False))
+    else:
+        print(table[table["pareto"]].to_string(index=False))
+    table.to_csv(args.output, index=False)
+    print(f"--> Saved {len(table)} configurations ({int(table['pareto'].sum())} on a frontier) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import json
+import re
+
+batched_bench_log_path = "batched_bench_output.txt"
+
+# | PP | TG | B | N_KV | T_PP s | S_PP t/s | T_TG s | S_TG t/s | T s | S t/s |  (--output-format md)
+MD_ROW = re.compile(r"^\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|\s*(\d+)\s*\|" + r"\s*([\d\.]+)\s*\|" * 6)
+MD_KEYS = ["pp", "tg", "pl", "n_kv", "t_pp", "speed_pp", "t_tg", "speed_tg", "t", "speed"]
+LOAD_TIME = re.compile(r"load time\s+=\s+([\d\.]+)\s+ms")
+
+
+def parse_batched_bench_log(batched_bench_log_path):
+    """
+    Parses the output of `llama-batched-bench` (tools/batched-bench in llama.cpp): the
+    --output-format jsonl result lines, or the markdown table of older builds. All pl
+    sequences are decoded in the same batches and finish together, so the per-sequence
+    latency is the wall time of the whole run. Returns None when the file is missing.
+    """
+    metrics = {
+        'n_parallel': 0,               # sequences decoded together (B)
+        'prompt_tokens': 0,            # prompt tokens over all sequences
+        'generated_tokens': 0,         # generated tokens over all sequences
+        'n_kv': 0,                     # KV cells in use at the end
+        'prefill_time': 0.0,           # seconds
+        'prefill_speed': 0.0,          # t/s over all sequences
+        'decode_time': 0.0,            # seconds
+        'aggregate_decode_speed': 0.0, # t/s over all sequences
+        'total_time': 0.0,             # seconds
+        'aggregate_speed': 0.0,        # (prompt + generated) t/s
+        'seq_latency': 0.0,            # seconds until a sequence is complete
+        'seq_time_to_first_token': 0.0,# seconds until a sequence has its first token
+        'seq_decode_speed': 0.0,       # t/s seen by one sequence
+        'load_time': 0.0,              # seconds
+    }
+
+    try:
+        with open(batched_bench_log_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+
+    rows = []
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith("{") and '"speed_tg"' in line:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        else:
+            match = MD_ROW.match(line)
+            if match:
+                rows.append({key: float(value) for key, value in zip(MD_KEYS, match.groups())})
+
+    load = LOAD_TIME.search(content)
+    if load:
+        metrics['load_time'] = float(load.group(1)) / 1000.0
+
+    if not rows:
+        return metrics
+
+    # One -npl level per run; with several, the last one is reported
+    row = rows[-1]
+    pl, pp, tg = int(row["pl"]), int(row["pp"]), int(row["tg"])
+    metrics.update({
+        'n_parallel': pl,
+        'prompt_tokens': pp * pl,
+        'generated_tokens': tg * pl,
+        'n_kv': int(row["n_kv"]),
+        'prefill_time': float(row["t_pp"]),
+        'prefill_speed': float(row["speed_pp"]),
+        'decode_time': float(row["t_tg"]),
+        'aggregate_decode_speed': float(row["speed_tg"]),
+        'total_time': float(row["t"]),
+        'aggregate_speed': float(row["speed"]),
+        'seq_latency': float(row["t"]),
+        # Every sequence is prefilled before the first decode step
+        'seq_time_to_first_token': round(float(row["t_pp"]) + (float(row["t_tg"]) / tg if tg else 0.0), 4),
+        'seq_decode_speed': round(float(row["speed_tg"]) / pl, 2) if pl else 0.0,
+    })
+    return metrics
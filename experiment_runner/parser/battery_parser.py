@@ -102,6 +102,36 @@ def battery_parser(battery_log_path, llama_metrics=None):
         'max_temperature': round(max_temp, 2)
     }
 
+def battery_window_energy(battery_log_path, start_ms, end_ms):
+    """
+    Joules between two device epoch timestamps (ms), with the same baseline correction
+    and trapezoidal integration as battery_parser. Used for the model-load phase.
+    """
+    samples = []
+    try:
+        with open(battery_log_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if "BatteryMgr:DataCollectionService: stats =>" in line:
+                    try:
+                        parts = line.split("stats => ")[1].strip().split(",")
+                        current_A = max(0, (abs(int(parts[1])) / 1000000.0) - 0.10)
+                        samples.append((int(parts[0]), current_A * int(parts[2]) / 1000.0))
+                    except (ValueError, IndexError):
+                        continue
+    except FileNotFoundError:
+        return 0.0
+
+    energy = 0.0
+    for (t0, p0), (t1, p1) in zip(samples, samples[1:]):
+        # Clip each interval to the window, interpolating power at the edges
+        lo, hi = max(t0, start_ms), min(t1, end_ms)
+        if hi <= lo or t1 <= t0:
+            continue
+        p_lo = p0 + (p1 - p0) * (lo - t0) / (t1 - t0)
+        p_hi = p0 + (p1 - p0) * (hi - t0) / (t1 - t0)
+        energy += (p_lo + p_hi) / 2 * (hi - lo) / 1000.0
+    return round(energy, 4)
+
 # Usage Example
 if __name__ == "__main__":
     battery_log_path = "run_logcat.txt"
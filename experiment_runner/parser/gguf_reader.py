@@ -0,0 +1,210 @@
+import mmap
+import os
+import struct
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+
+GGUF_MAGIC = b"GGUF"
+DEFAULT_ALIGNMENT = 32
+
+# ggml type id -> (name, block size, bytes per block); see ggml/src/ggml.c type_traits
+GGML_TYPES = {
+    0: ("F32", 1, 4), 1: ("F16", 1, 2), 2: ("Q4_0", 32, 18), 3: ("Q4_1", 32, 20),
+    6: ("Q5_0", 32, 22), 7: ("Q5_1", 32, 24), 8: ("Q8_0", 32, 34), 9: ("Q8_1", 32, 36),
+    10: ("Q2_K", 256, 84), 11: ("Q3_K", 256, 110), 12: ("Q4_K", 256, 144), 13: ("Q5_K", 256, 176),
+    14: ("Q6_K", 256, 210), 15: ("Q8_K", 256, 292), 16: ("IQ2_XXS", 256, 66), 17: ("IQ2_XS", 256, 74),
+    18: ("IQ3_XXS", 256, 98), 19: ("IQ1_S", 256, 50), 20: ("IQ4_NL", 32, 18), 21: ("IQ3_S", 256, 110),
+    22: ("IQ2_S", 256, 82), 23: ("IQ4_XS", 256, 136), 24: ("I8", 1, 1), 25: ("I16", 1, 2),
+    26: ("I32", 1, 4), 27: ("I64", 1, 8), 28: ("F64", 1, 8), 29: ("IQ1_M", 256, 56),
+    30: ("BF16", 1, 2), 34: ("TQ1_0", 256, 54), 35: ("TQ2_0", 256, 66),
+}
+GGML_TYPE_IDS = {name: type_id for type_id, (name, _, _) in GGML_TYPES.items()}
+
+# GGUF metadata value types -> struct format (8 = string, 9 = array)
+_SCALAR_FORMATS = {0: "B", 1: "b", 2: "H", 3: "h", 4: "I", 5: "i", 6: "f", 7: "?", 10: "Q", 11: "q", 12: "d"}
+_STRING, _ARRAY = 8, 9
+
+# Arrays longer than this (the tokenizer vocabulary, merges, scores) keep only their length
+MAX_ARRAY_ITEMS = 1024
+LongArray = namedtuple("LongArray", ["item_type", "count"])
+
+TensorInfo = namedtuple("TensorInfo", ["name", "shape", "type", "offset", "n_bytes"])
+
+
+class NeedMoreData(Exception):
+    """The header continues past the bytes read so far (remote reads fetch it in chunks)."""
+
+
+class GGUFHeader:
+    """Metadata key/values and tensor descriptors of a GGUF file; no tensor data is read."""
+
+    def __init__(self, version, metadata, tensors, data_offset, header_bytes):
+        self.version = version
+        self.metadata = metadata
+        self.tensors = tensors
+        self.data_offset = data_offset
+        self.header_bytes = header_bytes
+
+    @property
+    def arch(self):
+        return self.metadata.get("general.architecture", "")
+
+    def get(self, key, default=None):
+        """Arch-scoped key, e.g. get('block_count') -> '<arch>.block_count'."""
+        return self.metadata.get(f"{self.arch}.{key}", self.metadata.get(key, default))
+
+    @property
+    def tensor_bytes(self):
+        return sum(t.n_bytes for t in self.tensors)
+
+    def bytes_by_type(self):
+        totals = {}
+        for t in self.tensors:
+            totals[t.type] = totals.get(t.type, 0) + t.n_bytes
+        return totals
+
+
+def tensor_nbytes(shape, type_id):
+    if type_id not in GGML_TYPES:
+        raise ValueError(f"unknown ggml type {type_id}")
+    _, block_size, type_size = GGML_TYPES[type_id]
+    n_elements = 1
+    for dim in shape:
+        n_elements *= dim
+    return n_elements // block_size * type_size
+
+
+class _Cursor:
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 0
+
+    def take(self, n):
+        if self.pos + n > len(self.buf):
+            raise NeedMoreData(self.pos + n)
+        data = self.buf[self.pos:self.pos + n]
+        self.pos += n
+        return data
+
+    def unpack(self, fmt):
+        size = struct.calcsize("<" + fmt)
+        return struct.unpack("<" + fmt, self.take(size))[0]
+
+    def string(self):
+        return bytes(self.take(self.unpack("Q"))).decode("utf-8", errors="replace")
+
+    def skip_string(self):
+        n = self.unpack("Q")
+        self.take(n)
+
+    def value(self, value_type):
+        if value_type == _STRING:
+            return self.string()
+        if value_type == _ARRAY:
+            item_type = self.unpack("I")
+            count = self.unpack("Q")
+            if count <= MAX_ARRAY_ITEMS:
+                return [self.value(item_type) for _ in range(count)]
+            if item_type == _STRING:
+                for _ in range(count):
+                    self.skip_string()
+            elif item_type in _SCALAR_FORMATS:
+                self.take(count * struct.calcsize("<" + _SCALAR_FORMATS[item_type]))
+            else:
+                for _ in range(count):
+                    self.value(item_type)
+            return LongArray(item_type, count)
+        return self.unpack(_SCALAR_FORMATS[value_type])
+
+
+def parse_header(buf):
+    """GGUFHeader from the first bytes of a file; NeedMoreData if buf ends inside the header."""
+    cur = _Cursor(buf)
+    if bytes(cur.take(4)) != GGUF_MAGIC:
+        raise ValueError("not a GGUF file")
+    version = cur.unpack("I")
+    if version < 2:
+        raise ValueError(f"GGUF v{version} is not supported")
+    n_tensors = cur.unpack("Q")
+    n_kv = cur.unpack("Q")
+
+    metadata = {}
+    for _ in range(n_kv):
+        key = cur.string()
+        metadata[key] = cur.value(cur.unpack("I"))
+
+    raw_tensors = []
+    for _ in range(n_tensors):
+        name = cur.string()
+        n_dims = cur.unpack("I")
+        shape = [cur.unpack("Q") for _ in range(n_dims)]
+        type_id = cur.unpack("I")
+        offset = cur.unpack("Q")
+        raw_tensors.append((name, shape, type_id, offset))
+
+    alignment = metadata.get("general.alignment", DEFAULT_ALIGNMENT)
+    data_offset = (cur.pos + alignment - 1) // alignment * alignment
+    tensors = [
+        TensorInfo(name, shape, GGML_TYPES.get(type_id, (str(type_id),))[0], offset, tensor_nbytes(shape, type_id))
+        for name, shape, type_id, offset in raw_tensors
+    ]
+    return GGUFHeader(version, metadata, tensors, data_offset, cur.pos)
+
+
+def read_local(path):
+    """Header of a local file, through mmap so only the header pages are touched."""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_header(memoryview(mm))
+
+
+class SameHostAuthRedirect(urllib.request.HTTPRedirectHandler):
+    """
+    Follows redirects but keeps Authorization only while the host stays the same, as
+    huggingface_hub does: /resolve/ answers with a 302 to a CDN whose presigned URLs
+    must not receive the token (and may reject requests that carry one).
+    """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        new_req = super().redirect_request(req, fp, code, msg, headers, newurl)
+        if new_req is not None and urllib.parse.urlsplit(newurl).netloc != urllib.parse.urlsplit(req.full_url).netloc:
+            new_req.remove_header("Authorization")
+        return new_req
+
+
+_OPENER = urllib.request.build_opener(SameHostAuthRedirect)
+
+
+def read_remote(url, token=None, chunk_size=1 << 20, max_bytes=256 << 20, timeout=30.0):
+    """
+    Header of a remote file with HTTP range requests: chunk_size bytes first, then more
+    until the header parses. Large vocabularies put the header at a few MB.
+    """
+    headers = {}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+
+    buf = bytearray()
+    want = chunk_size
+    while True:
+        request = urllib.request.Request(url, headers={**headers, "Range": f"bytes={len(buf)}-{want - 1}"})
+        with _OPENER.open(request, timeout=timeout) as response:
+            data = response.read()
+            if response.status == 200:
+                # Server ignored the range and sent the whole file
+                buf = bytearray(data)
+            else:
+                buf.extend(data)
+        try:
+            return parse_header(memoryview(bytes(buf)))
+        except NeedMoreData as e:
+            if len(buf) < want or want >= max_bytes:
+                raise ValueError(f"GGUF header of {url} is incomplete after {len(buf)} bytes") from e
+            want = min(max(want * 2, e.args[0] + chunk_size), max_bytes)
+
+
+def read_gguf_header(location, token=None):
+    if location.startswith(("http://", "https://")):
+        return read_remote(location, token=token or os.environ.get("HF_TOKEN"))
+    return read_local(location)
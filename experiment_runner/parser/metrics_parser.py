@@ -0,0 +1,112 @@
+import json
+
+metrics_file_path = "llama_metrics.jsonl"
+
+MIB = 1024.0 * 1024.0
+
+def parse_metrics_file(metrics_file_path):
+    """
+    Reads the JSONL file written by `llama-cli --metrics-file` (common_perf_write in
+    android-app/common/sampling.cpp). One object per line, keyed by "type":
+    perf, memory (one per buffer type), token (one per generated token) and response.
+
+    Returns None when the file is missing or has no perf record, so the caller can
+    fall back to scraping llama_output.txt.
+    """
+    metrics = {
+        'model_response': '',
+        'input_token_count': 0,
+        'output_token_count': 0,
+        'total_token_count': 0,
+        'prompt_prefill_speed': 0.0,
+        'generation_decoder_speed': 0.0,
+        'prefill_latency': 0.0,
+        'generation_latency': 0.0,
+        'inference_latency': 0.0,
+        'time_to_first_token': 0.0,
+        'load_time': 0.0,               # seconds
+        'sampling_time': 0.0,           # seconds
+        'token_timestamps': [],         # ms since context start, one per generated token
+
+        # Memory, summed over buffer types
+        'peak_memory_mb': 0.0,
+        'model_weight_mb': 0.0,
+        'kv_cache_size_mb': 0.0,
+        'context_ram_mb': 0.0,
+        'compute_ram_mb': 0.0,
+        'memory_buffers': {},           # buffer name -> {model, context, compute} MiB
+    }
+
+    perf = None
+    tokens = []
+
+    try:
+        with open(metrics_file_path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A killed run can leave a partial last line
+                    continue
+
+                kind = record.get('type')
+                if kind == 'perf':
+                    perf = record
+                elif kind == 'memory':
+                    metrics['memory_buffers'][record.get('buffer', '')] = {
+                        'model': record.get('model_bytes', 0) / MIB,
+                        'context': record.get('context_bytes', 0) / MIB,
+                        'compute': record.get('compute_bytes', 0) / MIB,
+                    }
+                elif kind == 'token':
+                    tokens.append(record)
+                elif kind == 'response':
+                    metrics['model_response'] = record.get('text', '')
+
+    except FileNotFoundError:
+        return None
+
+    if perf is None:
+        return None
+
+    # --- Timing ---
+    prefill_ms = perf.get('t_prompt_eval_ms', 0.0)
+    eval_ms = perf.get('t_eval_ms', 0.0)
+
+    metrics['input_token_count'] = perf.get('n_prompt_eval', 0)
+    metrics['output_token_count'] = perf.get('n_eval', 0)
+    metrics['total_token_count'] = metrics['input_token_count'] + metrics['output_token_count']
+
+    metrics['prefill_latency'] = prefill_ms / 1000.0
+    metrics['generation_latency'] = eval_ms / 1000.0
+    metrics['inference_latency'] = perf.get('t_total_ms', prefill_ms + eval_ms) / 1000.0
+    metrics['load_time'] = perf.get('t_load_ms', 0.0) / 1000.0
+    metrics['sampling_time'] = perf.get('t_sample_ms', 0.0) / 1000.0
+
+    if prefill_ms > 0:
+        metrics['prompt_prefill_speed'] = round(1000.0 * metrics['input_token_count'] / prefill_ms, 2)
+    if eval_ms > 0:
+        metrics['generation_decoder_speed'] = round(1000.0 * metrics['output_token_count'] / eval_ms, 2)
+
+    # Measured instead of estimated as prefill + one decode step
+    tokens.sort(key=lambda t: t.get('i', 0))
+    metrics['token_timestamps'] = [t.get('t_ms', 0.0) for t in tokens]
+    if metrics['token_timestamps']:
+        metrics['time_to_first_token'] = metrics['token_timestamps'][0] / 1000.0
+    elif eval_ms > 0 and metrics['output_token_count'] > 0:
+        metrics['time_to_first_token'] = metrics['prefill_latency'] + (eval_ms / metrics['output_token_count']) / 1000.0
+
+    # --- Memory ---
+    buffers = metrics['memory_buffers'].values()
+    metrics['model_weight_mb'] = round(sum(b['model'] for b in buffers), 2)
+    metrics['kv_cache_size_mb'] = round(sum(b['context'] for b in buffers), 2)
+    metrics['context_ram_mb'] = metrics['kv_cache_size_mb']
+    metrics['compute_ram_mb'] = round(sum(b['compute'] for b in buffers), 2)
+    metrics['peak_memory_mb'] = round(metrics['model_weight_mb'] + metrics['context_ram_mb'] + metrics['compute_ram_mb'], 2)
+
+    return metrics
+
+# Usage Example
+if __name__ == "__main__":
+    result = parse_metrics_file(metrics_file_path)
+    print(json.dumps(result, indent=4))
@@ -0,0 +1,92 @@
+import math
+import re
+
+perplexity_log_path = "llama_output.txt"
+
+RUNNING_PPL = re.compile(r"\[(\d+)\](\d+\.\d+|inf|nan)")
+FINAL_PPL = re.compile(r"Final estimate: PPL = ([\d\.]+) \+/- ([\d\.]+)")
+CHUNK_HEADER = re.compile(r"calculating perplexity over (\d+) chunks, n_ctx=(\d+)")
+TOKENIZE_TIME = re.compile(r"tokenization took ([\d\.]+) ms")
+LOAD_TIME = re.compile(r"load time\s+=\s+([\d\.]+)\s+ms")
+PROMPT_EVAL = re.compile(r"prompt eval time\s+=\s+([\d\.]+)\s+ms\s+/\s+(\d+)\s+tokens.*?([\d\.]+)\s+tokens per second")
+
+
+def chunk_perplexities(running):
+    """
+    Per-chunk PPL from the running values llama-perplexity prints ([k] = exp(mean NLL
+    over chunks 1..k)); every chunk scores the same number of tokens, so chunk k's
+    mean NLL is k * ln(running_k) - (k - 1) * ln(running_k-1).
+    """
+    chunks = []
+    prev_log = 0.0
+    for k, ppl in enumerate(running, start=1):
+        # A diverged model prints inf/nan; every chunk from there on is unknown
+        log_ppl = math.log(ppl) if ppl > 0 and math.isfinite(ppl) else float("nan")
+        chunks.append(round(math.exp(k * log_ppl - (k - 1) * prev_log), 4))
+        prev_log = log_ppl
+    return chunks
+
+
+def parse_perplexity_log(perplexity_log_path):
+    """
+    Parses the output of `llama-perplexity` (tools/perplexity in llama.cpp): the final
+    estimate, the per-chunk values and the llama_perf timings of the evaluation.
+    Returns None when the file is missing.
+    """
+    metrics = {
+        'perplexity': 0.0,
+        'perplexity_stderr': 0.0,
+        'ppl_chunks': 0,               # chunks evaluated
+        'ppl_n_ctx': 0,                # tokens per chunk
+        'ppl_running': [],             # running PPL after each chunk, as printed
+        'ppl_chunk_values': [],        # PPL of each chunk on its own
+        'ppl_tokens': 0,               # tokens evaluated (prompt eval)
+        'ppl_eval_time': 0.0,          # seconds
+        'ppl_eval_speed': 0.0,         # tokens/s
+        'tokenization_time': 0.0,      # seconds
+        'load_time': 0.0,              # seconds
+    }
+
+    try:
+        with open(perplexity_log_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+
+    # The running values are printed on one line without newlines between chunks
+    running = {}
+    for k, value in RUNNING_PPL.findall(content):
+        running[int(k)] = float(value)
+    metrics['ppl_running'] = [running[k] for k in sorted(running)]
+    metrics['ppl_chunk_values'] = chunk_perplexities(metrics['ppl_running'])
+
+    header = CHUNK_HEADER.search(content)
+    if header:
+        metrics['ppl_n_ctx'] = int(header.group(2))
+    metrics['ppl_chunks'] = len(metrics['ppl_running'])
+
+    final = FINAL_PPL.search(content)
+    if final:
+        metrics['perplexity'] = float(final.group(1))
+        metrics['perplexity_stderr'] = float(final.group(2))
+    elif metrics['ppl_running']:
+        # Killed before the final estimate: the last running value covers every chunk so far
+        metrics['perplexity'] = metrics['ppl_running'][-1]
+
+    tokenize = TOKENIZE_TIME.search(content)
+    if tokenize:
+        metrics['tokenization_time'] = float(tokenize.group(1)) / 1000.0
+
+    load = LOAD_TIME.search(content)
+    if load:
+        metrics['load_time'] = float(load.group(1)) / 1000.0
+
+    prompt_eval = PROMPT_EVAL.search(content)
+    if prompt_eval:
+        metrics['ppl_eval_time'] = float(prompt_eval.group(1)) / 1000.0
+        metrics['ppl_tokens'] = int(prompt_eval.group(2))
+        metrics['ppl_eval_speed'] = float(prompt_eval.group(3))
+    elif metrics['ppl_n_ctx']:
+        metrics['ppl_tokens'] = metrics['ppl_chunks'] * metrics['ppl_n_ctx']
+
+    return metrics
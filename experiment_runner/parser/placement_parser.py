@@ -0,0 +1,58 @@
+placement_log_path = "placement_log.txt"
+
+
+def parse_cpu_list(cpu_list):
+    """"0-5,7" -> {0, 1, 2, 3, 4, 5, 7} (the /proc Cpus_allowed_list format)."""
+    cpus = set()
+    for part in (cpu_list or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-")
+            cpus.update(range(int(lo), int(hi) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def parse_placement_log(placement_log_path, expected_cpus=None):
+    """
+    Parses the output of plugins/affinity/placement_sampler.sh: the affinity the process
+    actually got and the CPUs its threads were seen on. expected_cpus is the preset's
+    CPU list; None (no mask) counts every CPU as expected.
+    """
+    metrics = {
+        'cpus_allowed': '',             # Cpus_allowed_list of the process, e.g. "6-7"
+        'cpus_observed': '',            # cpu:samples over all threads, e.g. "6:118;7:120"
+        'placement_match': 0.0,         # share of thread samples on expected CPUs
+        'max_threads': 0,               # most threads seen in one sample
+    }
+
+    counts = {}
+    try:
+        with open(placement_log_path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                parts = line.strip().split(",")
+                if parts[0] == "H" and len(parts) >= 3:
+                    # H,<pid>,<Cpus_allowed_list> (the list itself contains commas)
+                    metrics['cpus_allowed'] = ",".join(parts[2:])
+                elif parts[0] == "S":
+                    threads = 0
+                    for field in parts[2:]:
+                        try:
+                            cpu = int(field.split(":")[1])
+                        except (IndexError, ValueError):
+                            continue
+                        counts[cpu] = counts.get(cpu, 0) + 1
+                        threads += 1
+                    metrics['max_threads'] = max(metrics['max_threads'], threads)
+    except FileNotFoundError:
+        return metrics
+
+    total = sum(counts.values())
+    if total:
+        expected = parse_cpu_list(expected_cpus) if expected_cpus else set(counts)
+        metrics['cpus_observed'] = ";".join(f"{cpu}:{n}" for cpu, n in sorted(counts.items()))
+        metrics['placement_match'] = round(sum(n for cpu, n in counts.items() if cpu in expected) / total, 3)
+    return metrics
@@ -0,0 +1,61 @@
+import re
+
+prompt_cache_log_path = "llama_output.txt"
+
+# --log-prefix --log-timestamps: "0.01.234.567 I main: ..." (minutes.seconds.ms.us since start)
+TIMESTAMP = r"(?:(\d+)\.(\d+)\.(\d+)\.(\d+) \w )?"
+ATTEMPT = re.compile(TIMESTAMP + r"main: attempting to load saved session from '([^']*)'")
+CREATE = re.compile(r"main: session file does not exist, will create|main: The session file is empty")
+LOADED = re.compile(TIMESTAMP + r"main: loaded a session with prompt size of (\d+) tokens")
+EXACT = re.compile(r"main: session file has exact match for prompt")
+PARTIAL = re.compile(r"main: session file (?:matches|has low similarity to prompt \()\s*(\d+) / (\d+) tokens")
+
+
+def _seconds(match):
+    if match.group(1) is None:
+        return None
+    minutes, seconds, ms, us = (int(match.group(i)) for i in range(1, 5))
+    return minutes * 60 + seconds + ms / 1e3 + us / 1e6
+
+
+def parse_prompt_cache_log(prompt_cache_log_path):
+    """
+    Parses the session (--prompt-cache) lines of llama-cli's log: whether the cache file was
+    created or loaded, how many of its tokens the prompt reused and, with --log-timestamps,
+    how long loading it took. Returns None when the file is missing.
+    """
+    metrics = {
+        'cache_status': '',            # created / loaded ("" without --prompt-cache)
+        'cached_tokens': 0,            # tokens stored in the loaded session
+        'reused_tokens': 0,            # prompt tokens restored instead of evaluated
+        'cache_load_time': 0.0,        # seconds, from the load attempt to the loaded session
+    }
+
+    try:
+        with open(prompt_cache_log_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+
+    attempt = ATTEMPT.search(content)
+    if not attempt:
+        return metrics
+    if CREATE.search(content):
+        metrics['cache_status'] = 'created'
+        return metrics
+
+    loaded = LOADED.search(content)
+    if not loaded:
+        return metrics
+    metrics['cache_status'] = 'loaded'
+    metrics['cached_tokens'] = int(loaded.group(5))
+    start, end = _seconds(attempt), _seconds(loaded)
+    if start is not None and end is not None:
+        metrics['cache_load_time'] = round(end - start, 6)
+
+    partial = PARTIAL.search(content)
+    if partial:
+        metrics['reused_tokens'] = int(partial.group(1))
+    elif EXACT.search(content):
+        metrics['reused_tokens'] = metrics['cached_tokens']
+    return metrics
@@ -0,0 +1,85 @@
+import re
+
+speculative_log_path = "llama_output.txt"
+
+ENCODED = re.compile(r"encoded\s+(\d+) tokens in\s+([\d\.]+) seconds, speed:\s+([\d\.]+) t/s")
+DECODED = re.compile(r"decoded\s+(\d+) tokens in\s+([\d\.]+) seconds, speed:\s+([\d\.]+) t/s")
+COUNTER = re.compile(r"^(n_draft|n_predict|n_drafted|n_accept)\s*=\s*(\d+)", re.MULTILINE)
+ACCEPT = re.compile(r"^accept\s*=\s*([\d\.]+)%", re.MULTILINE)
+MODEL_BUFFER = re.compile(r"CPU_Mapped model buffer size =\s+([\d\.]+) MiB")
+KV_SIZE = re.compile(r"llama_kv_cache:\s+size\s+=\s+([\d\.]+)\s+MiB")
+LOAD_TIME = re.compile(r"load time\s+=\s+([\d\.]+)\s+ms")
+
+
+def parse_speculative_log(speculative_log_path):
+    """
+    Parses the output of `llama-speculative` (draft model) and `llama-lookup` (n-gram
+    drafts): prompt/generation timings, draft statistics and the memory the draft
+    model adds. The target is loaded first, so a second model buffer / KV cache
+    belongs to the draft. Returns None when the file is missing.
+    """
+    metrics = {
+        'output_text': '',             # log up to the timings: prompt echo + generated text
+        'input_token_count': 0,
+        'output_token_count': 0,
+        'total_token_count': 0,
+        'prompt_prefill_speed': 0.0,   # t/s
+        'generation_decoder_speed': 0.0,
+        'prefill_latency': 0.0,        # seconds
+        'generation_latency': 0.0,
+        'inference_latency': 0.0,
+        'time_to_first_token': 0.0,
+        'load_time': 0.0,              # seconds, target model load
+        'n_draft': 0,                  # --draft-max
+        'n_drafted': 0,                # tokens proposed by the draft
+        'n_accept': 0,                 # proposed tokens the target accepted
+        'acceptance_rate': 0.0,        # n_accept / n_drafted
+        'draft_memory': 0.0,           # MiB, draft model weights + its KV cache
+    }
+
+    try:
+        with open(speculative_log_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+    except FileNotFoundError:
+        return None
+
+    encoded = ENCODED.search(content)
+    if encoded:
+        metrics['output_text'] = content[:encoded.start()]
+        metrics['input_token_count'] = int(encoded.group(1))
+        metrics['prefill_latency'] = float(encoded.group(2))
+        metrics['prompt_prefill_speed'] = float(encoded.group(3))
+
+    decoded = DECODED.search(content)
+    if decoded:
+        metrics['output_token_count'] = int(decoded.group(1))
+        metrics['generation_latency'] = float(decoded.group(2))
+        metrics['generation_decoder_speed'] = float(decoded.group(3))
+        # Speculation emits tokens in bursts; the mean time per token stands in for the first step
+        if metrics['output_token_count']:
+            metrics['time_to_first_token'] = round(
+                metrics['prefill_latency'] + metrics['generation_latency'] / metrics['output_token_count'], 4)
+
+    metrics['total_token_count'] = metrics['input_token_count'] + metrics['output_token_count']
+    metrics['inference_latency'] = round(metrics['prefill_latency'] + metrics['generation_latency'], 4)
+
+    for name, value in COUNTER.findall(content):
+        if name != 'n_predict':
+            metrics[name] = int(value)
+    accept = ACCEPT.search(content)
+    if accept:
+        metrics['acceptance_rate'] = round(float(accept.group(1)) / 100.0, 4)
+    elif metrics['n_drafted']:
+        metrics['acceptance_rate'] = round(metrics['n_accept'] / metrics['n_drafted'], 4)
+
+    # llama-speculative prints the draft's perf block first ("draft:" ... "target:")
+    target_part = content.split("target:")[-1]
+    load = LOAD_TIME.search(target_part)
+    if load:
+        metrics['load_time'] = float(load.group(1)) / 1000.0
+
+    buffers = [float(v) for v in MODEL_BUFFER.findall(content)]
+    kv_sizes = [float(v) for v in KV_SIZE.findall(content)]
+    metrics['draft_memory'] = round(sum(buffers[1:2]) + sum(kv_sizes[1:2]), 2)
+
+    return metrics
@@ -0,0 +1,124 @@
+import json
+
+thermal_log_path = "thermal_log.txt"
+thermal_baseline_path = "thermal_baseline.txt"
+
+
+def _read_thermal_log(thermal_log_path):
+    """(hw_max, samples) of a sampler log; hw_max is None when the file is missing."""
+    hw_max = {}        # policy -> cpuinfo_max_freq (kHz)
+    samples = []       # (uptime_s, {policy: (cur, max)}, [temps])
+
+    try:
+        with open(thermal_log_path, 'r', encoding='utf-8', errors='ignore') as f:
+            for line in f:
+                parts = line.strip().split(",")
+                try:
+                    if parts[0] == "H":
+                        # H,<epoch_ns>,<uptime_s>,policyN:<hw_max>,...,thermal_zoneN=<type>
+                        for field in parts[3:]:
+                            if field.startswith("policy"):
+                                name, value = field.split(":")
+                                hw_max[name] = int(value)
+
+                    elif parts[0] == "S":
+                        uptime = float(parts[1])
+                        freqs = {}
+                        temps = []
+                        for field in parts[2:]:
+                            values = field.split(":")
+                            if values[0].startswith("policy") and len(values) == 3:
+                                freqs[values[0]] = (int(values[1]), int(values[2]))
+                            elif len(values) == 2:
+                                temp = int(values[1])
+                                # Most zones report millidegrees, a few report degrees
+                                temps.append(temp / 1000.0 if abs(temp) > 1000 else float(temp))
+                        samples.append((uptime, freqs, temps))
+                except (ValueError, IndexError):
+                    continue
+
+    except FileNotFoundError:
+        print(f"Error: File '{thermal_log_path}' not found.")
+        return None, []
+
+    return hw_max, samples
+
+
+def parse_thermal_baseline(thermal_baseline_path):
+    """
+    Per-policy scaling_max_freq of a sampler log recorded on the cool, idle device before
+    the experiment: the cap a run is held against. Vendor firmware may keep a standing
+    limit below cpuinfo_max_freq, which is not throttling. Empty when the file is missing.
+    """
+    _, samples = _read_thermal_log(thermal_baseline_path)
+    caps = {}
+    for _, freqs, _ in samples:
+        for policy, (_, cap) in freqs.items():
+            caps[policy] = max(cap, caps.get(policy, 0))
+    return caps
+
+
+def parse_thermal_log(thermal_log_path, baseline_caps=None):
+    """
+    Parses the output of plugins/thermal/thermal_sampler.sh and flags runs whose CPU
+    frequency cap (scaling_max_freq) was below the policy's cap in baseline_caps (see
+    parse_thermal_baseline). A run that starts hot and stays capped is flagged too.
+    Policies missing from the baseline are held against cpuinfo_max_freq.
+    """
+    metrics = {
+        'throttled': 0,                 # 1 if any policy was capped below its baseline
+        'time_under_throttle': 0.0,     # seconds
+        'min_freq_cap_ratio': 1.0,      # lowest scaling_max_freq / cpuinfo_max_freq
+        'throttled_policies': '',       # e.g. "policy6;policy7"
+        'avg_cpu_freq_ratio': 0.0,      # mean scaling_cur_freq / cpuinfo_max_freq
+        'max_soc_temperature': 0.0,     # Celsius, hottest readable thermal zone
+    }
+
+    hw_max, samples = _read_thermal_log(thermal_log_path)
+    if not samples or not hw_max:
+        return metrics
+
+    # --- Throttle Detection ---
+    reference = {**hw_max, **(baseline_caps or {})}
+    throttled_policies = set()
+    cap_ratios = []
+    cur_ratios = []
+    max_temp = None
+
+    for i, (uptime, freqs, temps) in enumerate(samples):
+        sample_throttled = False
+        for policy, (cur, cap) in freqs.items():
+            if policy not in hw_max or hw_max[policy] <= 0:
+                continue
+            cap_ratios.append(cap / hw_max[policy])
+            cur_ratios.append(cur / hw_max[policy])
+            if cap < reference[policy]:
+                sample_throttled = True
+                throttled_policies.add(policy)
+
+        # Time under throttle: a throttled sample holds until the next one
+        if sample_throttled and i + 1 < len(samples):
+            dt = samples[i + 1][0] - uptime
+            if dt > 0:
+                metrics['time_under_throttle'] += dt
+
+        if temps:
+            hottest = max(temps)
+            max_temp = hottest if max_temp is None else max(max_temp, hottest)
+
+    metrics['throttled'] = 1 if throttled_policies else 0
+    metrics['time_under_throttle'] = round(metrics['time_under_throttle'], 2)
+    metrics['throttled_policies'] = ";".join(sorted(throttled_policies))
+    if cap_ratios:
+        metrics['min_freq_cap_ratio'] = round(min(cap_ratios), 3)
+    if cur_ratios:
+        metrics['avg_cpu_freq_ratio'] = round(sum(cur_ratios) / len(cur_ratios), 3)
+    if max_temp is not None:
+        metrics['max_soc_temperature'] = round(max_temp, 2)
+
+    return metrics
+
+# Usage Example
+if __name__ == "__main__":
+    result = parse_thermal_log(thermal_log_path, parse_thermal_baseline(thermal_baseline_path))
+    print(json.dumps(result, indent=4))
@@ -0,0 +1,120 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from bertscore_service import GOLD_SUMMARY, REFERENCE_BACKEND, SCORER_BACKENDS, make_scorer
+
+
+def spearman(a, b):
+    """Pearson correlation of the (average-tie) ranks."""
+    ra = pd.Series(a).rank().to_numpy()
+    rb = pd.Series(b).rank().to_numpy()
+    if ra.std() == 0 or rb.std() == 0:
+        return np.nan
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def kendall_tau_b(a, b):
+    a, b = np.asarray(a), np.asarray(b)
+    da = np.sign(a[:, None] - a[None, :])
+    db = np.sign(b[:, None] - b[None, :])
+    upper = np.triu_indices(len(a), k=1)
+    da, db = da[upper], db[upper]
+    denom = np.sqrt(np.count_nonzero(da) * np.count_nonzero(db))
+    return float((da * db).sum() / denom) if denom > 0 else np.nan
+
+
+def load_responses(paths):
+    """(run-level DataFrame with model + response, list of unique non-empty responses)."""
+    frames = []
+    for path in paths:
+        df = pd.read_csv(path)
+        if "model_response" not in df.columns:
+            continue
+        # experiment-runner tables carry model_file, the per-model CSVs a model column
+        model_col = "model_file" if "model_file" in df.columns else ("model" if "model" in df.columns else None)
+        frames.append(pd.DataFrame({
+            "model": df[model_col].astype(str) if model_col else path,
+            "response": df["model_response"].fillna("").astype(str),
+        }))
+
+    runs = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["model", "response"])
+    runs = runs[runs["response"].str.strip() != ""]
+    return runs, list(dict.fromkeys(runs["response"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and ranking fidelity of the BERTScore backends vs roberta-large.")
+    parser.add_argument("run_tables", nargs="+", help="run_table.csv / per-model CSV files with model_response")
+    parser.add_argument("--backends", nargs="+", default=list(SCORER_BACKENDS), choices=list(SCORER_BACKENDS))
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="default: all CPU cores")
+    parser.add_argument("--output", default="bertscore_benchmark.csv")
+    args = parser.parse_args()
+
+    runs, unique = load_responses(args.run_tables)
+    if not unique:
+        print("No responses found.")
+        return
+    print(f"--> {len(runs)} runs, {len(unique)} unique responses, {runs['model'].nunique()} models")
+
+    # The reference always runs first so every backend is compared against it
+    backends = [REFERENCE_BACKEND] + [b for b in args.backends if b != REFERENCE_BACKEND]
+
+    f1 = {}
+    rows = []
+    for backend in backends:
+        print(f"--> [{backend}] loading...")
+        start = time.time()
+        # No embedding cache: every backend embeds every text
+        scorer = make_scorer(backend, batch_size=args.batch_size, nthreads=args.threads, cache_dir=None)
+        load_s = time.time() - start
+
+        # One short batch first so lazy initialisation is not timed
+        scorer.score(unique[:2], GOLD_SUMMARY)
+
+        start = time.time()
+        scores = scorer.score(unique, GOLD_SUMMARY)
+        score_s = time.time() - start
+
+        f1[backend] = np.array([scores[t][2] for t in unique])
+        n_tokens = sum(len(scorer.tokenizer.tokenize(t)) for t in unique)
+
+        # Model ranking = mean F1 over runs, the way the aggregation uses it
+        by_text = dict(zip(unique, f1[backend]))
+        model_f1 = runs.assign(f1=runs["response"].map(by_text)).groupby("model")["f1"].mean()
+
+        rows.append({
+            "backend": backend,
+            "model_key": scorer.model_key,
+            "load_s": round(load_s, 2),
+            "score_s": round(score_s, 2),
+            "texts_per_s": round(len(unique) / score_s, 2) if score_s > 0 else np.nan,
+            "tokens_per_s": round(n_tokens / score_s, 1) if score_s > 0 else np.nan,
+            "_model_f1": model_f1,
+        })
+        del scorer
+
+    reference_s = rows[0]["score_s"]
+    ref_models = rows[0]["_model_f1"]
+    for row in rows:
+        models = row.pop("_model_f1").reindex(ref_models.index)
+        row["speedup"] = round(reference_s / row["score_s"], 2) if row["score_s"] > 0 else np.nan
+        row["spearman_response"] = round(spearman(f1[REFERENCE_BACKEND], f1[row["backend"]]), 4)
+        row["kendall_response"] = round(kendall_tau_b(f1[REFERENCE_BACKEND], f1[row["backend"]]), 4)
+        row["spearman_model"] = round(spearman(ref_models.to_numpy(), models.to_numpy()), 4)
+        row["kendall_model"] = round(kendall_tau_b(ref_models.to_numpy(), models.to_numpy()), 4)
+        row["same_best_model"] = int(models.idxmax() == ref_models.idxmax())
+
+    result = pd.DataFrame(rows).sort_values("score_s")
+    print("\n=== BERTSCORE BACKENDS ===")
+    print(result.to_string(index=False))
+
+    result.to_csv(args.output, index=False)
+    print(f"\nSaved: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
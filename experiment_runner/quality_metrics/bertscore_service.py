@@ -0,0 +1,234 @@
+import argparse
+import hashlib
+import os
+import time
+from collections import defaultdict
+from os.path import dirname, realpath
+
+import numpy as np
+import pandas as pd
+import torch
+from torch.nn.utils.rnn import pad_sequence
+from bert_score.utils import get_model, get_tokenizer, get_bert_embedding, greedy_cos_idf, model2layers
+
+# Same gold reference as BERTscore.py
+GOLD_SUMMARY = (
+    "The World Wide Web was created by Tim Berners-Lee in 1989 at CERN to enable efficient information sharing among researchers, "
+    "later evolving into a global information platform."
+)
+
+CACHE_DIR = os.path.join(dirname(realpath(__file__)), ".bertscore_cache")
+SCORE_COLUMNS = ["BERT_Precision", "BERT_Recall", "BERT_F1"]
+
+# Scorer presets, from the reference down to the cheapest. Layers default to
+# bert_score's recommended layer for the model; fewer layers = truncated encoder.
+SCORER_BACKENDS = {
+    "roberta-large":           {"model_type": "roberta-large"},
+    "roberta-large-int8":      {"model_type": "roberta-large", "quantize": True},
+    "roberta-large-L12":       {"model_type": "roberta-large", "num_layers": 12},
+    "roberta-large-L12-int8":  {"model_type": "roberta-large", "num_layers": 12, "quantize": True},
+    "roberta-base":            {"model_type": "roberta-base"},
+    "roberta-base-int8":       {"model_type": "roberta-base", "quantize": True},
+    "distilroberta-base":      {"model_type": "distilroberta-base"},
+    "distilroberta-base-int8": {"model_type": "distilroberta-base", "quantize": True},
+}
+REFERENCE_BACKEND = "roberta-large"
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Token embeddings (+ idf weights) on disk, one .npz per text, keyed by
+    (model key, sha256 of the text). The model key includes the layer count.
+    """
+
+    def __init__(self, cache_dir, model_key):
+        # cache_dir=None disables the cache (used by the benchmark)
+        self.dir = os.path.join(cache_dir, model_key.replace("/", "--")) if cache_dir else None
+
+    def _path(self, digest):
+        return os.path.join(self.dir, digest[:2], digest + ".npz")
+
+    def get(self, text):
+        if self.dir is None:
+            return None
+        path = self._path(text_hash(text))
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return data["emb"], data["idf"]
+        except (OSError, ValueError, KeyError):
+            # Partially written or corrupt entry, recompute it
+            return None
+
+    def put(self, text, emb, idf):
+        if self.dir is None:
+            return
+        path = self._path(text_hash(text))
+        os.makedirs(dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, emb=emb, idf=idf)
+        os.replace(tmp_path, path)
+
+
+def make_scorer(backend, **kwargs):
+    """BertScorer for one of SCORER_BACKENDS; kwargs override batch_size, nthreads, cache_dir."""
+    if backend not in SCORER_BACKENDS:
+        raise ValueError(f"Unknown scorer backend: {backend} (choose from {', '.join(SCORER_BACKENDS)})")
+    return BertScorer(**SCORER_BACKENDS[backend], **kwargs)
+
+
+class BertScorer:
+    """
+    BERTScore (no idf, no baseline rescaling, same as BERTscore.py) that embeds each
+    unique text once. Without quantize, scores are identical to bert_score.score() for
+    the same model and layer; the difference is that embeddings come from the on-disk cache when
+    available and the rest are computed in length-sorted batches on all CPU cores.
+    """
+
+    def __init__(self, model_type="roberta-large", num_layers=None, batch_size=32,
+                 nthreads=None, cache_dir=CACHE_DIR, quantize=False):
+        self.model_type = model_type
+        self.num_layers = num_layers or model2layers[model_type]
+        self.model_key = f"{model_type}-L{self.num_layers}" + ("-int8" if quantize else "")
+        self.batch_size = batch_size
+
+        torch.set_num_threads(nthreads or os.cpu_count())
+
+        self.tokenizer = get_tokenizer(model_type)
+        # get_model drops the encoder layers above num_layers
+        self.model = get_model(model_type, self.num_layers)
+        self.model.eval()
+        if quantize:
+            # int8 weights for every Linear layer, activations quantized on the fly (CPU only)
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        # idf=False in bert_score: every token weighs 1 except [CLS]/[SEP]
+        self.idf_dict = defaultdict(lambda: 1.0)
+        self.idf_dict[self.tokenizer.sep_token_id] = 0
+        self.idf_dict[self.tokenizer.cls_token_id] = 0
+
+        self.cache = EmbeddingCache(cache_dir, self.model_key)
+        self.stats = {"cached": 0, "computed": 0}
+
+    def embed(self, texts):
+        """Returns {text: (emb [n_tokens, dim], idf [n_tokens])} for the unique texts."""
+        stats = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            hit = self.cache.get(text)
+            if hit is not None:
+                stats[text] = hit
+                self.stats["cached"] += 1
+            else:
+                missing.append(text)
+
+        # Longest first so every batch pads to similar lengths
+        missing.sort(key=lambda t: len(self.tokenizer.tokenize(t)), reverse=True)
+
+        for i in range(0, len(missing), self.batch_size):
+            batch = missing[i:i + self.batch_size]
+            with torch.no_grad():
+                emb, mask, idf = get_bert_embedding(
+                    batch, self.model, self.tokenizer, self.idf_dict, device="cpu"
+                )
+            for j, text in enumerate(batch):
+                n_tokens = int(mask[j].sum().item())
+                entry = (
+                    emb[j, :n_tokens].numpy().astype(np.float32),
+                    idf[j, :n_tokens].numpy().astype(np.float32),
+                )
+                self.cache.put(text, *entry)
+                stats[text] = entry
+                self.stats["computed"] += 1
+
+        return stats
+
+    @staticmethod
+    def _pad(entries):
+        emb = pad_sequence([torch.from_numpy(e.copy()) for e, _ in entries], batch_first=True, padding_value=2.0)
+        idf = pad_sequence([torch.from_numpy(w.copy()) for _, w in entries], batch_first=True)
+        lens = torch.tensor([len(e) for e, _ in entries], dtype=torch.long)
+        mask = torch.arange(int(lens.max())).expand(len(entries), -1) < lens.unsqueeze(1)
+        return emb, mask, idf
+
+    def score(self, candidates, reference):
+        """Scores the unique candidates against one reference, returns {text: (P, R, F1)}."""
+        unique = list(dict.fromkeys(candidates))
+        stats = self.embed(unique + [reference])
+
+        results = {}
+        for i in range(0, len(unique), self.batch_size):
+            batch = unique[i:i + self.batch_size]
+            hyp_emb, hyp_mask, hyp_idf = self._pad([stats[t] for t in batch])
+            ref_emb, ref_mask, ref_idf = self._pad([stats[reference]] * len(batch))
+            P, R, F1 = greedy_cos_idf(ref_emb, ref_mask, ref_idf, hyp_emb, hyp_mask, hyp_idf)
+            for text, p, r, f in zip(batch, P.tolist(), R.tolist(), F1.tolist()):
+                results[text] = (p, r, f)
+        return results
+
+
+def score_run_tables(paths, scorer, reference=GOLD_SUMMARY, output_dir=None):
+    """
+    Adds BERT_Precision/Recall/F1 to every run of every run table (experiment-runner
+    run_table.csv or the per-model CSVs). Each unique response is scored once.
+    """
+    tables = {path: pd.read_csv(path) for path in paths}
+
+    responses = []
+    for path, df in tables.items():
+        if "model_response" not in df.columns:
+            print(f"--> [SKIP] {path} has no model_response column")
+            continue
+        responses.extend(r for r in df["model_response"].fillna("").astype(str) if r.strip())
+
+    unique = list(dict.fromkeys(responses))
+    print(f"--> {len(responses)} runs, {len(unique)} unique responses")
+
+    start = time.time()
+    scores = scorer.score(unique, reference) if unique else {}
+    elapsed = time.time() - start
+    print(f"--> Embeddings: {scorer.stats['cached']} cached, {scorer.stats['computed']} computed ({elapsed:.1f}s)")
+
+    for path, df in tables.items():
+        if "model_response" not in df.columns:
+            continue
+        texts = df["model_response"].fillna("").astype(str)
+        for k, column in enumerate(SCORE_COLUMNS):
+            df[column] = [scores[t][k] if t in scores else np.nan for t in texts]
+        df["response_hash"] = [text_hash(t)[:16] if t.strip() else "" for t in texts]
+        df["BERT_model"] = scorer.model_key
+
+        out_path = path if output_dir is None else os.path.join(output_dir, os.path.basename(path))
+        df.to_csv(out_path, index=False)
+        print(f"    [SAVED] {out_path}")
+
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score model_response of stored runs with BERTScore.")
+    parser.add_argument("run_tables", nargs="+", help="run_table.csv / per-model CSV files")
+    parser.add_argument("--backend", default=REFERENCE_BACKEND, choices=list(SCORER_BACKENDS),
+                        help="scorer preset, see bertscore_benchmark.py for speed vs ranking fidelity")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="default: all CPU cores")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--reference", default=GOLD_SUMMARY)
+    parser.add_argument("--output-dir", default=None, help="write copies here instead of updating in place")
+    args = parser.parse_args()
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    scorer = make_scorer(args.backend, batch_size=args.batch_size, nthreads=args.threads, cache_dir=args.cache_dir)
+    score_run_tables(args.run_tables, scorer, args.reference, args.output_dir)
+
+
+if __name__ == "__main__":
+    main()
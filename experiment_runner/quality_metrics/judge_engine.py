@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+from os.path import dirname, realpath
+from typing import List
+
+import openai
+from openai import AsyncOpenAI
+from pydantic import BaseModel, Field, ValidationError
+
+CACHE_DIR = os.path.join(dirname(realpath(__file__)), ".judge_cache")
+
+# Errors worth another attempt; anything else (bad request, auth) fails immediately
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,   # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+    ValidationError,             # malformed structured output
+    json.JSONDecodeError,
+)
+
+
+# ---------------------------
+# STRUCTURED OUTPUT DEFINITION
+# ---------------------------
+class ModelScore(BaseModel):
+    # Changed from model_name (str) to model_id (int) to prevent hallucinations
+    model_id: int
+    score: float = Field(..., description="Score from 0.00 to 1.00")
+
+class MetricVerdict(BaseModel):
+    rankings: List[ModelScore]
+
+
+# ---------------------------
+# PROMPT
+# ---------------------------
+def build_messages(metric_name, steps, context, models):
+    """Relative-scoring prompt: every candidate (by ID) judged against the others on one metric."""
+    candidates_text = ""
+    for m in models:
+        candidates_text += f"--- MODEL ID: {m['index']} ---\n{m['response']}\n\n"
+
+    steps_text = "\n".join([f"- {s}" for s in steps])
+
+    system_prompt = (
+        f"You are an expert evaluator grading AI summaries on the metric: {metric_name.upper()}.\n\n"
+        f"EVALUATION STEPS:\n{steps_text}\n\n"
+        "INSTRUCTIONS:\n"
+        "1. Read the SOURCE CONTEXT.\n"
+        "2. Read all MODEL CANDIDATES (identified by ID).\n"
+        "3. Compare the candidates AGAINST EACH OTHER based on the Evaluation Steps.\n"
+        "4. Assign a score (0.00 - 1.00). The best model relative to the others should get the highest score.\n"
+        "5. Be strict. If a model hallucinates, give it a low score on Consistency."
+    )
+
+    user_prompt = f"SOURCE CONTEXT:\n{context}\n\nCANDIDATES:\n{candidates_text}"
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _sha256(obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def steps_hash(metric_name, steps):
+    return _sha256({"metric": metric_name, "steps": list(steps)})
+
+
+def candidate_set_hash(context, models):
+    # Order matters to a relative judge (position bias), so it is part of the key
+    return _sha256({"context": context, "candidates": [[m["index"], m["response"]] for m in models]})
+
+
+# ---------------------------
+# VERDICT CACHE
+# ---------------------------
+class VerdictCache:
+    """One JSON file per (judge model, metric steps hash, candidate set hash)."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.dir = cache_dir
+
+    def _path(self, key):
+        return os.path.join(self.dir, f"{key}.json")
+
+    @staticmethod
+    def key(judge_model, metric_name, steps, context, models):
+        return _sha256([judge_model, steps_hash(metric_name, steps), candidate_set_hash(context, models)])
+
+    def get(self, key):
+        if not self.dir:
+            return None
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return MetricVerdict.model_validate(json.load(f)["verdict"])
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, ValidationError):
+            return None
+
+    def put(self, key, verdict, **meta):
+        if not self.dir:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"verdict": verdict.model_dump(), **meta}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+
+
+# ---------------------------
+# JUDGE ENGINE
+# ---------------------------
+class JudgeEngine:
+    """
+    Runs G-Eval style judge calls concurrently (bounded by a semaphore), retries transient
+    failures with exponential backoff and persists every verdict as soon as it arrives.
+
+    base_url selects any OpenAI-compatible endpoint, e.g. a local llama.cpp server
+    (http://127.0.0.1:8080/v1) or plugins/judge_stub/stub_judge_server.py for offline runs.
+    Without it the OpenAI client reads OPENAI_BASE_URL / OPENAI_API_KEY as usual.
+    """
+
+    def __init__(self, model="gpt-5.2", base_url=None, api_key=None, max_concurrency=4,
+                 max_retries=5, backoff_base=1.0, backoff_max=60.0, timeout=120.0,
+                 cache_dir=CACHE_DIR, seed=42):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.seed = seed
+        self.cache = VerdictCache(cache_dir)
+        # called: distinct judge calls (uncached verdicts requested); retries: extra attempts
+        self.stats = {"cached": 0, "called": 0, "retries": 0, "failed": 0}
+
+        # Local servers ignore the key but the client insists on one
+        if api_key is None and base_url is not None:
+            api_key = os.environ.get("OPENAI_API_KEY", "sk-no-key")
+        self._client_args = {"base_url": base_url, "api_key": api_key, "timeout": timeout}
+        self._loop = None
+
+    def _bind_loop(self):
+        """Client and semaphore belong to one event loop; rebuild them for each asyncio.run()."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Retries are handled here so they can be counted and honour Retry-After
+            self.client = AsyncOpenAI(max_retries=0, **self._client_args)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+
+    def _backoff(self, attempt, error):
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        if retry_after is None:
+            # Exponential backoff with full jitter
+            retry_after = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return min(retry_after, self.backoff_max)
+
+    async def _call(self, messages):
+        response = await self.client.beta.chat.completions.parse(
+            model=self.model,
+            messages=messages,
+            temperature=0,
+            seed=self.seed, # Forces deterministic output
+            response_format=MetricVerdict,
+        )
+        verdict = response.choices[0].message.parsed
+        if verdict is None:
+            # Refusal or a server that ignored the schema
+            verdict = MetricVerdict.model_validate_json(response.choices[0].message.content or "")
+        return verdict
+
+    async def judge(self, metric_name, steps, context, models):
+        """MetricVerdict for one metric over one candidate set (cache first)."""
+        key = self.cache.key(self.model, metric_name, steps, context, models)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats["cached"] += 1
+            return cached
+
+        messages = build_messages(metric_name, steps, context, models)
+        self._bind_loop()
+        self.stats["called"] += 1
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    start = time.time()
+                    verdict = await self._call(messages)
+                    break
+                except RETRYABLE_ERRORS as e:
+                    if attempt == self.max_retries:
+                        self.stats["failed"] += 1
+                        raise
+                    delay = self._backoff(attempt, e)
+                    self.stats["retries"] += 1
+                    print(f"    [RETRY] {metric_name}: {type(e).__name__}, attempt {attempt + 1}/{self.max_retries}, waiting {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+        self.cache.put(key, verdict, judge_model=self.model, metric=metric_name,
+                       n_candidates=len(models), latency_s=round(time.time() - start, 3))
+        return verdict
+
+    async def evaluate_metrics(self, metrics_library, context, models):
+        """
+        All metrics concurrently. Returns ({metric: [{"model_name", "score"}]}, {metric: error});
+        a failed metric does not discard the ones that succeeded (they are cached anyway).
+        """
+        id_map = {m["index"]: m["model"] for m in models}
+        names = list(metrics_library)
+        results = await asyncio.gather(
+            *(self.judge(name, metrics_library[name], context, models) for name in names),
+            return_exceptions=True,
+        )
+
+        scores, errors = {}, {}
+        for name, result in zip(names, results):
+            if isinstance(result, BaseException):
+                errors[name] = result
+                continue
+            # Map IDs back to real names
+            scores[name] = [
+                {"model_name": id_map.get(r.model_id, f"Unknown_ID_{r.model_id}"), "score": r.score}
+                for r in result.rankings
+            ]
+        return scores, errors
+
+    def run(self, metrics_library, context, models):
+        """Synchronous entry point for scripts."""
+        return asyncio.run(self.evaluate_metrics(metrics_library, context, models))
@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import itertools
+import math
+import random
+from collections import Counter, defaultdict
+
+import pandas as pd
+
+from judge_engine import JudgeEngine
+from lexical_metrics import lexical_metrics
+
+
+# ---------------------------
+# 1) SCHEDULING
+# ---------------------------
+def schedule_batches(n_candidates, batch_size, max_calls, seed=42):
+    """
+    Overlapping judge batches: every round is a fresh shuffle of all candidates cut into
+    batches of batch_size, so each candidate meets different neighbours at different
+    positions from round to round. Stops at max_calls judge calls; empty with fewer
+    than two candidates.
+    """
+    if n_candidates < 2:
+        return []
+    rng = random.Random(seed)
+    batch_size = max(2, min(batch_size, n_candidates))
+
+    calls = []
+    while len(calls) < max_calls:
+        order = list(range(n_candidates))
+        rng.shuffle(order)
+        for start in range(0, n_candidates, batch_size):
+            batch = order[start:start + batch_size]
+            if len(batch) < 2:
+                # Top up a trailing singleton with random others
+                batch += rng.sample([i for i in order if i not in batch], min(batch_size, n_candidates) - len(batch))
+            calls.append(batch)
+    return calls[:max_calls]
+
+
+def schedule_pairs(n_candidates, max_calls, seed=42):
+    """
+    Pairwise comparisons: rounds of random perfect matchings, each pair asked in both
+    orders (A vs B, then B vs A) so position bias cancels out. Stops at max_calls.
+    """
+    rng = random.Random(seed)
+    all_pairs = list(itertools.combinations(range(n_candidates), 2))
+
+    calls = []
+    seen = set()
+    while len(calls) < max_calls and len(seen) < len(all_pairs):
+        order = list(range(n_candidates))
+        rng.shuffle(order)
+        new_pairs = [tuple(sorted(order[i:i + 2])) for i in range(0, n_candidates - 1, 2)]
+        new_pairs = [p for p in new_pairs if p not in seen]
+        if not new_pairs:
+            # Late rounds: draw directly from the pairs not seen yet
+            remaining = [p for p in all_pairs if p not in seen]
+            new_pairs = rng.sample(remaining, min(len(remaining), max(1, n_candidates // 2)))
+        for a, b in new_pairs:
+            seen.add((a, b))
+            calls.append([a, b])
+            calls.append([b, a])
+    return calls[:max_calls]
+
+
+# ---------------------------
+# 2) RATING FITS
+# ---------------------------
+def verdict_to_outcomes(batch, scores):
+    """Every pair in a judged batch becomes a comparison: (winner, loser, weight); ties split."""
+    outcomes = []
+    for (i, a), (j, b) in itertools.combinations(enumerate(batch), 2):
+        if a == b:
+            continue
+        if scores[i] > scores[j]:
+            outcomes.append((a, b, 1.0))
+        elif scores[j] > scores[i]:
+            outcomes.append((b, a, 1.0))
+        else:
+            outcomes.append((a, b, 0.5))
+            outcomes.append((b, a, 0.5))
+    return outcomes
+
+
+def fit_bradley_terry(n_candidates, outcomes, prior=0.5, iterations=500, tol=1e-9):
+    """
+    Bradley-Terry strengths by the MM algorithm (Hunter, 2004). `prior` adds that many
+    virtual wins and losses against an average opponent so unbeaten candidates stay finite.
+    Returns log-strengths centred on their mean.
+    """
+    wins = [prior] * n_candidates
+    games = defaultdict(float)
+    for winner, loser, weight in outcomes:
+        wins[winner] += weight
+        games[(min(winner, loser), max(winner, loser))] += weight
+
+    p = [1.0] * n_candidates
+    for _ in range(iterations):
+        denom = [2 * prior / (p_i + 1.0) for p_i in p]  # games vs the virtual opponent (strength 1)
+        for (a, b), n_ab in games.items():
+            denom[a] += n_ab / (p[a] + p[b])
+            denom[b] += n_ab / (p[a] + p[b])
+        new_p = [wins[i] / denom[i] if denom[i] > 0 else p[i] for i in range(n_candidates)]
+        delta = max(abs(x - y) for x, y in zip(new_p, p))
+        p = new_p
+        if delta < tol:
+            break
+    log_p = [math.log(x) for x in p]
+    mean = sum(log_p) / n_candidates
+    return [x - mean for x in log_p]
+
+
+def fit_elo(n_candidates, outcomes, k=16.0, base=1500.0, permutations=50, seed=42):
+    """Elo ratings averaged over several random orderings of the outcomes (Elo is order dependent)."""
+    rng = random.Random(seed)
+    totals = [0.0] * n_candidates
+    outcomes = list(outcomes)
+    for _ in range(permutations):
+        rating = [base] * n_candidates
+        rng.shuffle(outcomes)
+        for winner, loser, weight in outcomes:
+            expected = 1.0 / (1.0 + 10 ** ((rating[loser] - rating[winner]) / 400.0))
+            delta = k * weight * (1.0 - expected)
+            rating[winner] += delta
+            rating[loser] -= delta
+        totals = [t + r for t, r in zip(totals, rating)]
+    return [t / permutations for t in totals]
+
+
+# ---------------------------
+# 3) TOURNAMENT
+# ---------------------------
+class JudgeTournament:
+    """
+    Relative G-Eval scoring for many candidates: judge calls see small batches (or pairs)
+    instead of every candidate at once, and the partial rankings are merged into one
+    global rating per candidate. `max_calls` caps the judge calls per metric.
+    """
+
+    def __init__(self, engine, mode="batch", batch_size=6, max_calls=200, rating="bt", seed=42):
+        if mode not in ("batch", "pairwise"):
+            raise ValueError(f"Unknown tournament mode: {mode}")
+        if rating not in ("bt", "elo"):
+            raise ValueError(f"Unknown rating fit: {rating}")
+        self.engine = engine
+        self.mode = mode
+        self.batch_size = batch_size
+        self.max_calls = max_calls
+        self.rating = rating
+        self.seed = seed
+
+    def schedule(self, n_candidates, seed):
+        if self.mode == "pairwise":
+            return schedule_pairs(n_candidates, self.max_calls, seed)
+        return schedule_batches(n_candidates, self.batch_size, self.max_calls, seed)
+
+    async def _judge_batch(self, metric_name, steps, context, candidates, batch):
+        # Local IDs 1..k in presentation order, so IDs carry no information across calls
+        models = [{"index": pos + 1, "model": candidates[c]["model"], "response": candidates[c]["response"]}
+                  for pos, c in enumerate(batch)]
+        verdict = await self.engine.judge(metric_name, steps, context, models)
+        by_id = {r.model_id: r.score for r in verdict.rankings}
+        return [by_id.get(pos + 1, float("nan")) for pos in range(len(batch))]
+
+    def _unrated(self, metric_name, candidates):
+        """Rows and stats for a pool too small to compare: nothing is judged."""
+        rows = [{"Model": c["model"], "Metric": metric_name, "rating": float("nan"), "Score": float("nan"),
+                 "appearances": 0, "win_rate": float("nan")} for c in candidates]
+        stats = {"metric": metric_name, "calls": 0, "failed_calls": 0, "comparisons": 0,
+                 "unjudged": len(candidates), "first_position_win_rate": None}
+        return rows, stats
+
+    async def run_metric(self, metric_name, steps, context, candidates):
+        if len(candidates) < 2:
+            return self._unrated(metric_name, candidates)
+        # Seeded per metric so every metric sees a different but reproducible schedule
+        calls = self.schedule(len(candidates), f"{self.seed}:{metric_name}")
+        results = await asyncio.gather(
+            *(self._judge_batch(metric_name, steps, context, candidates, batch) for batch in calls),
+            return_exceptions=True,
+        )
+
+        outcomes = []
+        appearances = Counter()
+        first_position = Counter()      # pairwise only: wins by whoever was shown first
+        failed = 0
+        for batch, scores in zip(calls, results):
+            if isinstance(scores, BaseException):
+                failed += 1
+                continue
+            valid = [(c, s) for c, s in zip(batch, scores) if not math.isnan(s)]
+            appearances.update(c for c, _ in valid)
+            outcomes.extend(verdict_to_outcomes([c for c, _ in valid], [s for _, s in valid]))
+            if len(valid) == 2 and valid[0][1] != valid[1][1]:
+                first_position["win" if valid[0][1] > valid[1][1] else "loss"] += 1
+
+        n = len(candidates)
+        ratings = fit_bradley_terry(n, outcomes) if self.rating == "bt" else fit_elo(n, outcomes)
+        low, high = min(ratings), max(ratings)
+
+        wins = Counter()
+        comparisons = Counter()
+        for winner, loser, weight in outcomes:
+            wins[winner] += weight
+            comparisons[winner] += weight
+            comparisons[loser] += weight
+
+        rows = []
+        for i, candidate in enumerate(candidates):
+            rows.append({
+                "Model": candidate["model"],
+                "Metric": metric_name,
+                "rating": round(ratings[i], 4),
+                # Min-max over the pool, comparable to the 0-1 scores of the one-shot judge
+                "Score": round((ratings[i] - low) / (high - low), 4) if high > low else 0.5,
+                "appearances": appearances[i],
+                "win_rate": round(wins[i] / comparisons[i], 4) if comparisons[i] else float("nan"),
+            })
+
+        decided = first_position["win"] + first_position["loss"]
+        stats = {
+            "metric": metric_name,
+            "calls": len(calls),
+            "failed_calls": failed,
+            "comparisons": len(outcomes),
+            "unjudged": sum(1 for i in range(n) if appearances[i] == 0),    # budget too small
+            "first_position_win_rate": round(first_position["win"] / decided, 4) if decided else None,
+        }
+        return rows, stats
+
+    async def run_all(self, metrics_library, context, candidates):
+        rows, stats = [], []
+        for metric_name, steps in metrics_library.items():
+            metric_rows, metric_stats = await self.run_metric(metric_name, steps, context, candidates)
+            rows.extend(metric_rows)
+            stats.append(metric_stats)
+        return rows, stats
+
+    def run(self, metrics_library, context, candidates):
+        return asyncio.run(self.run_all(metrics_library, context, candidates))
+
+
+def load_candidates(paths):
+    """One candidate per unique (model, response) in the run tables."""
+    candidates = []
+    seen = set()
+    for path in paths:
+        df = pd.read_csv(path)
+        if "model_response" not in df.columns:
+            continue
+        model_col = "model_file" if "model_file" in df.columns else ("model" if "model" in df.columns else None)
+        for _, row in df.iterrows():
+            response = "" if pd.isna(row["model_response"]) else str(row["model_response"])
+            model = str(row[model_col]) if model_col else path
+            if response.strip() and (model, response) not in seen:
+                seen.add((model, response))
+                candidates.append({"model": model, "response": response})
+    return candidates
+
+
+# ---------------------------
+# 4) MAIN
+# ---------------------------
+def main():
+    from test_DeepEval import JUDGE_BASE_URL, JUDGE_CONCURRENCY, JUDGE_MODEL, context_text, metrics_library, models_data
+
+    parser = argparse.ArgumentParser(description="Tournament-style relative judging over many candidates.")
+    parser.add_argument("run_tables", nargs="*", help="run tables with model_response (default: models_data in test_DeepEval.py)")
+    parser.add_argument("--mode", choices=["batch", "pairwise"], default="batch")
+    parser.add_argument("--batch-size", type=int, default=6)
+    parser.add_argument("--max-calls", type=int, default=200, help="judge call budget per metric")
+    parser.add_argument("--rating", choices=["bt", "elo"], default="bt")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--prefilter", action="store_true",
+                        help="skip candidates lexical_metrics already flags (empty / copy / loop); they score 0")
+    parser.add_argument("--output", default="llm_a_judge_tournament_scores.csv")
+    args = parser.parse_args()
+
+    candidates = load_candidates(args.run_tables) if args.run_tables else \
+        [{"model": m["model"], "response": m["response"]} for m in models_data]
+
+    skipped = []
+    if args.prefilter:
+        for c in candidates:
+            c["prefilter"] = lexical_metrics(c["response"], context_text)["judge_prefilter"]
+        skipped = [c for c in candidates if c["prefilter"]]
+        candidates = [c for c in candidates if not c["prefilter"]]
+        print(f"🧹 Pre-filter: {len(skipped)} candidates skip the judge")
+
+    print(f"📊 {len(candidates)} candidates, {len(metrics_library)} metrics, mode={args.mode}, "
+          f"budget={args.max_calls} calls/metric")
+
+    if not candidates and not skipped:
+        raise SystemExit("No non-empty responses to judge")
+
+    engine = JudgeEngine(model=JUDGE_MODEL, base_url=JUDGE_BASE_URL, max_concurrency=JUDGE_CONCURRENCY)
+    tournament = JudgeTournament(engine, args.mode, args.batch_size, args.max_calls, args.rating, args.seed)
+    if len(candidates) < 2:
+        # Nothing to compare against: no judge calls, the rows below carry NaN / the floor score
+        print("⚠️  Fewer than two candidates reach the judge, skipping the tournament")
+    rows, stats = tournament.run(metrics_library, context_text, candidates)
+
+    for s in stats:
+        print(f"   {s['metric']}: {s['calls']} calls ({s['failed_calls']} failed), {s['comparisons']} comparisons, "
+              f"{s['unjudged']} unjudged"
+              + (f", first-position win rate {s['first_position_win_rate']}" if s['first_position_win_rate'] is not None else ""))
+    print(f"   judge calls: {engine.stats['called']}, cached: {engine.stats['cached']}, retries: {engine.stats['retries']}")
+
+    # Pre-filtered outputs get the floor score on every metric
+    rows += [{"Model": c["model"], "Metric": metric_name, "rating": float("nan"), "Score": 0.0,
+              "appearances": 0, "win_rate": float("nan"), "prefilter": c["prefilter"]}
+             for c in skipped for metric_name in metrics_library]
+
+    df = pd.DataFrame(rows)
+    # Identical model names (several responses per model) are averaged
+    pivot_df = df.pivot_table(index="Model", columns="Metric", values="Score", aggfunc="mean").reset_index()
+    pivot_df.columns.name = None
+    print(pivot_df)
+
+    pivot_df.to_csv(args.output, index=False)
+    df.to_csv(args.output.replace(".csv", "_detail.csv"), index=False)
+    print(f"\n✅ Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import os
+import re
+from functools import lru_cache
+
+# Source prompt of the summarization task (same context as RunnerConfig / test_DeepEval.py)
+DEFAULT_SOURCE = (
+    "The World Wide Web (WWW) was invented by British scientist Tim Berners-Lee "
+    "in 1989. He was working at CERN, the European Organization for Nuclear "
+    "Research, near Geneva, Switzerland. Berners-Lee created the Web to meet "
+    "the demand for automatic information-sharing between scientists in "
+    "universities and institutes around the world."
+)
+
+TOKEN_PATTERN = re.compile(r"\w+(?:[-']\w+)*")
+TERMINAL_CHARS = '.!?"\')]»”’*'
+
+# Pre-filter thresholds: outputs caught here get a rule-based verdict instead of a judge call
+COPY_SPAN_RATIO = 0.80      # "IMMEDIATE FAIL if >80% similarity" in the Overall_Quality steps
+MIN_NOVEL_BIGRAMS = 0.10
+LOOP_SCORE = 0.50
+MIN_TOKENS = 5
+
+LEXICAL_COLUMNS = [
+    'compression_ratio',            # response tokens / source tokens
+    'novel_unigram_fraction',       # response n-grams not in the source
+    'novel_bigram_fraction',
+    'novel_trigram_fraction',
+    'longest_copied_span',          # tokens, longest contiguous run copied from the source
+    'longest_copied_span_ratio',    # / response tokens
+    'repetition_score',             # 1 - distinct/total 4-grams of the response
+    'truncated',                    # 0/1, ends mid-sentence
+    'judge_prefilter',              # "" = needs the judge, else empty / copy / loop
+]
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def ngrams(tokens, n):
+    return list(zip(*(tokens[i:] for i in range(n))))
+
+
+@lru_cache(maxsize=64)
+def _source_index(source):
+    """Tokens and n-gram sets of a source text; shared by every run with the same prompt."""
+    tokens = tokenize(source)
+    return tokens, {n: set(ngrams(tokens, n)) for n in (1, 2, 3)}
+
+
+def longest_copied_span(response_tokens, source_tokens):
+    """
+    Longest contiguous token sequence of the response that also occurs in the source.
+    Binary search on the length with sets of source k-grams: O((n + m) log n).
+    """
+    lo, hi = 0, min(len(response_tokens), len(source_tokens))
+    while lo < hi:
+        k = (lo + hi + 1) // 2
+        if set(ngrams(response_tokens, k)) & set(ngrams(source_tokens, k)):
+            lo = k
+        else:
+            hi = k - 1
+    return lo
+
+
+def repetition_score(tokens, n=4):
+    grams = ngrams(tokens, n)
+    if not grams:
+        return 0.0
+    return 1.0 - len(set(grams)) / len(grams)
+
+
+def is_truncated(text):
+    stripped = text.rstrip()
+    return bool(stripped) and stripped[-1] not in TERMINAL_CHARS
+
+
+def judge_prefilter(metrics):
+    """Reason this output does not need the judge ("" = send it to the judge)."""
+    if metrics['response_tokens'] < MIN_TOKENS:
+        return "empty"
+    if metrics['longest_copied_span_ratio'] > COPY_SPAN_RATIO or metrics['novel_bigram_fraction'] < MIN_NOVEL_BIGRAMS:
+        return "copy"
+    if metrics['repetition_score'] > LOOP_SCORE:
+        return "loop"
+    return ""
+
+
+def lexical_metrics(response, source):
+    """Reference-free extractiveness / degeneration metrics of one response against its source prompt."""
+    source_tokens, source_grams = _source_index(source)
+    tokens = tokenize(response or "")
+
+    metrics = {col: 0.0 for col in LEXICAL_COLUMNS}
+    metrics['longest_copied_span'] = 0
+    metrics['response_tokens'] = len(tokens)
+    metrics['truncated'] = int(is_truncated(response or ""))
+
+    if tokens:
+        if source_tokens:
+            metrics['compression_ratio'] = round(len(tokens) / len(source_tokens), 4)
+        for n, name in ((1, 'novel_unigram_fraction'), (2, 'novel_bigram_fraction'), (3, 'novel_trigram_fraction')):
+            grams = ngrams(tokens, n)
+            if grams:
+                metrics[name] = round(sum(g not in source_grams[n] for g in grams) / len(grams), 4)
+        span = longest_copied_span(tokens, source_tokens)
+        metrics['longest_copied_span'] = span
+        metrics['longest_copied_span_ratio'] = round(span / len(tokens), 4)
+        metrics['repetition_score'] = round(repetition_score(tokens), 4)
+
+    metrics['judge_prefilter'] = judge_prefilter(metrics)
+    return metrics
+
+
+def score_frame(df, source, response_col="model_response", source_col=None):
+    """
+    Adds LEXICAL_COLUMNS to a run table. Identical (source, response) pairs are computed
+    once, which at --temp 0 is most of a 30-repetition experiment.
+    """
+    responses = df[response_col].fillna("").astype(str)
+    sources = df[source_col].fillna("").astype(str) if source_col else [source] * len(df)
+
+    memo = {}
+    rows = []
+    for response, src in zip(responses, sources):
+        key = (src, response)
+        if key not in memo:
+            memo[key] = lexical_metrics(response, src)
+        rows.append(memo[key])
+
+    for col in LEXICAL_COLUMNS:
+        df[col] = [row[col] for row in rows]
+    return df
+
+
+def main():
+    import time
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Reference-free lexical metrics for every stored run.")
+    parser.add_argument("run_tables", nargs="+", help="run_table.csv / per-model CSV files with model_response")
+    parser.add_argument("--source-column", default=None, help="per-run source prompt column (default: the summarization context)")
+    parser.add_argument("--output-dir", default=None, help="write copies here instead of updating in place")
+    args = parser.parse_args()
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.time()
+    n_runs = 0
+    for path in args.run_tables:
+        df = pd.read_csv(path)
+        if "model_response" not in df.columns:
+            print(f"--> [SKIP] {path} has no model_response column")
+            continue
+        df = score_frame(df, DEFAULT_SOURCE, source_col=args.source_column)
+        n_runs += len(df)
+
+        flagged = df["judge_prefilter"].value_counts().drop("", errors="ignore")
+        print(f"    {path}: {len(df)} runs" + (f", pre-filtered: {dict(flagged)}" if len(flagged) else ""))
+
+        out_path = path if args.output_dir is None else os.path.join(args.output_dir, os.path.basename(path))
+        df.to_csv(out_path, index=False)
+
+    print(f"--> {n_runs} runs in {time.time() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
+import os
 import pandas as pd
-from typing import List
-from pydantic import BaseModel, Field
-from openai import OpenAI
+from judge_engine import JudgeEngine
 
 # ---------------------------
 # 1) DATA SETUP
@@ -139,68 +138,25 @@ metrics_library = {
 }
 
 # ---------------------------
-# 3) STRUCTURED OUTPUT DEFINITION
+# 3) JUDGE ENGINE
 # ---------------------------
-class ModelScore(BaseModel):
-    # Changed from model_name (str) to model_id (int) to prevent hallucinations
-    model_id: int 
-    score: float = Field(..., description="Score from 0.00 to 1.00")
-
-class MetricVerdict(BaseModel):
-    rankings: List[ModelScore]
+# Structured output (ModelScore / MetricVerdict), the relative-scoring prompt, the verdict
+# cache and retries live in judge_engine.py. Any OpenAI-compatible endpoint works:
+#   JUDGE_BASE_URL=http://127.0.0.1:8080/v1       -> local llama.cpp server
+#   JUDGE_BASE_URL=http://127.0.0.1:8089/v1       -> plugins/judge_stub (offline)
+JUDGE_MODEL = os.environ.get("JUDGE_MODEL", "gpt-5.2") # Ensure a structured-output capable model is used
+JUDGE_BASE_URL = os.environ.get("JUDGE_BASE_URL") or None
+JUDGE_CONCURRENCY = int(os.environ.get("JUDGE_CONCURRENCY", "4"))
 
 # ---------------------------
 # 4) THE RELATIVE SCORING ENGINE
 # ---------------------------
-def evaluate_specific_metric(metric_name, steps, context, models):
-    client = OpenAI()
-    
-    # Map IDs to Names for safe retrieval later
-    id_map = {m['index']: m['model'] for m in models}
-
-    # Format the candidate text using IDs only
-    candidates_text = ""
-    for m in models:
-        candidates_text += f"--- MODEL ID: {m['index']} ---\n{m['response']}\n\n"
-
-    steps_text = "\n".join([f"- {s}" for s in steps])
-
-    system_prompt = (
-        f"You are an expert evaluator grading AI summaries on the metric: {metric_name.upper()}.\n\n"
-        f"EVALUATION STEPS:\n{steps_text}\n\n"
-        "INSTRUCTIONS:\n"
-        "1. Read the SOURCE CONTEXT.\n"
-        "2. Read all MODEL CANDIDATES (identified by ID).\n"
-        "3. Compare the candidates AGAINST EACH OTHER based on the Evaluation Steps.\n"
-        "4. Assign a score (0.00 - 1.00). The best model relative to the others should get the highest score.\n"
-        "5. Be strict. If a model hallucinates, give it a low score on Consistency."
-    )
-
-    user_prompt = f"SOURCE CONTEXT:\n{context}\n\nCANDIDATES:\n{candidates_text}"
-
-    # Updated to use standard beta.chat.completions.parse
-    response = client.beta.chat.completions.parse(
-        model="gpt-5.2", # Ensure a structured-output capable model is used
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0,
-        seed=42, # Forces deterministic output
-        response_format=MetricVerdict,
-    )   
-    
-    rankings = response.choices[0].message.parsed.rankings
-    
-    # Map IDs back to real names
-    results_mapped = []
-    for r in rankings:
-        results_mapped.append({
-            "model_name": id_map.get(r.model_id, f"Unknown_ID_{r.model_id}"),
-            "score": r.score
-        })
-        
-    return results_mapped
+def evaluate_specific_metric(metric_name, steps, context, models, engine=None):
+    engine = engine or JudgeEngine(model=JUDGE_MODEL, base_url=JUDGE_BASE_URL)
+    scores, errors = engine.run({metric_name: steps}, context, models)
+    if metric_name in errors:
+        raise errors[metric_name]
+    return scores[metric_name]
 
 # ---------------------------
 # 5) MAIN EXECUTION LOOP
@@ -209,13 +165,16 @@ if __name__ == "__main__":
     
     final_data = []
 
-    # Loop through every metric defined
-    for metric_name, steps in metrics_library.items():
-        print(f"📊 Evaluating metric: {metric_name}...")
-        
-        # Run the relative comparison for this metric
-        results = evaluate_specific_metric(metric_name, steps, context_text, models_data)
-        
+    engine = JudgeEngine(model=JUDGE_MODEL, base_url=JUDGE_BASE_URL, max_concurrency=JUDGE_CONCURRENCY)
+    print(f"📊 Evaluating {len(metrics_library)} metrics with {JUDGE_MODEL} ({JUDGE_CONCURRENCY} concurrent)...")
+
+    # All metrics run concurrently; finished verdicts are cached, so a rerun only redoes failures
+    results_by_metric, errors = engine.run(metrics_library, context_text, models_data)
+    for metric_name, error in errors.items():
+        print(f"❌ {metric_name} failed: {type(error).__name__}: {error}")
+    print(f"   judge calls: {engine.stats['called']}, cached: {engine.stats['cached']}, retries: {engine.stats['retries']}")
+
+    for metric_name, results in results_by_metric.items():
         # Store results
         for res in results:
             final_data.append({
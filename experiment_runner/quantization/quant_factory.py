@@ -0,0 +1,278 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from os.path import dirname, realpath
+from pathlib import Path
+
+sys.path.insert(0, dirname(dirname(realpath(__file__))))
+from model_downloader import load_manifest, update_manifest, sha256_file
+
+# Scripted version of phi-2_imatrix_quantization.ipynb, CPU only:
+#   HF model -> F16 GGUF (once) -> imatrix on a wikitext2 slice (once per calibration)
+#   -> a grid of quant variants in parallel, registered in LOCAL_MODEL_PATH/models_manifest.json
+# The vendored android-app/ tree has no conversion or quantization tools, so this uses a
+# host llama.cpp checkout built without GPU backends (cmake -B build && cmake --build build).
+
+ROOT_DIR = Path(dirname(realpath(__file__)))
+CACHE_DIR = ROOT_DIR / ".quant_cache"
+LLAMA_CPP_DIR = os.environ.get("LLAMA_CPP_DIR", os.path.expanduser("~/llm_on_device/llama.cpp"))
+WIKITEXT_DIR = ROOT_DIR.parent.parent / "scrapers" / "benchmark dataset downloader" / "Dataset" / "wikitext2 dataset"
+
+DEFAULT_QUANTS = ["Q4_0", "Q4_K_M", "IQ4_XS", "Q5_K_M", "Q8_0"]
+CALIB_CTX = 512
+
+
+# ---------------------------
+# TOOLS
+# ---------------------------
+def _tool(name):
+    """Path of a llama.cpp binary in the host build (build/bin, or the checkout root like the notebook)."""
+    for candidate in (os.path.join(LLAMA_CPP_DIR, "build", "bin", name), os.path.join(LLAMA_CPP_DIR, name)):
+        if os.path.exists(candidate):
+            return candidate
+    raise FileNotFoundError(f"{name} not found in {LLAMA_CPP_DIR} (set LLAMA_CPP_DIR)")
+
+
+def _run(cmd, log_path):
+    """Runs cmd with its output in log_path; the log tail is raised on failure."""
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "w", encoding="utf-8") as log:
+        result = subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT)
+    if result.returncode != 0:
+        with open(log_path, "r", encoding="utf-8", errors="ignore") as log:
+            tail = log.read()[-2000:]
+        raise RuntimeError(f"{os.path.basename(cmd[0])} failed ({result.returncode}), see {log_path}:\n{tail}")
+
+
+def _write_json(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+# ---------------------------
+# SOURCE MODEL
+# ---------------------------
+def fetch_source(model, work_dir):
+    """
+    (local HF directory, revision) of a repo id or local directory. Repos are pinned to
+    the current commit; local directories are identified by their weight files.
+    """
+    if os.path.isdir(model):
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(model)):
+            path = os.path.join(model, name)
+            if os.path.isfile(path):
+                stat = os.stat(path)
+                digest.update(f"{name}:{stat.st_size}:{int(stat.st_mtime)}\n".encode())
+        return model, f"local:{digest.hexdigest()[:16]}"
+
+    from huggingface_hub import HfApi, snapshot_download
+
+    revision = HfApi().model_info(model).sha
+    local_dir = os.path.join(work_dir, "hf")
+    # Weights other than the HF checkpoint (other GGUFs, ONNX, TF/Flax) are not needed
+    snapshot_download(repo_id=model, revision=revision, local_dir=local_dir,
+                      ignore_patterns=["*.gguf", "*.onnx", "*.h5", "*.msgpack", "*.ot", "original/*"])
+    return local_dir, revision
+
+
+def convert_to_gguf(hf_dir, revision, work_dir, name, outtype="f16"):
+    """Converts once per source revision; convert.json records what the GGUF was built from."""
+    gguf_path = os.path.join(work_dir, f"{name}-{outtype.upper()}.gguf")
+    record_path = os.path.join(work_dir, "convert.json")
+    record = _read_json(record_path)
+    if os.path.exists(gguf_path) and record and record.get("revision") == revision and record.get("outtype") == outtype:
+        print(f"    [SKIP] {os.path.basename(gguf_path)} (revision {revision[:12]})")
+        return gguf_path
+
+    print(f"    [CONVERT] {hf_dir} -> {os.path.basename(gguf_path)}")
+    script = os.path.join(LLAMA_CPP_DIR, "convert_hf_to_gguf.py")
+    _run([sys.executable, script, hf_dir, "--outfile", gguf_path, "--outtype", outtype],
+         os.path.join(work_dir, "logs", "convert.log"))
+    _write_json(record_path, {"revision": revision, "outtype": outtype, "gguf": os.path.basename(gguf_path)})
+    return gguf_path
+
+
+# ---------------------------
+# CALIBRATION
+# ---------------------------
+def calibration_text(split="train", start=0, rows=None):
+    """
+    Raw text of a wikitext2 slice (rows [start, start + rows) of the split CSV written by
+    scrapers/benchmark dataset downloader/downloader.ipynb). Use the train split: the test
+    split is what RunnerConfig's perplexity mode evaluates.
+    """
+    path = WIKITEXT_DIR / f"wikitext2_{split}.csv"
+    if not path.exists():
+        raise FileNotFoundError(f"{path} not found; run downloader.ipynb to export the {split} split")
+    parts = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            if i < start:
+                continue
+            if rows is not None and i >= start + rows:
+                break
+            parts.append(row["text"] or "\n")
+    return "".join(parts)
+
+
+def compute_imatrix(gguf_path, revision, text, work_dir, chunks, threads):
+    """
+    Importance matrix cached under imatrix/<key>.dat, keyed by the source revision, the
+    calibration text hash and the imatrix settings; a new slice or model recomputes it.
+    """
+    calib_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    key = hashlib.sha256(f"{revision}|{calib_hash}|{chunks}|{CALIB_CTX}".encode()).hexdigest()[:16]
+    imatrix_path = os.path.join(work_dir, "imatrix", f"{key}.dat")
+    if os.path.exists(imatrix_path):
+        print(f"    [SKIP] imatrix {key}")
+        return imatrix_path, key
+
+    os.makedirs(os.path.dirname(imatrix_path), exist_ok=True)
+    calib_path = os.path.join(work_dir, "calib", f"{calib_hash[:16]}.txt")
+    os.makedirs(os.path.dirname(calib_path), exist_ok=True)
+    with open(calib_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    print(f"    [IMATRIX] {chunks} chunks of {CALIB_CTX} tokens ({len(text)} characters) -> {key}")
+    # Written to .part first so an interrupted run is not mistaken for a cached matrix
+    part_path = os.path.join(os.path.dirname(imatrix_path), f"{key}.part.dat")
+    _run([_tool("llama-imatrix"), "-m", gguf_path, "-f", calib_path, "-o", part_path,
+          "--chunks", str(chunks), "-c", str(CALIB_CTX), "-t", str(threads)],
+         os.path.join(work_dir, "logs", f"imatrix-{key}.log"))
+    os.replace(part_path, imatrix_path)
+    _write_json(f"{imatrix_path}.json", {"revision": revision, "calibration_sha256": calib_hash,
+                                         "chunks": chunks, "ctx": CALIB_CTX})
+    return imatrix_path, key
+
+
+# ---------------------------
+# QUANTIZATION GRID
+# ---------------------------
+def quantize_grid(gguf_path, imatrix_path, imatrix_key, name, quants, out_dir, work_dir, jobs, threads):
+    """
+    One llama-quantize per variant, `jobs` at a time with the threads split between them.
+    Variants already in the manifest with the same imatrix are kept.
+    """
+    manifest = load_manifest(out_dir)
+    todo = []
+    for quant in quants:
+        filename = f"{name}-{quant}.gguf"
+        entry = manifest.get(filename, {})
+        if os.path.exists(os.path.join(out_dir, filename)) and entry.get("imatrix") == imatrix_key:
+            print(f"    [SKIP] {filename}")
+        else:
+            todo.append((quant, filename))
+
+    def quantize(quant, filename):
+        out_path = os.path.join(out_dir, filename)
+        part_path = f"{out_path}.part"
+        cmd = [_tool("llama-quantize")]
+        if imatrix_path:
+            cmd += ["--imatrix", imatrix_path]
+        cmd += [gguf_path, part_path, quant, str(threads)]
+        _run(cmd, os.path.join(work_dir, "logs", f"quantize-{quant}.log"))
+        os.replace(part_path, out_path)
+        return {
+            "quant": quant,
+            "size": os.path.getsize(out_path),
+            "sha256": sha256_file(out_path),
+        }
+
+    entries = {}
+    failed = {}
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = {pool.submit(quantize, quant, filename): filename for quant, filename in todo}
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                entries[filename] = future.result()
+                print(f"    [QUANT] {filename} ({entries[filename]['size'] / 1024 ** 2:.0f} MiB)")
+            except Exception as e:
+                failed[filename] = e
+                print(f"    [FAIL] {filename}: {e}")
+    return entries, failed
+
+
+def build_variants(model, quants=DEFAULT_QUANTS, out_dir="models", split="train", start=0, rows=None,
+                   chunks=100, outtype="f16", jobs=None, threads=None, name=None):
+    """Runs the pipeline for one model; returns the manifest entries of the new variants."""
+    name = name or os.path.basename(model.rstrip("/"))
+    work_dir = os.path.join(CACHE_DIR, name if os.path.isdir(model) else model.replace("/", "--"))
+    os.makedirs(work_dir, exist_ok=True)
+    os.makedirs(out_dir, exist_ok=True)
+    threads = threads or os.cpu_count() or 4
+    jobs = jobs or min(len(quants), 4)
+
+    print(f"--> [{name}] source")
+    hf_dir, revision = fetch_source(model, work_dir)
+    gguf_path = convert_to_gguf(hf_dir, revision, work_dir, name, outtype)
+
+    print(f"--> [{name}] calibration")
+    text = calibration_text(split, start, rows)
+    imatrix_path, imatrix_key = compute_imatrix(gguf_path, revision, text, work_dir, chunks, threads)
+
+    print(f"--> [{name}] {len(quants)} variants, {jobs} at a time")
+    entries, failed = quantize_grid(gguf_path, imatrix_path, imatrix_key, name, quants, out_dir, work_dir,
+                                    jobs, max(1, threads // jobs))
+
+    quantized_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    calibration = f"wikitext2_{split}[{start}:{'' if rows is None else start + rows}]"
+    for entry in entries.values():
+        entry.update({
+            "repo_id": model if not os.path.isdir(model) else "",
+            "source": "quant_factory",
+            "revision": revision,
+            "imatrix": imatrix_key,
+            "calibration": calibration,
+            "quantized_at": quantized_at,
+        })
+    if entries:
+        # RunnerConfig adds every quant_factory entry of the manifest to the model_file factor
+        update_manifest(out_dir, entries)
+    return entries, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert, calibrate and quantize HF models into LOCAL_MODEL_PATH.")
+    parser.add_argument("models", nargs="+", help="HF repo ids or local HF model directories")
+    parser.add_argument("--quants", nargs="+", default=DEFAULT_QUANTS)
+    parser.add_argument("--out", default=os.environ.get("LOCAL_MODEL_PATH", "models"), help="model directory")
+    parser.add_argument("--split", default="train", help="wikitext2 split used for calibration")
+    parser.add_argument("--start", type=int, default=0, help="first calibration row")
+    parser.add_argument("--rows", type=int, default=None, help="calibration rows (default: to the end)")
+    parser.add_argument("--chunks", type=int, default=100, help="imatrix chunks of 512 tokens")
+    parser.add_argument("--outtype", default="f16", help="precision of the converted GGUF (f16, bf16, f32)")
+    parser.add_argument("--jobs", type=int, default=None, help="concurrent llama-quantize processes")
+    parser.add_argument("--threads", type=int, default=None, help="total threads (default: all cores)")
+    args = parser.parse_args()
+
+    n_failed = 0
+    for model in args.models:
+        entries, failed = build_variants(
+            model, [q.upper() for q in args.quants], args.out, args.split, args.start, args.rows,
+            args.chunks, args.outtype, args.jobs, args.threads
+        )
+        n_failed += len(failed)
+        print(f"--> [{model}] {len(entries)} variants written to {args.out}, {len(failed)} failed")
+    sys.exit(1 if n_failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import glob
+import hashlib
+import json
+import os
+from pathlib import Path
+
+# Content-addressed store of measured runs. A run is keyed by everything that decides its
+# result (binaries, model file, command line, prompt, device, runner version); a repetition
+# whose key already has a stored row is replayed instead of measured again.
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".run_cache"
+HASH_CHUNK = 1024 * 1024
+
+
+class RunCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._digest_index_path = self.root / "file_digests.json"
+        try:
+            with open(self._digest_index_path, "r", encoding="utf-8") as f:
+                self._digest_index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._digest_index = {}
+
+    # --- Content hashes ---
+    def file_digest(self, path):
+        """
+        sha256 of a file, remembered by path, size and mtime so multi-GB models are hashed
+        once. Returns "" for a missing file.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return ""
+        path = os.path.realpath(path)
+        entry = self._digest_index.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK), b""):
+                sha.update(block)
+        self._digest_index[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha.hexdigest()}
+        with open(self._digest_index_path, "w", encoding="utf-8") as f:
+            json.dump(self._digest_index, f, indent=1)
+        return sha.hexdigest()
+
+    def build_digest(self, build_dir, binary):
+        """One digest over the binary and every lib*.so next to it."""
+        paths = [os.path.join(build_dir, binary)] + sorted(glob.glob(os.path.join(build_dir, "lib*.so")))
+        parts = [f"{os.path.basename(p)}:{self.file_digest(p)}" for p in paths]
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def run_key(components):
+        """Key of a configuration: sha256 over its components as canonical JSON."""
+        blob = json.dumps(components, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    # --- Stored runs ---
+    def _dir(self, key):
+        return self.root / key[:2] / key
+
+    def runs(self, key):
+        """Stored rows of a key, in the order they were measured."""
+        rows = []
+        try:
+            with open(self._dir(key) / "runs.jsonl", "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        rows.append(json.loads(line))
+        except FileNotFoundError:
+            pass
+        return rows
+
+    def count(self, key):
+        return len(self.runs(key))
+
+    def get(self, key, repetition):
+        """The stored row for a repetition index, or None if that repetition still has to run."""
+        rows = self.runs(key)
+        return rows[repetition] if repetition < len(rows) else None
+
+    def store(self, key, components, row):
+        """Appends a measured row; the components are written once, next to the rows."""
+        run_dir = self._dir(key)
+        run_dir.mkdir(parents=True, exist_ok=True)
+        key_file = run_dir / "key.json"
+        if not key_file.exists():
+            with open(key_file, "w", encoding="utf-8") as f:
+                json.dump(components, f, indent=2, sort_keys=True)
+        with open(run_dir / "runs.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(row) + "\n")
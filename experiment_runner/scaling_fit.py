@@ -0,0 +1,180 @@
+import argparse
+import json
+from pathlib import Path
+
+from pareto import CONFIG, load_runs
+
+# Per-configuration cost curves over prompt length, fitted on RUN_MODE=scaling run tables:
+#   prefill  time / energy  = c0 + c1 n + c2 n^2     (n prompt tokens; the n^2 term is attention)
+#   decode   time / energy per token = d0 + d1 kv    (kv cells in use; each step reads the whole cache)
+# The coefficients are stored as JSON so the cost of unseen prompt sizes can be predicted.
+
+# A curve is fitted per configuration: the factor columns except its own x axis
+GROUP = [c for c in CONFIG if c != "prompt_length"]
+
+DEFAULT_COEFFICIENTS = "scaling_coefficients.json"
+
+# curve -> (x column, y column, polynomial degree)
+CURVES = {
+    "prefill_ms": ("input_token_count", "prefill_ms", 2),
+    "prefill_j": ("input_token_count", "prefill_energy", 2),
+    "decode_ms_per_token": ("kv_fill", "decode_ms_per_token", 1),
+    "decode_j_per_token": ("kv_fill", "decode_energy_per_token", 1),
+}
+
+
+def fit_curve(x, y, degree):
+    """Least-squares polynomial (coefficients lowest order first) and its R^2; None with too few lengths."""
+    import numpy as np
+
+    x, y = np.asarray(x, float), np.asarray(y, float)
+    valid = np.isfinite(x) & np.isfinite(y)
+    x, y = x[valid], y[valid]
+    # One spare length beyond an exact fit, so R^2 says something
+    if len(np.unique(x)) <= degree + 1:
+        return None
+    design = np.vander(x, degree + 1, increasing=True)
+    coef = np.linalg.lstsq(design, y, rcond=None)[0]
+    residual = y - design @ coef
+    total = ((y - y.mean()) ** 2).sum()
+    return {
+        "coef": [float(c) for c in coef],
+        "r2": round(float(1 - (residual ** 2).sum() / total), 4) if total else 1.0,
+        "n_points": int(len(x)),
+    }
+
+
+def config_key(config):
+    """JSON key of a configuration, e.g. "model_file=a.gguf;kv_cache_type=q8_0;flash_attn=on"."""
+    return ";".join(f"{column}={value}" for column, value in config.items())
+
+
+def fit(runs):
+    """
+    config_key -> the configuration's factor levels, fitted curves, the prompt range they
+    were fitted on and the run count. Factor columns absent from the tables are left out.
+    """
+    import pandas as pd
+
+    runs = runs.copy()
+    keys = [c for c in GROUP if c in runs.columns]
+    runs[keys] = runs[keys].fillna("").astype(str)
+    for col in ("input_token_count", "output_token_count", "prefill_latency", "prefill_energy",
+                "decode_ms_per_token", "decode_energy_per_token", "kv_fill"):
+        if col in runs.columns:
+            runs[col] = pd.to_numeric(runs[col], errors="coerce")
+    runs = runs[runs["input_token_count"] > 0]
+    runs["prefill_ms"] = runs["prefill_latency"] * 1000.0
+    # Runs whose energy log had no samples in a phase have no energy for it
+    for col in ("prefill_energy", "decode_energy_per_token"):
+        if col in runs.columns:
+            runs.loc[runs[col] <= 0, col] = float("nan")
+
+    models = {}
+    for levels, group in runs.groupby(keys):
+        config = dict(zip(keys, levels))
+        curves = {}
+        for name, (x_col, y_col, degree) in CURVES.items():
+            if x_col in group.columns and y_col in group.columns:
+                curve = fit_curve(group[x_col], group[y_col], degree)
+                if curve is not None:
+                    curves[name] = curve
+        models[config_key(config)] = {
+            "config": config,
+            "n_runs": int(len(group)),
+            "prompt_tokens": [int(group["input_token_count"].min()), int(group["input_token_count"].max())],
+            "generated_tokens": int(group["output_token_count"].median()),
+            "curves": curves,
+        }
+    return models
+
+
+def _poly(curve, x):
+    return sum(c * x ** k for k, c in enumerate(curve["coef"])) if curve else float("nan")
+
+
+def predict(model, prompt_tokens, generated_tokens=None):
+    """
+    Cost of one request from a model's fitted curves. Decode sums the per-token cost over
+    the growing KV fill: d0 g + d1 (g n + g (g - 1) / 2). `extrapolated` marks prompt sizes
+    outside the fitted range.
+    """
+    curves = model["curves"]
+    n = prompt_tokens
+    g = model["generated_tokens"] if generated_tokens is None else generated_tokens
+    fill = g * n + g * (g - 1) / 2
+
+    def decode(name):
+        curve = curves.get(name)
+        return curve["coef"][0] * g + curve["coef"][1] * fill if curve else float("nan")
+
+    prefill_ms, prefill_j = _poly(curves.get("prefill_ms"), n), _poly(curves.get("prefill_j"), n)
+    decode_ms, decode_j = decode("decode_ms_per_token"), decode("decode_j_per_token")
+    first_step_ms = _poly(curves.get("decode_ms_per_token"), n)
+    low, high = model["prompt_tokens"]
+    return {
+        "prompt_tokens": n,
+        "generated_tokens": g,
+        "prefill_ms": round(prefill_ms, 1),
+        "prefill_ms_per_token": round(prefill_ms / n, 4) if n else float("nan"),
+        "prefill_j": round(prefill_j, 4),
+        "decode_ms": round(decode_ms, 1),
+        "decode_j": round(decode_j, 4),
+        "time_to_first_token_s": round((prefill_ms + first_step_ms) / 1000.0, 3),
+        "inference_s": round((prefill_ms + decode_ms) / 1000.0, 3),
+        "energy_j": round(prefill_j + decode_j, 4),
+        "extrapolated": not low <= n <= high,
+    }
+
+
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Fit and apply prefill/decode cost curves over prompt length.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_fit = sub.add_parser("fit", help="fit per-model curves on RUN_MODE=scaling run tables")
+    p_fit.add_argument("run_tables", nargs="+")
+    p_fit.add_argument("--drop-throttled", action="store_true")
+    p_fit.add_argument("--output", default=DEFAULT_COEFFICIENTS)
+
+    p_predict = sub.add_parser("predict", help="predicted cost of prompt sizes from stored coefficients")
+    p_predict.add_argument("prompt_tokens", nargs="+", type=int)
+    p_predict.add_argument("--coefficients", default=DEFAULT_COEFFICIENTS)
+    p_predict.add_argument("--model", action="append", help="model_file to predict for (default: all); repeatable")
+    p_predict.add_argument("--where", action="append", default=[], metavar="COLUMN=LEVEL",
+                           help="only configurations with this factor level, e.g. kv_cache_type=q8_0; repeatable")
+    p_predict.add_argument("--generated", type=int, help="generated tokens (default: as in the fitted runs)")
+    args = parser.parse_args()
+
+    pd.set_option("display.width", 200)
+
+    if args.command == "fit":
+        models = fit(load_runs(args.run_tables, args.drop_throttled))
+        rows = [{**m["config"], "n_runs": m["n_runs"], "prompt_tokens": "-".join(map(str, m["prompt_tokens"])),
+                 **{f"{curve}_r2": c["r2"] for curve, c in m["curves"].items()}} for m in models.values()]
+        print(pd.DataFrame(rows).to_string(index=False))
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(models, f, indent=2)
+        print(f"--> Saved coefficients of {len(models)} configurations to {args.output}")
+
+    elif args.command == "predict":
+        with open(args.coefficients, "r", encoding="utf-8") as f:
+            models = json.load(f)
+        where = dict(condition.split("=", 1) for condition in args.where)
+        if args.model:
+            missing = [name for name in args.model if not any(m["config"]["model_file"] == name for m in models.values())]
+            if missing:
+                raise SystemExit(f"No coefficients for {', '.join(missing)} in {Path(args.coefficients).name}")
+        names = [key for key, m in sorted(models.items())
+                 if (not args.model or m["config"]["model_file"] in args.model)
+                 and all(m["config"].get(column) == level for column, level in where.items())]
+        if not names:
+            raise SystemExit(f"No configuration in {Path(args.coefficients).name} matches {', '.join(args.where)}")
+        rows = [{**models[key]["config"], **predict(models[key], n, args.generated)}
+                for key in names for n in args.prompt_tokens]
+        print(pd.DataFrame(rows).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
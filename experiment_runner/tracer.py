@@ -0,0 +1,153 @@
+import csv
+import functools
+import json
+import os
+import subprocess
+import time
+from contextlib import contextmanager
+
+
+class Tracer:
+    """
+    Records nested host-side spans (runner hooks, device commands, sleeps, parsing)
+    and exports them as Chrome/Perfetto trace JSON plus a per-phase overhead summary.
+    """
+
+    def __init__(self):
+        self.events = []            # Chrome "X" (complete) events, ts/dur in µs
+        self.windows = []           # [(start_us, end_us)] energy measurement windows
+        self._window_start = None
+        self._pid = os.getpid()
+        self._epoch_offset_us = time.time_ns() // 1000 - self._now_us()
+
+    @staticmethod
+    def _now_us():
+        return time.perf_counter_ns() // 1000
+
+    # --- Recording ---
+    @contextmanager
+    def span(self, name, cat="phase", **args):
+        start = self._now_us()
+        try:
+            yield
+        finally:
+            end = self._now_us()
+            self.events.append({
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": start,
+                "dur": max(end - start, 0),
+                "pid": self._pid,
+                "tid": 1,
+                "args": args,
+            })
+
+    def hook(self, name, fn):
+        """Wraps a RunnerConfig hook so each call is recorded as a span."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            run_id = ""
+            if args and hasattr(args[0], "execute_run"):
+                run_id = args[0].execute_run.get("__run_id", "")
+            with self.span(name, cat="hook", run_id=run_id):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def run(self, name, cmd, **kwargs):
+        """subprocess.run() recorded as a 'cmd' span."""
+        with self.span(name, cat="cmd", cmd=cmd if isinstance(cmd, str) else " ".join(cmd)):
+            return subprocess.run(cmd, **kwargs)
+
+    def sleep(self, name, seconds):
+        with self.span(name, cat="sleep", seconds=seconds):
+            time.sleep(seconds)
+
+    def open_window(self):
+        """Marks the start of the on-device energy measurement window."""
+        self._window_start = self._now_us()
+
+    def close_window(self):
+        if self._window_start is not None:
+            self.windows.append((self._window_start, self._now_us()))
+            self._window_start = None
+
+    # --- Analysis ---
+    def _in_window_us(self, event):
+        start, end = event["ts"], event["ts"] + event["dur"]
+        return sum(max(0, min(end, w_end) - max(start, w_start)) for w_start, w_end in self.windows)
+
+    def _self_times_us(self):
+        """Span duration minus the time covered by its direct children."""
+        ordered = sorted(range(len(self.events)), key=lambda i: (self.events[i]["ts"], -self.events[i]["dur"]))
+        self_us = {i: self.events[i]["dur"] for i in ordered}
+        stack = []
+        for i in ordered:
+            event = self.events[i]
+            while stack and self.events[stack[-1]]["ts"] + self.events[stack[-1]]["dur"] <= event["ts"]:
+                stack.pop()
+            if stack:
+                self_us[stack[-1]] -= event["dur"]
+            stack.append(i)
+        return self_us
+
+    def summary(self):
+        """
+        One row per phase name: call count, total/self/mean/max ms and the (inclusive)
+        ms that overlapped an energy measurement window.
+        """
+        self_us = self._self_times_us()
+        rows = {}
+        for i, event in enumerate(self.events):
+            row = rows.setdefault(event["name"], {
+                "phase": event["name"], "cat": event["cat"], "calls": 0,
+                "total_ms": 0.0, "self_ms": 0.0, "max_ms": 0.0, "in_window_ms": 0.0,
+            })
+            dur_ms = event["dur"] / 1000.0
+            row["calls"] += 1
+            row["total_ms"] += dur_ms
+            row["self_ms"] += self_us[i] / 1000.0
+            row["max_ms"] = max(row["max_ms"], dur_ms)
+            row["in_window_ms"] += self._in_window_us(event) / 1000.0
+
+        for row in rows.values():
+            row["mean_ms"] = row["total_ms"] / row["calls"]
+            for key in ("total_ms", "self_ms", "max_ms", "in_window_ms", "mean_ms"):
+                row[key] = round(row[key], 3)
+
+        return sorted(rows.values(), key=lambda r: r["self_ms"], reverse=True)
+
+    # --- Export ---
+    def save_trace(self, path):
+        window_events = [
+            {"name": "energy window", "cat": "window", "ph": "X", "ts": start, "dur": end - start,
+             "pid": self._pid, "tid": 2, "args": {}}
+            for start, end in self.windows
+        ]
+        trace = {
+            "traceEvents": self.events + window_events + [
+                {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": 1, "args": {"name": "runner"}},
+                {"name": "thread_name", "ph": "M", "pid": self._pid, "tid": 2, "args": {"name": "measurement"}},
+            ],
+            "displayTimeUnit": "ms",
+            "otherData": {"epoch_offset_us": self._epoch_offset_us},
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+
+    def save_summary(self, path):
+        rows = self.summary()
+        fields = ["phase", "cat", "calls", "total_ms", "self_ms", "mean_ms", "max_ms", "in_window_ms"]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        return rows
+
+    @staticmethod
+    def format_summary(rows, limit=20):
+        lines = [f"{'phase':<36} {'calls':>6} {'self_ms':>12} {'mean_ms':>10} {'in_window_ms':>13}"]
+        for row in rows[:limit]:
+            lines.append(f"{row['phase'][:36]:<36} {row['calls']:>6} {row['self_ms']:>12.1f} "
+                         f"{row['mean_ms']:>10.1f} {row['in_window_ms']:>13.1f}")
+        return "\n".join(lines)
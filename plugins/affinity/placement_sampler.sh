@@ -0,0 +1,41 @@
+#!/system/bin/sh
+# Thread placement sampler for unrooted Android shells.
+# Usage: sh placement_sampler.sh <out_file> [interval_s] [process_name]
+#
+# Waits for the process, then records where the scheduler put each of its threads.
+# Header line:  H,<pid>,<Cpus_allowed_list>
+# Sample lines: S,<uptime_s>,<tid>:<cpu>,...   (cpu = field 39 of /proc/<pid>/task/<tid>/stat,
+#                                               the CPU the thread last ran on)
+
+OUT="$1"
+INTERVAL="${2:-0.2}"
+NAME="${3:-llama-cli}"
+
+# --- 1. WAIT FOR THE PROCESS (started after this sampler) ---
+PID=""
+while [ -z "$PID" ]; do
+    PID=$(pidof "$NAME")
+    [ -n "$PID" ] || sleep 0.05
+done
+PID=${PID%% *}
+
+ALLOWED=""
+while read KEY VALUE; do
+    [ "$KEY" = "Cpus_allowed_list:" ] && ALLOWED="$VALUE"
+done < /proc/$PID/status
+echo "H,$PID,$ALLOWED" > "$OUT"
+
+# --- 2. SAMPLE LOOP (shell builtins only, no fork except sleep) ---
+while [ -d /proc/$PID ]; do
+    read UPTIME _ < /proc/uptime
+    LINE="S,$UPTIME"
+    for t in /proc/$PID/task/*; do
+        read STAT < "$t/stat" 2>/dev/null || continue
+        # Fields after "(comm) ": $1 is field 3, so field 39 is $37
+        set -- ${STAT##*) }
+        shift 36
+        LINE="$LINE,${t##*/}:$1"
+    done
+    echo "$LINE" >> "$OUT"
+    sleep "$INTERVAL"
+done
@@ -0,0 +1,695 @@
+#!/usr/bin/env python3
+# Record/replay stand-in for `adb` so RunnerConfig can run without a phone.
+#
+# Usage (drop-in for ADB_PATH):
+#   ADB_PATH=plugins/fake_adb/adb RUNNER_SPEEDUP=100 python experiment-runner/ experiment_runner/RunnerConfig.py
+#
+# Environment:
+#   FAKE_ADB_SESSIONS  directory with recorded sessions. Either an experiment results
+#                      directory (run_table.csv + run_*/llama_output.txt, run_logcat.txt,
+#                      optionally llama_metrics.jsonl for --metrics-file and
+#                      perplexity_output.txt for llama-perplexity; llama-batched-bench,
+#                      llama-speculative and llama-lookup output is derived from
+#                      llama_output.txt)
+#                      or one sub-directory per session named after the model file.
+#   FAKE_ADB_STATE     device state directory (default: <tmp>/fake_adb_state)
+#   FAKE_ADB_SPEEDUP   divide every replayed duration by this factor
+#                      (default: RUNNER_SPEEDUP, which RunnerConfig also uses for its sleeps)
+#   FAKE_ADB_FAULTS    comma list of fault probabilities, e.g. "drop=0.05,truncate=0.1,nostats=0.1"
+#                      drop     -> command fails as if the wireless connection dropped
+#                      truncate -> `pull` writes only part of the file
+#                      nostats  -> `logcat -d` contains no BatteryMgr stats lines
+#   FAKE_ADB_SEED      seed for fault injection (default: random)
+
+import csv
+import glob
+import json
+import os
+import random
+import re
+import shlex
+import shutil
+import sys
+import tempfile
+import time
+
+SESSIONS_DIR = os.environ.get("FAKE_ADB_SESSIONS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions"))
+STATE_DIR = os.environ.get("FAKE_ADB_STATE", os.path.join(tempfile.gettempdir(), "fake_adb_state"))
+SPEEDUP = float(os.environ.get("FAKE_ADB_SPEEDUP", os.environ.get("RUNNER_SPEEDUP", "1")))
+SEED = os.environ.get("FAKE_ADB_SEED")
+
+N_CPUS = 8                            # Snapdragon 8 Elite: cpu0-5 performance, cpu6-7 prime
+PUSH_BANDWIDTH = 40 * 1024 * 1024     # bytes/s, typical wireless ADB
+COMMAND_LATENCY = 0.03                # seconds per adb round trip
+STATS_TAG = "BatteryMgr:DataCollectionService: stats =>"
+SPINUP_MS = 2000                      # RunnerConfig waits this long between service start and launch
+BATCH_SATURATION = 0.3                # decode speed of B sequences = B / (1 + 0.3 (B - 1)) x single stream
+ACCEPT_RATES = {"llama-speculative": 0.65, "llama-lookup": 0.3}   # per drafted token
+VERIFY_COST = 0.05                    # extra target cost per drafted token verified in the batch
+DRAFT_COST = 0.12                     # draft model cost per drafted token, relative to one target step
+PROMPT_CHARS_PER_TOKEN = 4            # -f prompt files: tokens = characters / 4
+PREFILL_KNEE = 4096                   # prompt tokens at which attention doubles the prefill cost per token
+DECODE_KNEE = 8192                    # KV cells in use at which decode speed halves
+SESSION_READ_BANDWIDTH = 1.5 * 1024 ** 3   # bytes/s loading a --prompt-cache session file
+
+
+def _faults():
+    faults = {}
+    for item in os.environ.get("FAKE_ADB_FAULTS", "").split(","):
+        if "=" in item:
+            name, prob = item.split("=", 1)
+            faults[name.strip()] = float(prob)
+    return faults
+
+
+FAULTS = _faults()
+RNG = random.Random()
+
+
+def _fault(name):
+    return RNG.random() < FAULTS.get(name, 0.0)
+
+
+def _sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds / SPEEDUP)
+
+
+# ==========================================
+# 1. DEVICE STATE
+# ==========================================
+def _device_path(remote_path):
+    """Maps an absolute device path into the fake filesystem."""
+    return os.path.join(STATE_DIR, "fs", remote_path.lstrip("/"))
+
+
+def _load_state():
+    try:
+        with open(os.path.join(STATE_DIR, "state.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"calls": 0, "logcat": [], "service_start": None, "sample_rate": 100, "session_index": 0,
+                "sampler_start": None, "sampler_out": None, "last_session": None}
+
+
+def _save_state(state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    tmp_path = os.path.join(STATE_DIR, "state.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(STATE_DIR, "state.json"))
+
+
+# ==========================================
+# 2. RECORDED SESSIONS
+# ==========================================
+def _sessions_for_model(model):
+    """Returns recorded session directories for a model file (falls back to all sessions)."""
+    sessions = []
+    run_table = os.path.join(SESSIONS_DIR, "run_table.csv")
+    if os.path.exists(run_table):
+        with open(run_table, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                run_dir = os.path.join(SESSIONS_DIR, row.get("__run_id", ""))
+                if row.get("model_file") == model and os.path.isdir(run_dir):
+                    sessions.append(run_dir)
+    else:
+        sessions = [d for d in sorted(glob.glob(os.path.join(SESSIONS_DIR, "*")))
+                    if os.path.isdir(d) and model and os.path.basename(d) in model]
+
+    if not sessions:
+        sessions = [os.path.dirname(p) for p in sorted(glob.glob(os.path.join(SESSIONS_DIR, "**", "llama_output.txt"), recursive=True))]
+    return sessions
+
+
+def _recorded_total_seconds(llama_output):
+    match = re.search(r"total time\s+=\s+(\d+\.\d+)\s+ms", llama_output)
+    return float(match.group(1)) / 1000.0 if match else 5.0
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+# ==========================================
+# 3. SHELL EMULATION
+# ==========================================
+def _run_llama(cmd, state, recorded_output="llama_output.txt"):
+    model_match = re.search(r"-m\s+(\S+)", cmd)
+    model = model_match.group(1) if model_match else ""
+    sessions = [s for s in _sessions_for_model(model) if os.path.exists(os.path.join(s, recorded_output))]
+    if not sessions:
+        print(f"fake_adb: no recorded {recorded_output} for {model}", file=sys.stderr)
+        return 1
+
+    session = sessions[state["session_index"] % len(sessions)]
+    state["session_index"] += 1
+    state["last_session"] = session
+
+    _record_launch(cmd, state)
+
+    cd_match = re.search(r"cd\s+(\S+)", cmd)
+    cwd = cd_match.group(1) if cd_match else "/"
+    llama_output = _read(os.path.join(session, recorded_output))
+    # llama-cli -f: a prompt of another length than the recording
+    prompt_file = re.search(r"\s-f\s+(\S+)", cmd) if recorded_output == "llama_output.txt" else None
+    if prompt_file:
+        llama_output = _scale_to_prompt(llama_output, _device_path(f"{cwd}/{prompt_file.group(1)}"))
+    prompt_cache = re.search(r"--prompt-cache\s+(\S+)", cmd) if recorded_output == "llama_output.txt" else None
+    if prompt_cache:
+        llama_output = _run_prompt_cache(cmd, llama_output, _device_path(f"{cwd}/{prompt_cache.group(1)}"))
+    _sleep(_recorded_total_seconds(llama_output))
+
+    _write_output(cmd, llama_output)
+
+    # --metrics-file: only written when the session recorded one (for its own prompt)
+    metrics = re.search(r"--metrics-file\s+(\S+)", cmd)
+    recorded_metrics = os.path.join(session, "llama_metrics.jsonl")
+    if metrics and os.path.exists(recorded_metrics) and not (prompt_file or prompt_cache):
+        metrics_path = metrics.group(1)
+        if not metrics_path.startswith("/"):
+            metrics_path = f"{cwd}/{metrics_path}"
+        os.makedirs(os.path.dirname(_device_path(metrics_path)), exist_ok=True)
+        shutil.copyfile(recorded_metrics, _device_path(metrics_path))
+    return 0
+
+
+def _scale_to_prompt(llama_output, prompt_path):
+    """
+    Rewrites the recorded perf lines for the prompt in prompt_path: prefill slows down
+    per token as attention grows (PREFILL_KNEE), decode as the KV cache fills (DECODE_KNEE).
+    """
+    try:
+        n_prompt = max(1, len(_read(prompt_path)) // PROMPT_CHARS_PER_TOKEN)
+    except FileNotFoundError:
+        return llama_output
+    prompt = re.search(r"prompt eval time =\s+([\d\.]+) ms /\s+(\d+) tokens.*?([\d\.]+) tokens per second\)", llama_output)
+    decode = re.search(r"\s eval time =\s+([\d\.]+) ms /\s+(\d+) runs.*?([\d\.]+) tokens per second\)", llama_output)
+    load = re.search(r"load time =\s+([\d\.]+) ms", llama_output)
+    if not (prompt and decode):
+        return llama_output
+
+    n_recorded, n_generated = int(prompt.group(2)), int(decode.group(2))
+    speed_pp = float(prompt.group(3)) * (1 + n_recorded / PREFILL_KNEE) / (1 + n_prompt / PREFILL_KNEE)
+    speed_tg = float(decode.group(3)) * (1 + (n_recorded + n_generated / 2) / DECODE_KNEE) \
+        / (1 + (n_prompt + n_generated / 2) / DECODE_KNEE)
+    t_pp, t_tg = 1000.0 * n_prompt / speed_pp, 1000.0 * n_generated / speed_tg
+    total = (float(load.group(1)) if load else 0.0) + t_pp + t_tg
+
+    llama_output = re.sub(r"prompt eval time =.*", f"prompt eval time = {t_pp:10.2f} ms / {n_prompt:5d} tokens "
+                          f"({t_pp / n_prompt:8.2f} ms per token, {speed_pp:8.2f} tokens per second)", llama_output)
+    llama_output = re.sub(r"(?<=\s)eval time =.*runs.*", f"eval time = {t_tg:10.2f} ms / {n_generated:5d} runs   "
+                          f"({t_tg / n_generated:8.2f} ms per token, {speed_tg:8.2f} tokens per second)", llama_output)
+    return re.sub(r"total time =.*", f"total time = {total:10.2f} ms / {n_prompt + n_generated:5d} tokens", llama_output)
+
+
+def _run_prompt_cache(cmd, llama_output, session_path):
+    """
+    llama-cli --prompt-cache: the session file holds the prompt it was saved for (first line)
+    and is sized like the KV cells it covers. A stored prefix of the new prompt is restored
+    instead of evaluated; without --prompt-cache-ro the file is (re)written.
+    """
+    prompt = re.search(r"-p '(.*?)' ", cmd, re.DOTALL)
+    text = prompt.group(1) if prompt else ""
+    prompt_eval = re.search(r"prompt eval time =\s+([\d\.]+) ms /\s+(\d+) tokens.*?([\d\.]+) tokens per second\)", llama_output)
+    kv = re.search(r"llama_kv_cache: size =\s+([\d\.]+) MiB \(\s*(\d+) cells", llama_output)
+    load = re.search(r"load time =\s+([\d\.]+) ms", llama_output)
+    if not (text and prompt_eval):
+        return llama_output
+    n_prompt, speed_pp = int(prompt_eval.group(2)), float(prompt_eval.group(3))
+    bytes_per_cell = float(kv.group(1)) * 1024 * 1024 / int(kv.group(2)) if kv else 0.0
+    start = float(load.group(1)) / 1000.0 if load else 0.0
+
+    def stamp(seconds):
+        if "--log-timestamps" not in cmd:
+            return ""
+        us = int(seconds * 1e6)
+        return f"{us // 60000000}.{us // 1000000 % 60:02d}.{us // 1000 % 1000:03d}.{us % 1000:03d} I "
+
+    name = os.path.basename(session_path)
+    lines = [f"{stamp(start)}main: attempting to load saved session from '{name}'"]
+    reused = 0
+    if os.path.exists(session_path) and os.path.getsize(session_path):
+        with open(session_path, "r", encoding="utf-8", errors="ignore") as f:
+            cached_text = json.loads(f.readline())["prompt"]
+        cached = max(1, round(n_prompt * len(cached_text) / len(text)))
+        common = len(os.path.commonprefix([cached_text, text]))
+        reused = min(cached, round(n_prompt * common / len(text)))
+        load_s = os.path.getsize(session_path) / SESSION_READ_BANDWIDTH
+        lines.append(f"{stamp(start + load_s)}main: loaded a session with prompt size of {cached} tokens")
+        if common == len(text):
+            lines.append(f"{stamp(start + load_s)}main: session file has exact match for prompt!")
+        elif reused < n_prompt / 2:
+            lines.append(f"{stamp(start + load_s)}main: session file has low similarity to prompt ({reused} / {n_prompt} tokens); will mostly be reevaluated")
+        else:
+            lines.append(f"{stamp(start + load_s)}main: session file matches {reused} / {n_prompt} tokens of prompt")
+    else:
+        lines.append(f"{stamp(start)}main: session file does not exist, will create.")
+
+    if "--prompt-cache-ro" not in cmd:
+        os.makedirs(os.path.dirname(session_path), exist_ok=True)
+        with open(session_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"prompt": text}) + "\n")
+        os.truncate(session_path, int(n_prompt * bytes_per_cell) + 4096)
+
+    # An exact match still evaluates the last prompt token for its logits
+    n_eval = max(1, n_prompt - reused)
+    t_pp = 1000.0 * n_eval / speed_pp
+    llama_output = re.sub(r"prompt eval time =.*", f"prompt eval time = {t_pp:10.2f} ms / {n_eval:5d} tokens "
+                          f"({t_pp / n_eval:8.2f} ms per token, {speed_pp:8.2f} tokens per second)", llama_output)
+    total = re.search(r"total time =\s+([\d\.]+) ms /\s+(\d+) tokens", llama_output)
+    if total:
+        saved_ms = 1000.0 * (n_prompt - n_eval) / speed_pp
+        llama_output = re.sub(r"total time =.*", f"total time = {float(total.group(1)) - saved_ms:10.2f} ms / "
+                              f"{int(total.group(2)) - (n_prompt - n_eval):5d} tokens", llama_output)
+    perf = llama_output.find("llama_perf_")
+    perf = perf if perf >= 0 else len(llama_output)
+    return llama_output[:perf] + "\n".join(lines) + "\n" + llama_output[perf:]
+
+
+def _record_launch(cmd, state):
+    """Affinity and thread count of the launch, for the placement sampler."""
+    mask = re.search(r"taskset\s+([0-9a-fA-F]+)", cmd)
+    threads = re.search(r"-t\s+(\d+)", cmd)
+    state["last_launch"] = {"mask": int(mask.group(1), 16) if mask else 0,
+                            "threads": int(threads.group(1)) if threads else 4}
+
+
+def _write_output(cmd, text):
+    """Writes a launch's output where its `> file 2>&1` points (stdout without a redirect)."""
+    cd_match = re.search(r"cd\s+(\S+)", cmd)
+    cwd = cd_match.group(1) if cd_match else "/"
+
+    redirect = re.search(r">\s*(\S+)\s+2>&1", cmd)
+    if redirect and redirect.group(1) != "/dev/null":
+        out_path = redirect.group(1)
+        if not out_path.startswith("/"):
+            out_path = f"{cwd}/{out_path}"
+        os.makedirs(os.path.dirname(_device_path(out_path)), exist_ok=True)
+        with open(_device_path(out_path), "w", encoding="utf-8") as f:
+            f.write(text)
+    elif not redirect:
+        sys.stdout.write(text)
+
+
+def _flag(cmd, flag, default):
+    match = re.search(rf"{flag}\s+(\d+)", cmd)
+    return int(match.group(1)) if match else default
+
+
+def _run_batched_bench(cmd, state):
+    """
+    llama-batched-bench has no recordings: its output is derived from the session's
+    llama-cli log. Prefill keeps the recorded speed, aggregate decode speed grows
+    sub-linearly with the number of sequences and the KV cache scales with -c.
+    """
+    model_match = re.search(r"-m\s+(\S+)", cmd)
+    model = model_match.group(1) if model_match else ""
+    sessions = _sessions_for_model(model)
+    if not sessions:
+        print(f"fake_adb: no recorded llama_output.txt for {model}", file=sys.stderr)
+        return 1
+    session = sessions[state["session_index"] % len(sessions)]
+    state["session_index"] += 1
+    state["last_session"] = session
+    _record_launch(cmd, state)
+
+    recorded = _read(os.path.join(session, "llama_output.txt"))
+    pp, tg, pl, n_ctx = _flag(cmd, "-npp", 128), _flag(cmd, "-ntg", 128), _flag(cmd, "-npl", 1), _flag(cmd, "-c", 512)
+
+    speed_pp = float(re.search(r"prompt eval time.*?([\d\.]+) tokens per second", recorded).group(1))
+    speed_tg1 = float(re.search(r"\beval time.*?([\d\.]+) tokens per second", recorded.split("prompt eval time")[-1]).group(1))
+    speed_tg = speed_tg1 * pl / (1 + BATCH_SATURATION * (pl - 1))
+    t_pp, t_tg = pl * pp / speed_pp, pl * tg / speed_tg
+    _sleep(t_pp + t_tg)
+
+    lines = []
+    kv_mib = 0.0
+    for line in recorded.splitlines():
+        if line.startswith(("generate:", "llama_perf", "llama_memory_breakdown")) or not line.startswith(("llama", "load", "print_info")):
+            continue
+        cells = re.search(r"size =\s+([\d\.]+) MiB \(\s*(\d+) cells", line)
+        if cells:
+            kv_mib = float(cells.group(1)) * n_ctx / int(cells.group(2))
+            line = re.sub(r"size =\s+[\d\.]+ MiB \(\s*\d+ cells", f"size = {kv_mib:8.2f} MiB ({n_ctx:6d} cells", line)
+            line = line.replace("1/1 seqs", f"{pl}/{pl} seqs")
+        line = re.sub(r"n_ctx\s+=\s+\d+", f"n_ctx         = {n_ctx}", line)
+        lines.append(line)
+
+    result = {"n_kv_max": n_ctx, "pp": pp, "tg": tg, "pl": pl, "n_kv": pl * (pp + tg),
+              "t_pp": round(t_pp, 6), "speed_pp": round(speed_pp, 6), "t_tg": round(t_tg, 6), "speed_tg": round(speed_tg, 6),
+              "t": round(t_pp + t_tg, 6), "speed": round(pl * (pp + tg) / (t_pp + t_tg), 6)}
+    lines.append(json.dumps(result))
+    lines += [l for l in recorded.splitlines() if "load time" in l]
+    breakdown = re.search(r"(\d+)\s+=\s+(\d+)\s+\+\s+(\d+)\s+\+\s+(\d+)", recorded)
+    if breakdown:
+        model_mib, compute_mib = int(breakdown.group(2)), int(breakdown.group(4))
+        context_mib = round(kv_mib)
+        lines.append(f"llama_memory_breakdown_print: |   - Host               |                 {model_mib + context_mib + compute_mib:4d} = "
+                     f"{model_mib:4d} + {context_mib:7d} + {compute_mib:7d}                |")
+    _write_output(cmd, "\n".join(lines) + "\n")
+    return 0
+
+
+def _run_speculative(cmd, state, binary):
+    """
+    llama-speculative / llama-lookup have no recordings either: the session's llama-cli
+    log supplies the model load, the response and the single-stream speeds; acceptance
+    follows ACCEPT_RATES and the speed-up the usual expected-tokens-per-step model.
+    """
+    model_match = re.search(r"-m\s+(\S+)", cmd)
+    model = model_match.group(1) if model_match else ""
+    sessions = _sessions_for_model(model)
+    if not sessions:
+        print(f"fake_adb: no recorded llama_output.txt for {model}", file=sys.stderr)
+        return 1
+    session = sessions[state["session_index"] % len(sessions)]
+    state["session_index"] += 1
+    state["last_session"] = session
+    _record_launch(cmd, state)
+
+    recorded = _read(os.path.join(session, "llama_output.txt"))
+    n_draft = _flag(cmd, "--draft-max", 16)
+    n_predict = _flag(cmd, "-n", 100)
+    prompt = re.search(r"-p '(.*?)' ", cmd, re.DOTALL)
+    response = re.search(r'Parsed message: (\{.*\})', recorded)
+    n_prompt = int(re.search(r"prompt eval time.*?/\s+(\d+) tokens", recorded).group(1))
+    speed_pp = float(re.search(r"prompt eval time.*?([\d\.]+) tokens per second", recorded).group(1))
+    speed_tg1 = float(re.search(r"\beval time.*?([\d\.]+) tokens per second", recorded.split("prompt eval time")[-1]).group(1))
+
+    accept = ACCEPT_RATES[binary]
+    tokens_per_step = (1 - accept ** (n_draft + 1)) / (1 - accept)
+    step_cost = 1 + VERIFY_COST * n_draft + (DRAFT_COST * n_draft if binary == "llama-speculative" else 0.0)
+    speed_tg = speed_tg1 * tokens_per_step / step_cost
+    steps = n_predict / tokens_per_step
+    n_drafted = int(round(steps * n_draft))
+    n_accept = int(round(n_predict - steps))
+    t_pp, t_tg = n_prompt / speed_pp, n_predict / speed_tg
+    _sleep(t_pp + t_tg)
+
+    header = [l for l in recorded.splitlines()
+              if l.startswith(("llama", "load", "print_info")) and not l.startswith(("llama_perf", "llama_memory_breakdown"))]
+    lines = list(header)
+    if binary == "llama-speculative":
+        lines += header     # the draft is loaded after the target
+    lines.append((prompt.group(1) if prompt else "") + (json.loads(response.group(1))["content"] if response else ""))
+    lines += [
+        "",
+        f"encoded {n_prompt:4d} tokens in {t_pp:8.3f} seconds, speed: {speed_pp:8.3f} t/s",
+        f"decoded {n_predict:4d} tokens in {t_tg:8.3f} seconds, speed: {speed_tg:8.3f} t/s",
+        "",
+        f"n_draft   = {n_draft}",
+        f"n_predict = {n_predict}",
+        f"n_drafted = {n_drafted}",
+        f"n_accept  = {n_accept}",
+        f"accept    = {100.0 * n_accept / n_drafted if n_drafted else 0.0:.3f}%",
+    ]
+    perf = [l for l in recorded.splitlines() if l.startswith("llama_perf_context_print")]
+    if binary == "llama-speculative":
+        lines += ["", "draft:", ""] + perf + ["", "target:", ""]
+    lines += perf
+    lines += [l for l in recorded.splitlines() if l.startswith("llama_memory_breakdown")]
+    _write_output(cmd, "\n".join(lines) + "\n")
+    return 0
+
+
+def _recorded_stats(session):
+    """Recorded (timestamp_ms, rest_of_line) stats samples from a session logcat."""
+    samples = []
+    if session and os.path.exists(os.path.join(session, "run_logcat.txt")):
+        for line in _read(os.path.join(session, "run_logcat.txt")).splitlines():
+            if STATS_TAG in line:
+                prefix, csv_part = line.split("stats => ", 1)
+                parts = csv_part.strip().split(",")
+                try:
+                    samples.append((int(parts[0]), prefix, ",".join(parts[1:])))
+                except (ValueError, IndexError):
+                    continue
+    return samples
+
+
+def _stop_service(state):
+    """
+    Replays the recorded power samples of the last session, rebased to the service
+    start. Without a recording, synthesizes idle samples for the (sped-up) wall time.
+    """
+    if state["service_start"] is None:
+        return
+    start_ms = int(state["service_start"] * 1000)
+    recorded = _recorded_stats(state["last_session"])
+
+    if recorded:
+        first_ts = recorded[0][0]
+        for ts, prefix, values in recorded:
+            state["logcat"].append(f"{prefix}stats => {start_ms + ts - first_ts},{values}")
+    else:
+        elapsed_ms = (time.time() - state["service_start"]) * 1000.0 * SPEEDUP
+        interval = state["sample_rate"]
+        for i in range(int(elapsed_ms // interval) + 1):
+            state["logcat"].append(f"{STATS_TAG} {start_ms + i * interval},-450000,3950,80,300")
+    state["service_start"] = None
+
+
+def _write_thermal_log(state):
+    if state["sampler_start"] is None or not state["sampler_out"]:
+        return
+    out_path = _device_path(state["sampler_out"])
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    recorded = os.path.join(state["last_session"] or "", "thermal_log.txt")
+    if state["last_session"] and os.path.exists(recorded):
+        shutil.copyfile(recorded, out_path)
+    else:
+        elapsed = (time.time() - state["sampler_start"]) * SPEEDUP
+        lines = [f"H,{int(state['sampler_start'] * 1e9)},1000.00,policy0:3532800,policy6:4473600,thermal_zone0=cpu-0-0"]
+        for i in range(int(elapsed / 0.1) + 1):
+            lines.append(f"S,{1000 + i * 0.1:.2f},policy0:2227200:3532800,policy6:3840000:4473600,thermal_zone0:41000")
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+    state["sampler_start"] = None
+
+
+def _write_stamps(cmd, state):
+    """
+    `date +%s%N > file` / `>> file` before a launch. While the power service runs, the
+    stamps sit SPINUP_MS into the replayed logcat timeline (see _stop_service).
+    """
+    if state["service_start"] is not None:
+        stamp_ns = int((state["service_start"] * 1000 + SPINUP_MS) * 1e6)
+    else:
+        stamp_ns = time.time_ns()
+    for redirect, path in re.findall(r"date \+%s%N (>>?) (\S+)", cmd):
+        os.makedirs(os.path.dirname(_device_path(path)), exist_ok=True)
+        with open(_device_path(path), "a" if redirect == ">>" else "w", encoding="utf-8") as f:
+            f.write(f"{stamp_ns}\n")
+
+
+def _write_placement_log(state):
+    """Threads spread round-robin over the launch's affinity mask (all CPUs without one)."""
+    out = state.get("placement_out")
+    if not out or state.get("placement_start") is None:
+        return
+    launch = state.get("last_launch") or {"mask": 0, "threads": 4}
+    cpus = [cpu for cpu in range(N_CPUS) if launch["mask"] >> cpu & 1] or list(range(N_CPUS))
+    elapsed = (time.time() - state["placement_start"]) * SPEEDUP
+    pid = 4242
+    lines = [f"H,{pid},{cpus[0]}-{cpus[-1]}" if len(cpus) > 1 else f"H,{pid},{cpus[0]}"]
+    for i in range(max(1, int(elapsed / 0.2))):
+        # Main thread plus one worker per -t
+        fields = [f"{pid + k}:{cpus[(k + i) % len(cpus)]}" for k in range(launch["threads"] + 1)]
+        lines.append(f"S,{1000 + i * 0.2:.2f}," + ",".join(fields))
+    os.makedirs(os.path.dirname(_device_path(out)), exist_ok=True)
+    with open(_device_path(out), "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    state["placement_start"] = None
+
+
+def shell(cmd, state):
+    cmd = cmd.strip()
+
+    if "date +%s%N" in cmd:
+        _write_stamps(cmd, state)
+
+    # Before the llama checks: the sampler command names the binary it waits for
+    if "placement_sampler.sh" in cmd:
+        out = re.search(r"placement_sampler\.sh\s+(\S+)", cmd)
+        state["placement_out"] = out.group(1) if out else None
+        state["placement_start"] = time.time()
+        return 0
+
+    # Recorded sessions come from a build with --metrics-file
+    if "llama-cli --help" in cmd:
+        print("1" if "grep -c -- --metrics-file" in cmd else "  --metrics-file FNAME")
+        return 0
+
+    if "llama-cli" in cmd:
+        return _run_llama(cmd, state)
+
+    if "llama-batched-bench" in cmd:
+        return _run_batched_bench(cmd, state)
+
+    for binary in ACCEPT_RATES:
+        if f"./{binary} " in cmd:
+            return _run_speculative(cmd, state, binary)
+
+    if "llama-perplexity" in cmd:
+        return _run_llama(cmd, state, "perplexity_output.txt")
+
+    if cmd == "getprop ro.serialno":
+        print("FAKEADB0001")
+        return 0
+
+    if cmd.startswith("logcat"):
+        if "-c" in cmd.split():
+            state["logcat"] = []
+        elif "-d" in cmd.split():
+            nostats = _fault("nostats")
+            for line in state["logcat"]:
+                if not (nostats and STATS_TAG in line):
+                    print(line)
+        return 0
+
+    if "start-foreground-service" in cmd:
+        rate = re.search(r"--ei\s+sampleRate\s+(\d+)", cmd)
+        state["sample_rate"] = int(rate.group(1)) if rate else 100
+        state["service_start"] = time.time()
+        return 0
+
+    if "stopservice" in cmd:
+        _stop_service(state)
+        return 0
+
+    if "thermal_sampler.sh" in cmd:
+        out = re.search(r"thermal_sampler\.sh\s+(\S+)", cmd)
+        state["sampler_out"] = out.group(1) if out else None
+        state["sampler_start"] = time.time()
+        return 0
+
+    if cmd.startswith("kill"):
+        if "placement_sampler" in cmd:
+            _write_placement_log(state)
+        else:
+            _write_thermal_log(state)
+        return 0
+
+    exists = re.match(r"\[\s+-f\s+\"?([^\"\s]+)\"?\s+\]", cmd)
+    if exists:
+        return 0 if os.path.exists(_device_path(exists.group(1))) else 1
+
+    if cmd.startswith("rm "):
+        for path in shlex.split(cmd)[1:]:
+            if path.startswith("-"):
+                continue
+            for match in glob.glob(_device_path(path)):
+                if os.path.isfile(match):
+                    os.remove(match)
+        return 0
+
+    # Unrooted phone: no su, so cold runs rely on the posix_fadvise helper
+    if cmd.startswith("su "):
+        print("/system/bin/sh: su: inaccessible or not found", file=sys.stderr)
+        return 127
+
+    evict = re.match(r"(\S+/fadvise_dontneed) \"?([^\"\s]+)\"?$", cmd)
+    if evict:
+        if not os.path.exists(_device_path(evict.group(1))) or not os.path.exists(_device_path(evict.group(2))):
+            return 1
+        print(f"0/{max(1, os.path.getsize(_device_path(evict.group(2))) // 4096)}")
+        return 0
+
+    size = re.match(r"stat -c %s (\S+)$", cmd)
+    if size:
+        if not os.path.exists(_device_path(size.group(1))):
+            print(f"stat: '{size.group(1)}': No such file or directory", file=sys.stderr)
+            return 1
+        print(os.path.getsize(_device_path(size.group(1))))
+        return 0
+
+    # settings / pm grant / dumpsys / chmod / am force-stop: accepted as no-ops
+    return 0
+
+
+# ==========================================
+# 4. FILE TRANSFER
+# ==========================================
+def push(local_path, remote_path):
+    if not os.path.exists(local_path):
+        print(f"adb: error: cannot stat '{local_path}': No such file or directory", file=sys.stderr)
+        return 1
+    if remote_path.endswith("/"):
+        remote_path += os.path.basename(local_path)
+    target = _device_path(remote_path)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    # Large files (models) are stored as stubs; only the transfer time is replayed
+    size = os.path.getsize(local_path)
+    if size > 1024 * 1024:
+        with open(target, "w", encoding="utf-8") as f:
+            f.write(f"fake_adb stub for {os.path.abspath(local_path)} ({size} bytes)\n")
+    else:
+        shutil.copyfile(local_path, target)
+    _sleep(size / PUSH_BANDWIDTH)
+    print(f"{local_path}: 1 file pushed. {size / PUSH_BANDWIDTH:.1f}s")
+    return 0
+
+
+def pull(remote_path, local_path):
+    source = _device_path(remote_path)
+    if not os.path.exists(source):
+        print(f"adb: error: failed to stat remote object '{remote_path}': No such file or directory", file=sys.stderr)
+        return 1
+    if os.path.isdir(local_path):
+        local_path = os.path.join(local_path, os.path.basename(remote_path))
+    with open(source, "rb") as f:
+        data = f.read()
+    if _fault("truncate"):
+        data = data[:RNG.randint(0, len(data))]
+    with open(local_path, "wb") as f:
+        f.write(data)
+    print(f"{remote_path}: 1 file pulled.")
+    return 0
+
+
+# ==========================================
+# 5. ENTRY POINT
+# ==========================================
+def main(argv):
+    args = list(argv)
+    serial = None
+    if len(args) >= 2 and args[0] == "-s":
+        serial, args = args[1], args[2:]
+    if not args:
+        print("fake_adb: missing command", file=sys.stderr)
+        return 1
+
+    state = _load_state()
+    state["calls"] += 1
+    # Each invocation is a new process: derive its fault draws from the seed and call count
+    if SEED is not None:
+        RNG.seed(f"{SEED}:{state['calls']}")
+
+    _sleep(COMMAND_LATENCY)
+    if _fault("drop"):
+        _save_state(state)
+        print(f"adb: device '{serial}' not found", file=sys.stderr)
+        return 1
+
+    command = args[0]
+    if command == "shell":
+        code = shell(" ".join(args[1:]), state)
+    elif command == "push" and len(args) >= 3:
+        code = push(args[1], args[2])
+    elif command == "pull" and len(args) >= 3:
+        code = pull(args[1], args[2])
+    elif command in ("devices", "connect", "disconnect", "wait-for-device"):
+        print(f"{serial or 'fake-device'}\tdevice")
+        code = 0
+    else:
+        print(f"fake_adb: unsupported command {' '.join(args)}", file=sys.stderr)
+        code = 1
+    _save_state(state)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
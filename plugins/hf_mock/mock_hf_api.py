@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# Offline stand-in for the parts of the Hugging Face Hub the GGUF crawler and downloader use.
+#
+# Usage:
+#   python plugins/hf_mock/mock_hf_api.py --port 8090 --models 2500
+#   HF_ENDPOINT=http://127.0.0.1:8090 python "scrapers/hugging face GGUF Models extract/fetch_models.py"
+#
+# Endpoints:
+#   GET /api/models?library=gguf&sort=likes&direction=-1&limit=N[&cursor=...]
+#       listing sorted by likes, cursor-paginated through the Link header like the Hub
+#   GET /api/models/<author>/<name>
+#       details: siblings (.gguf files), gguf {architecture, context_length, total}, cardData
+#   GET /api/models/<author>/<name>?blobs=true
+#       same, with size and LFS sha256 per file
+#   GET /<author>/<name>/resolve/main/<file>
+#       file contents (deterministic pseudo-random bytes), honours Range requests
+#   GET /stats
+#       request counters, to check how many detail calls an incremental crawl made
+#
+# The catalog is deterministic. --revision R simulates R later crawls: in every revision
+# about 10% of the models are updated (new lastModified), so a crawl at revision R+1 over a
+# cache built at revision R should only refetch those.
+#
+# Every tenth repo (v1, v11, ...) re-uploads the files of the repo before it under its own
+# names, so downloads can be deduplicated by sha256.
+#
+# Rate limiting: a fixed window of --rate requests per --window seconds. Every API response
+# carries 'RateLimit: "api";r=<remaining>;t=<reset>'; beyond the quota the server answers
+# 429 with Retry-After. File downloads are not rate limited (they come from a CDN), but
+# --throttle-mibs caps each connection and --drop cuts a fraction of them mid-transfer.
+#
+# Environment:
+#   MOCK_HF_LATENCY  seconds to wait before answering (default: 0.01)
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY = float(os.environ.get("MOCK_HF_LATENCY", "0.01"))
+
+AUTHORS = ["bartowski", "unsloth", "TheBloke", "mradermacher", "lmstudio-community", "QuantFactory"]
+FAMILIES = [
+    ("google/gemma-2-2b-it", "gemma2", 2614341888, 8192, "gemma"),
+    ("Qwen/Qwen2.5-0.5B-Instruct", "qwen2", 494032768, 32768, "apache-2.0"),
+    ("meta-llama/Llama-3.2-1B-Instruct", "llama", 1235814400, 131072, "llama3.2"),
+    ("microsoft/Phi-3-mini-4k-instruct", "phi3", 3821079552, 4096, "mit"),
+    ("HuggingFaceTB/SmolLM2-360M-Instruct", "llama", 361821120, 8192, "apache-2.0"),
+    ("mistralai/Mistral-7B-Instruct-v0.3", "llama", 7248023552, 32768, "apache-2.0"),
+]
+QUANTS = ["Q2_K", "Q3_K_M", "Q4_0", "Q4_K_M", "Q5_K_M", "Q6_K", "Q8_0", "IQ2_XXS", "IQ4_XS", "F16", "BF16"]
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+UPDATE_FRACTION = 0.10
+FILE_BYTES = 4 * 1024 * 1024
+SEND_BLOCK = 64 * 1024
+
+
+@lru_cache(maxsize=16)
+def file_bytes(content_key):
+    if not content_key:
+        return b"# Mock model card\n"
+    return random.Random(content_key).randbytes(FILE_BYTES)
+
+
+@lru_cache(maxsize=4096)
+def file_sha256(content_key):
+    return hashlib.sha256(file_bytes(content_key)).hexdigest()
+
+
+def _hash(*parts):
+    return int(hashlib.sha256(":".join(map(str, parts)).encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def build_catalog(n_models, revision):
+    catalog = []
+    for i in range(n_models):
+        base, arch, params, ctx, license_ = FAMILIES[i % len(FAMILIES)]
+        author = AUTHORS[_hash("author", i) % len(AUTHORS)]
+        repo_id = f"{author}/{base.split('/', 1)[1]}-v{i}-GGUF"
+
+        # Latest revision in which this model was touched
+        touched = max([0] + [r for r in range(1, revision + 1) if _hash("touch", i, r) % 1000 < UPDATE_FRACTION * 1000])
+        created = EPOCH + timedelta(hours=i)
+        # Re-uploads share the content (and so the sha256) of the original's files
+        content_i = i - 1 if i % 10 == 1 else i
+        quants = [q for q in QUANTS if _hash("quant", content_i, q) % 3 == 0] or ["Q4_K_M"]
+        name = repo_id.split("/", 1)[1].replace("-GGUF", "")
+        siblings = [(".gitattributes", ""), ("README.md", "")] + [(f"{name}-{q}.gguf", f"{content_i}:{q}") for q in quants]
+        if content_i % 7 == 0:
+            # Large quants come split into shards
+            siblings += [(f"{name}-F32-0000{k}-of-00002.gguf", f"{content_i}:F32:{k}") for k in (1, 2)]
+
+        catalog.append({
+            "id": repo_id,
+            "likes": max(0, 5000 - i * 2 - _hash("likes", i) % 2),
+            "downloads": _hash("downloads", i, touched) % 500000,
+            "tags": [
+                "gguf", arch, "text-generation", "conversational",
+                f"base_model:{base}", f"base_model:quantized:{base}",
+                f"license:{license_}", f"arxiv:{2400 + i % 9}.{10000 + i % 97:05d}",
+                "endpoints_compatible", "region:us",
+            ],
+            "lastModified": _iso(created + timedelta(days=30 * touched)),
+            "createdAt": _iso(created),
+            "pipeline_tag": "text-generation",
+            "library_name": "gguf",
+            "_details": {
+                "siblings": [{"rfilename": s, "_content": key} for s, key in siblings],
+                "gguf": {"total": params, "architecture": arch, "context_length": ctx},
+                "cardData": {"license": license_, "base_model": base},
+            },
+        })
+    catalog.sort(key=lambda m: -m["likes"])
+    return catalog
+
+
+class RateWindow:
+    def __init__(self, rate, window):
+        self.rate = rate
+        self.window = window
+        self.lock = threading.Lock()
+        self.start = time.monotonic()
+        self.used = 0
+
+    def take(self):
+        """(allowed, remaining, seconds until reset)."""
+        with self.lock:
+            now = time.monotonic()
+            if now - self.start >= self.window:
+                self.start, self.used = now, 0
+            reset = max(1, int(self.window - (now - self.start) + 0.999))
+            if self.rate and self.used >= self.rate:
+                return False, 0, reset
+            self.used += 1
+            return True, (self.rate - self.used) if self.rate else 1000000, reset
+
+
+class Handler(BaseHTTPRequestHandler):
+    catalog = []
+    by_id = {}
+    limiter = None
+    throttle = 0.0      # bytes/s per connection, 0 = unlimited
+    drop = 0.0
+    counters = {"listing": 0, "details": 0, "rate_limited": 0, "files": 0, "file_bytes": 0, "dropped": 0}
+    counters_lock = threading.Lock()
+
+    def _count(self, key):
+        with self.counters_lock:
+            self.counters[key] += 1
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == "/stats":
+            self._send(200, dict(self.counters))
+            return
+
+        time.sleep(LATENCY)
+        if "/resolve/" in url.path:
+            self._file(urllib.parse.unquote(url.path))
+            return
+
+        allowed, remaining, reset = self.limiter.take()
+        headers = {
+            "RateLimit": f'"api";r={remaining};t={reset}',
+            "RateLimit-Policy": f'"fixed window";"api";q={self.limiter.rate};w={self.limiter.window}',
+        }
+        if not allowed:
+            self._count("rate_limited")
+            self._send(429, {"error": "rate limited (mock)"}, {**headers, "Retry-After": str(reset)})
+            return
+
+        if url.path == "/api/models":
+            self._count("listing")
+            self._listing(url, headers)
+        elif url.path.startswith("/api/models/"):
+            self._count("details")
+            repo_id = urllib.parse.unquote(url.path[len("/api/models/"):])
+            model = self.by_id.get(repo_id)
+            if model is None:
+                self._send(404, {"error": "Repository not found"}, headers)
+                return
+            public = {k: v for k, v in model.items() if not k.startswith("_")}
+            details = dict(model["_details"])
+            blobs = urllib.parse.parse_qs(url.query).get("blobs", ["false"])[0] == "true"
+            details["siblings"] = [self._sibling(s, blobs) for s in details["siblings"]]
+            self._send(200, {**public, **details}, headers)
+        else:
+            self._send(404, {"error": "not found"}, headers)
+
+    @staticmethod
+    def _sibling(sibling, blobs):
+        entry = {"rfilename": sibling["rfilename"]}
+        if blobs:
+            key = sibling["_content"]
+            entry["size"] = len(file_bytes(key))
+            entry["blobId"] = hashlib.sha1(file_bytes(key)).hexdigest()
+            if key:
+                entry["lfs"] = {"sha256": file_sha256(key), "size": entry["size"], "pointerSize": 134}
+        return entry
+
+    def _file(self, path):
+        # /<author>/<name>/resolve/<revision>/<file>
+        parts = path.strip("/").split("/", 4)
+        model = self.by_id.get("/".join(parts[:2])) if len(parts) == 5 else None
+        sibling = next((s for s in model["_details"]["siblings"] if s["rfilename"] == parts[4]), None) if model else None
+        if sibling is None:
+            self._send(404, {"error": "Entry not found"})
+            return
+
+        data = file_bytes(sibling["_content"])
+        start, end = 0, len(data) - 1
+        byte_range = self.headers.get("Range")
+        if byte_range and byte_range.startswith("bytes="):
+            first, _, last = byte_range[6:].partition("-")
+            start = int(first or 0)
+            end = min(int(last), end) if last else end
+            if start > end:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{file_sha256(sibling["_content"])}"')
+        self.end_headers()
+        self._count("files")
+
+        body = data[start:end + 1]
+        # Dropped connections stop somewhere in the body
+        cut = random.randint(0, len(body) - 1) if body and random.random() < self.drop else None
+        for offset in range(0, len(body), SEND_BLOCK):
+            block = body[offset:offset + SEND_BLOCK]
+            if cut is not None and offset + len(block) > cut:
+                self.wfile.write(block[:cut - offset])
+                self._count("dropped")
+                self.close_connection = True
+                return
+            self.wfile.write(block)
+            with self.counters_lock:
+                self.counters["file_bytes"] += len(block)
+            if self.throttle:
+                time.sleep(len(block) / self.throttle)
+
+    def _listing(self, url, headers):
+        query = urllib.parse.parse_qs(url.query)
+        limit = min(int(query.get("limit", ["1000"])[0]), 1000)
+        cursor = query.get("cursor", [None])[0]
+        offset = int(base64.urlsafe_b64decode(cursor.encode()).decode()) if cursor else 0
+
+        page = [{k: v for k, v in m.items() if not k.startswith("_")} for m in self.catalog[offset:offset + limit]]
+        if offset + limit < len(self.catalog):
+            next_query = {k: v for k, v in query.items() if k != "cursor"}
+            next_query["cursor"] = [base64.urlsafe_b64encode(str(offset + limit).encode()).decode()]
+            host = self.headers.get("Host", "127.0.0.1")
+            headers["Link"] = f'<http://{host}/api/models?{urllib.parse.urlencode(next_query, doseq=True)}>; rel="next"'
+        self._send(200, page, headers)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline mock of the Hugging Face Hub model API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--models", type=int, default=2500)
+    parser.add_argument("--revision", type=int, default=0, help="simulated catalog updates since the first crawl")
+    parser.add_argument("--rate", type=int, default=300, help="requests per window (0 = unlimited)")
+    parser.add_argument("--window", type=int, default=5, help="rate-limit window in seconds")
+    parser.add_argument("--throttle-mibs", type=float, default=0.0, help="per-connection download cap in MiB/s (0 = unlimited)")
+    parser.add_argument("--drop", type=float, default=0.0, help="fraction of file transfers cut mid-body")
+    args = parser.parse_args()
+
+    Handler.catalog = build_catalog(args.models, args.revision)
+    Handler.by_id = {m["id"]: m for m in Handler.catalog}
+    Handler.limiter = RateWindow(args.rate, args.window)
+    Handler.throttle = args.throttle_mibs * 1024 * 1024
+    Handler.drop = args.drop
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"mock HF API ({args.models} models, revision {args.revision}) listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
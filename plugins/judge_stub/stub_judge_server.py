@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# Offline stand-in for an OpenAI-compatible judge endpoint (/v1/chat/completions).
+#
+# Usage:
+#   python plugins/judge_stub/stub_judge_server.py --port 8089
+#   JUDGE_BASE_URL=http://127.0.0.1:8089/v1 python experiment_runner/quality_metrics/test_DeepEval.py
+#
+# Scores are deterministic and cheap: shorter candidates (relative to the longest in the
+# prompt) score higher, plus a small per-(metric, candidate) hash jitter. Good enough to
+# exercise concurrency, caching, retries and score merging; meaningless as a quality signal.
+#
+# Environment:
+#   STUB_JUDGE_LATENCY  seconds to wait before answering (default: 0.05)
+#   STUB_JUDGE_FAULTS   comma list of fault probabilities, e.g. "429=0.2,500=0.1,garbage=0.05"
+#                       429     -> rate limited, with a Retry-After header
+#                       500     -> internal server error
+#                       garbage -> 200 with content that is not valid JSON
+#   STUB_JUDGE_SEED     seed for fault injection (default: random)
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY = float(os.environ.get("STUB_JUDGE_LATENCY", "0.05"))
+FAULTS = {}
+for item in filter(None, os.environ.get("STUB_JUDGE_FAULTS", "").split(",")):
+    name, _, prob = item.partition("=")
+    FAULTS[name.strip()] = float(prob or 0)
+
+_rng = random.Random(os.environ.get("STUB_JUDGE_SEED"))
+_rng_lock = threading.Lock()
+_counter = {"requests": 0}
+
+CANDIDATE_PATTERN = re.compile(r"--- MODEL ID: (\d+) ---\n(.*?)(?=\n\n--- MODEL ID: |\n*\Z)", re.DOTALL)
+METRIC_PATTERN = re.compile(r"on the metric: (.+?)\.\n")
+
+
+def _fault(name):
+    with _rng_lock:
+        return _rng.random() < FAULTS.get(name, 0.0)
+
+
+def score_candidates(system_prompt, user_prompt):
+    metric = METRIC_PATTERN.search(system_prompt)
+    metric = metric.group(1) if metric else ""
+    candidates = [(int(i), text.strip()) for i, text in CANDIDATE_PATTERN.findall(user_prompt)]
+    if not candidates:
+        return []
+
+    longest = max(len(text) for _, text in candidates) or 1
+    rankings = []
+    for model_id, text in candidates:
+        jitter = int(hashlib.sha256(f"{metric}:{text}".encode("utf-8")).hexdigest()[:4], 16) / 0xFFFF
+        score = 0.35 + 0.5 * (1 - len(text) / longest) + 0.15 * jitter
+        rankings.append({"model_id": model_id, "score": round(min(score, 1.0), 2)})
+    return rankings
+
+
+class Handler(BaseHTTPRequestHandler):
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send(200, {"object": "list", "data": [{"id": "stub-judge", "object": "model", "owned_by": "stub"}]})
+        else:
+            self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send(404, {"error": {"message": "not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with _rng_lock:
+            _counter["requests"] += 1
+
+        time.sleep(LATENCY)
+
+        if _fault("429"):
+            self._send(429, {"error": {"message": "rate limited (stub)", "type": "rate_limit_error"}}, {"Retry-After": "0.2"})
+            return
+        if _fault("500"):
+            self._send(500, {"error": {"message": "internal error (stub)", "type": "server_error"}})
+            return
+
+        messages = request.get("messages", [])
+        system_prompt = "\n".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        user_prompt = "\n".join(m.get("content", "") for m in messages if m.get("role") == "user")
+        content = json.dumps({"rankings": score_candidates(system_prompt, user_prompt)})
+        if _fault("garbage"):
+            content = content[: len(content) // 2]
+
+        self._send(200, {
+            "id": f"chatcmpl-stub-{_counter['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub-judge"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": len(user_prompt.split()),
+                "completion_tokens": len(content.split()),
+                "total_tokens": len(user_prompt.split()) + len(content.split()),
+            },
+        })
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible judge stub.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"stub judge listening on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
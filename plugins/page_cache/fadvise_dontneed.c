@@ -0,0 +1,61 @@
+/*
+ * Page-cache eviction for unrooted Android shells (cache_state=cold runs).
+ * Usage: fadvise_dontneed <file>
+ *
+ * Writes back and drops the file's pages with posix_fadvise(POSIX_FADV_DONTNEED), which needs no
+ * root, then counts the pages still resident with mincore. Pages another process keeps
+ * mapped cannot be dropped. Prints "<resident_pages>/<total_pages>" and exits 0 only when
+ * at most 1% of the file stayed resident.
+ *
+ * Build it next to llama-cli (LOCAL_LLAMA_BUILD) with the NDK:
+ *   $NDK/toolchains/llvm/prebuilt/linux-x86_64/bin/aarch64-linux-android30-clang -O2 \
+ *       -o build-android/bin/fadvise_dontneed fadvise_dontneed.c
+ */
+#include <fcntl.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+int main(int argc, char **argv) {
+    if (argc != 2) {
+        fprintf(stderr, "usage: %s <file>\n", argv[0]);
+        return 2;
+    }
+
+    int fd = open(argv[1], O_RDONLY);
+    struct stat st;
+    if (fd < 0 || fstat(fd, &st) != 0) {
+        perror(argv[1]);
+        return 1;
+    }
+
+    // Dirty pages (a model pushed moments ago) are not dropped until written back
+    fdatasync(fd);
+    int err = posix_fadvise(fd, 0, 0, POSIX_FADV_DONTNEED);
+    if (err != 0) {
+        fprintf(stderr, "posix_fadvise: error %d\n", err);
+        return 1;
+    }
+    if (st.st_size == 0) {
+        printf("0/0\n");
+        return 0;
+    }
+
+    // --- Verify: residency of every page after the drop ---
+    long page = sysconf(_SC_PAGESIZE);
+    size_t pages = (st.st_size + page - 1) / page;
+    void *map = mmap(NULL, st.st_size, PROT_READ, MAP_SHARED, fd, 0);
+    unsigned char *vec = malloc(pages);
+    if (map == MAP_FAILED || vec == NULL || mincore(map, st.st_size, vec) != 0) {
+        perror("mincore");
+        return 1;
+    }
+
+    size_t resident = 0;
+    for (size_t i = 0; i < pages; i++)
+        resident += vec[i] & 1;
+    printf("%zu/%zu\n", resident, pages);
+    return resident * 100 <= pages ? 0 : 3;
+}
@@ -0,0 +1,49 @@
+#!/system/bin/sh
+# DVFS / thermal sampler for unrooted Android shells.
+# Usage: sh thermal_sampler.sh <out_file> [interval_s] [zone_type_regex]
+#
+# Header line:  H,<epoch_ns>,<uptime_s>,policy0:<cpuinfo_max_freq>,...,thermal_zoneN=<type>,...
+# Sample lines: S,<uptime_s>,policy0:<scaling_cur_freq>:<scaling_max_freq>,...,thermal_zoneN:<temp>,...
+
+OUT="$1"
+INTERVAL="${2:-0.1}"
+ZONE_FILTER="${3:-cpu|gpu|soc|skin|ddr}"
+
+# --- 1. DISCOVER READABLE SOURCES (once) ---
+read UPTIME _ < /proc/uptime
+HEADER="H,$(date +%s%N),$UPTIME"
+
+POLICIES=""
+for p in /sys/devices/system/cpu/cpufreq/policy*; do
+    [ -r "$p/scaling_max_freq" ] || continue
+    read HW_MAX < "$p/cpuinfo_max_freq" || continue
+    POLICIES="$POLICIES $p"
+    HEADER="$HEADER,${p##*/}:$HW_MAX"
+done
+
+ZONES=""
+for z in /sys/class/thermal/thermal_zone*; do
+    read ZTYPE < "$z/type" 2>/dev/null || continue
+    echo "$ZTYPE" | grep -qE "$ZONE_FILTER" || continue
+    read ZTEMP < "$z/temp" 2>/dev/null || continue
+    ZONES="$ZONES $z"
+    HEADER="$HEADER,${z##*/}=$ZTYPE"
+done
+
+echo "$HEADER" > "$OUT"
+
+# --- 2. SAMPLE LOOP (shell builtins only, no fork except sleep) ---
+while true; do
+    read UPTIME _ < /proc/uptime
+    LINE="S,$UPTIME"
+    for p in $POLICIES; do
+        read CUR < "$p/scaling_cur_freq"
+        read MAX < "$p/scaling_max_freq"
+        LINE="$LINE,${p##*/}:$CUR:$MAX"
+    done
+    for z in $ZONES; do
+        read ZTEMP < "$z/temp" 2>/dev/null && LINE="$LINE,${z##*/}:$ZTEMP"
+    done
+    echo "$LINE" >> "$OUT"
+    sleep "$INTERVAL"
+done
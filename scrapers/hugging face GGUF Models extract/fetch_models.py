@@ -1,79 +1,382 @@
 # Fetching GGUF models
+#
+# Crawls the full GGUF listing of the Hugging Face Hub (sorted by likes) and keeps an
+# incremental cache: one JSON file per model, refreshed only when its lastModified changes.
+#
+# Usage:
+#   python fetch_models.py                       # full crawl, writes excel/gguf_models.csv
+#   python fetch_models.py --max-models 500      # top 500 by likes
+#   HF_ENDPOINT=http://127.0.0.1:8090 python fetch_models.py   # against plugins/hf_mock
+#
+# Environment:
+#   HF_ENDPOINT  Hub base URL (default: https://huggingface.co), same variable huggingface_hub uses
+#   HF_TOKEN     access token; authenticated requests get a larger rate limit
 
-from huggingface_hub import HfApi, login
-import csv, time
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os.path import dirname, realpath
 
-# Use login with api_token for avoid limit
-#api_token = "***"
-#login(api_token)
+SCRIPT_DIR = dirname(realpath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".hf_cache")
+OUTPUT_CSV = os.path.join(SCRIPT_DIR, "excel", "gguf_models.csv")
+TAGS_CSV = os.path.join(SCRIPT_DIR, "excel", "gguf_model_tags.csv")
 
-def fetch_models(library="gguf", sort="likes", direction=-1): # sort dsc based on count of likes
-    api = HfApi()
-    all_models = []
+HF_ENDPOINT = os.environ.get("HF_ENDPOINT", "https://huggingface.co").rstrip("/")
+HF_TOKEN = os.environ.get("HF_TOKEN")
 
+PAGE_SIZE = 1000  # largest page the listing endpoint serves
+LISTING_FIELDS = ["likes", "downloads", "tags", "lastModified", "createdAt", "pipeline_tag", "library_name"]
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Quantization type in a .gguf file name, e.g. model-Q4_K_M.gguf, model.IQ2_XXS.gguf, model-bf16.gguf
+QUANT_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9])(IQ\d_[A-Z]+|Q\d_K(?:_[SML])?|Q\d_\d(?:_\d_\d)?|TQ\d_\d|BF16|F16|F32|MXFP4)(?![A-Za-z0-9])",
+    re.IGNORECASE,
+)
+SHARD_PATTERN = re.compile(r"-\d{5}-of-\d{5}(?=\.gguf$)")
+
+CATALOG_COLUMNS = [
+    "model", "repo_id", "author", "likes", "downloads",
+    "arch", "base_model", "base_model_relation", "license", "pipeline_tag",
+    "quant_types", "n_gguf_files", "context_length", "total_params",
+    "datasets", "arxiv", "created_at", "last_modified",
+]
+
+
+# ---------------------------
+# RATE LIMITING
+# ---------------------------
+class RateLimiter:
+    """
+    Shared pause for all workers. The Hub answers with a RateLimit header
+    ('"api";r=<remaining>;t=<seconds until reset>') and Retry-After on 429;
+    when the quota is spent every worker waits for the window to reset.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+        self.waited = 0.0
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            self.waited += delay
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def update(self, headers):
+        remaining, reset = parse_rate_limit(headers)
+        if remaining is not None and remaining <= 0 and reset:
+            self.pause(reset)
+
+
+def parse_rate_limit(headers):
+    """(remaining, seconds until reset) from RateLimit / X-RateLimit-* headers, None if absent."""
+    value = headers.get("RateLimit")
+    if value:
+        fields = dict(re.findall(r"([rt])=(\d+)", value))
+        if "r" in fields:
+            return int(fields["r"]), int(fields.get("t", 0))
+    remaining = headers.get("X-RateLimit-Remaining")
+    if remaining is not None:
+        try:
+            return int(remaining), int(headers.get("X-RateLimit-Reset", 0))
+        except ValueError:
+            pass
+    return None, None
+
+
+# ---------------------------
+# HTTP
+# ---------------------------
+class HubClient:
+    def __init__(self, endpoint=HF_ENDPOINT, token=HF_TOKEN, max_retries=6, backoff_max=60.0, timeout=30.0):
+        self.endpoint = endpoint
+        self.token = token
+        self.max_retries = max_retries
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.limiter = RateLimiter()
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def get(self, url):
+        """(decoded JSON, response headers); retries 429 / 5xx / connection errors with backoff."""
+        if not url.startswith("http"):
+            url = self.endpoint + url
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.wait()
+            self._count("requests")
+            try:
+                with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=self.timeout) as response:
+                    self.limiter.update(response.headers)
+                    return json.loads(response.read().decode("utf-8")), response.headers
+            except urllib.error.HTTPError as e:
+                self.limiter.update(e.headers)
+                if e.code not in RETRY_STATUS or attempt == self.max_retries:
+                    raise
+                delay = self._retry_after(e.headers, attempt)
+                if e.code == 429:
+                    self._count("rate_limited")
+                    # Everyone waits, not just the worker that hit the limit
+                    self.limiter.pause(delay)
+            except (urllib.error.URLError, TimeoutError, ConnectionError):
+                if attempt == self.max_retries:
+                    raise
+                delay = self._retry_after({}, attempt)
+            self._count("retries")
+            time.sleep(delay)
+
+    def _retry_after(self, headers, attempt):
+        try:
+            return min(float(headers.get("Retry-After")), self.backoff_max)
+        except (TypeError, ValueError):
+            # Exponential backoff with full jitter
+            return random.uniform(0, min(self.backoff_max, 2 ** attempt))
+
+
+def next_link(headers):
+    """URL of the next page from the Link header (cursor pagination), None on the last page."""
+    for part in (headers.get("Link") or "").split(","):
+        match = re.match(r'\s*<([^>]+)>\s*;\s*rel="?next"?', part)
+        if match:
+            return match.group(1)
+    return None
+
+
+def list_models(client, library="gguf", sort="likes", direction=-1, max_models=None):
+    """Every model of the listing, page by page (lightweight fields only)."""
+    params = [("library", library), ("sort", sort), ("direction", direction), ("limit", PAGE_SIZE)]
+    params += [("expand[]", field) for field in LISTING_FIELDS]
+    url = "/api/models?" + urllib.parse.urlencode(params)
+
+    models = []
+    while url:
+        page, headers = client.get(url)
+        models.extend(page)
+        print(f"Fetched {len(models)} models...")
+        if max_models is not None and len(models) >= max_models:
+            return models[:max_models]
+        url = next_link(headers)
+    return models
+
+
+def fetch_details(client, repo_id):
+    """Per-model info the listing does not carry: GGUF header summary, file list, card data."""
+    url = f"/api/models/{urllib.parse.quote(repo_id, safe='/')}"
+    info, _ = client.get(url)
+    return {
+        "gguf": info.get("gguf") or {},
+        "siblings": [s.get("rfilename", "") for s in info.get("siblings") or []],
+        "cardData": info.get("cardData") or {},
+    }
+
+
+# ---------------------------
+# INCREMENTAL CACHE
+# ---------------------------
+class ModelCache:
+    """<cache_dir>/<author>--<name>.json holding the details fetched at a given lastModified."""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, repo_id):
+        return os.path.join(self.dir, repo_id.replace("/", "--") + ".json")
+
+    def get(self, repo_id, last_modified):
+        try:
+            with open(self._path(repo_id), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry["details"] if entry.get("lastModified") == last_modified else None
+
+    def put(self, repo_id, last_modified, details):
+        path = self._path(repo_id)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"id": repo_id, "lastModified": last_modified, "details": details}, f)
+        os.replace(tmp_path, path)
+
+
+def fetch_models(client, cache, max_models=None, workers=8):
+    """Listing + details; details come from the cache unless the model changed since the last crawl."""
     print("Fetching all models...")
+    listing = list_models(client, max_models=max_models)
+
+    details = {}
+    stale = []
+    for model in listing:
+        cached = cache.get(model["id"], model.get("lastModified"))
+        if cached is None:
+            stale.append(model)
+        else:
+            details[model["id"]] = cached
+    print(f"{len(listing) - len(stale)} models unchanged, fetching details for {len(stale)}...")
+
+    failed = 0
 
-    models_iterator = api.list_models(
-        library=library,
-        sort=sort,
-        direction=direction,
-        full=True,
-        limit=100 # exctract top 100 models
-    )
+    def refresh(model):
+        entry = fetch_details(client, model["id"])
+        cache.put(model["id"], model.get("lastModified"), entry)
+        return model["id"], entry
 
-    for m, model in enumerate(models_iterator, start=1):
-        all_models.append({
-            "model": model.id, # model name
-            "likes": model.likes or 0, # count of likes
-            "downloads": model.downloads or 0, # count of download
-            "tags": ", ".join(model.tags or []) # tag contain a lot of different features (need to separate each of them)
-        })
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(refresh, model) for model in stale]
+        for i, future in enumerate(as_completed(futures), start=1):
+            try:
+                repo_id, entry = future.result()
+                details[repo_id] = entry
+            except Exception as e:
+                # Left out of the cache, so the next crawl retries it
+                failed += 1
+                print(f"    [ERROR] {type(e).__name__}: {e}")
+            if i % 500 == 0:
+                print(f"    {i}/{len(stale)} details")
 
-        # Implant a timer to stop after every specefic chunk for avoiding api limit
+    print(f"Fetched {len(listing)} models total ({len(stale) - failed} refreshed, {failed} failed). "
+          f"Requests: {client.stats['requests']}, retries: {client.stats['retries']}, "
+          f"rate limited: {client.stats['rate_limited']}, rate-limit wait {client.limiter.waited:.1f}s (summed over workers)")
+    return [(model, details.get(model["id"], {})) for model in listing]
 
-        """
-        # Sleep after every 100 models
-        if i % 10000 == 0:
-            print(f"Fetched {i} models... sleeping for 5 seconds.")
-            time.sleep(5)
-        """
 
-    print(f"Fetched {len(all_models)} models total.") # showing count of fetched models after each iteration
-    return all_models
+# ---------------------------
+# TAG NORMALIZATION
+# ---------------------------
+def split_tags(tags):
+    """(key, value) pairs; 'license:mit' -> ('license', 'mit'), plain tags -> ('tag', name)."""
+    pairs = []
+    for tag in tags or []:
+        key, sep, value = tag.partition(":")
+        pairs.append((key, value) if sep else ("tag", tag))
+    return pairs
 
 
-def clean_and_filter_models(models): # filter rows based on specefic words
-    cleaned_models = []
+def quant_types(filenames):
+    found = []
+    for name in filenames:
+        if not name.lower().endswith(".gguf"):
+            continue
+        match = QUANT_PATTERN.search(os.path.basename(name)[:-5])
+        if match:
+            found.append(match.group(1).upper())
+    return sorted(set(found))
 
-    for model in models:
-        """
-        tags = model.get("tags", "")
-        tag_list = [tag.strip() for tag in tags.split(",")]
 
-        # Only keep models with these tags
-        if "reinforcement-learning" not in tag_list:
-            cleaned_models.append(model)
-        """
-        # Make Model name better
-        model["model"] = model["model"].split("/", 1)[-1]
-        cleaned_models.append(model)
+def _join(values):
+    return "|".join(dict.fromkeys(v for v in values if v))
 
-    return cleaned_models
 
-def save_to_csv(models, filename="excel/gguf_models.csv"): # saving as a file
+def normalize_model(model, details):
+    """One catalog row; multi-valued fields are '|'-joined so they stay one CSV cell."""
+    pairs = split_tags(model.get("tags"))
+    base_models, relations = [], []
+    for key, value in pairs:
+        if key != "base_model":
+            continue
+        # base_model:<id> or base_model:<relation>:<id> (quantized / finetune / adapter / merge)
+        relation, sep, repo = value.partition(":")
+        if sep:
+            relations.append(relation)
+            base_models.append(repo)
+        else:
+            base_models.append(value)
 
-    if not models:
+    gguf = details.get("gguf") or {}
+    card = details.get("cardData") or {}
+    siblings = details.get("siblings") or []
+    licenses = [v for k, v in pairs if k == "license"] or ([card["license"]] if isinstance(card.get("license"), str) else [])
+    gguf_files = {SHARD_PATTERN.sub("", s) for s in siblings if s.lower().endswith(".gguf")}
+
+    repo_id = model["id"]
+    return {
+        "model": repo_id.split("/", 1)[-1],  # Make Model name better
+        "repo_id": repo_id,
+        "author": repo_id.split("/", 1)[0] if "/" in repo_id else "",
+        "likes": model.get("likes") or 0,
+        "downloads": model.get("downloads") or 0,
+        "arch": gguf.get("architecture", ""),
+        "base_model": _join(base_models),
+        "base_model_relation": _join(relations),
+        "license": _join(licenses),
+        "pipeline_tag": model.get("pipeline_tag") or "",
+        "quant_types": _join(quant_types(siblings)),
+        "n_gguf_files": len(gguf_files),
+        "context_length": gguf.get("context_length", ""),
+        "total_params": gguf.get("total", ""),
+        "datasets": _join(v for k, v in pairs if k == "dataset"),
+        "arxiv": _join(v for k, v in pairs if k == "arxiv"),
+        "created_at": model.get("createdAt", ""),
+        "last_modified": model.get("lastModified", ""),
+    }
+
+
+def tag_rows(model, details):
+    """Long format (repo_id, key, value): every tag plus the derived arch / quant values, for filtering."""
+    rows = [{"repo_id": model["id"], "key": k, "value": v} for k, v in split_tags(model.get("tags"))]
+    arch = (details.get("gguf") or {}).get("architecture")
+    if arch:
+        rows.append({"repo_id": model["id"], "key": "arch", "value": arch})
+    rows += [{"repo_id": model["id"], "key": "quant", "value": q} for q in quant_types(details.get("siblings") or [])]
+    return rows
+
+
+def save_to_csv(rows, filename, fieldnames):  # saving as a file
+    if not rows:
         print("No models to save.")
         return
 
+    os.makedirs(dirname(filename) or ".", exist_ok=True)
     with open(filename, mode="w", newline="", encoding="utf-8") as file:
-        writer = csv.DictWriter(file, fieldnames=models[0].keys())
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
         writer.writeheader()
-        writer.writerows(models)
+        writer.writerows(rows)
+
+    print(f"Saved {len(rows)} rows to {filename}.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental crawler for the Hugging Face GGUF catalog.")
+    parser.add_argument("--max-models", type=int, default=None, help="stop after the top N by likes (default: all)")
+    parser.add_argument("--workers", type=int, default=8, help="concurrent detail requests")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--output", default=OUTPUT_CSV)
+    parser.add_argument("--tags-output", default=TAGS_CSV)
+    args = parser.parse_args()
+
+    client = HubClient()
+    results = fetch_models(client, ModelCache(args.cache_dir), max_models=args.max_models, workers=args.workers)
+
+    save_to_csv([normalize_model(m, d) for m, d in results], args.output, CATALOG_COLUMNS)
+    save_to_csv([row for m, d in results for row in tag_rows(m, d)], args.tags_output, ["repo_id", "key", "value"])
 
-    print(f"Saved {len(models)} models to {filename}.")
 
 if __name__ == "__main__":
-    models = fetch_models()  # assume returns a list of dicts
-    filtered_models = clean_and_filter_models(models)
-    save_to_csv(filtered_models)
+    main()